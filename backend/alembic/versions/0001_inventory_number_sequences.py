@@ -0,0 +1,46 @@
+"""inventory number sequences
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблица могла быть уже создана через Base.metadata.create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("inventory_number_sequences"):
+        op.create_table(
+            "inventory_number_sequences",
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("device_type_id", sa.Integer(), sa.ForeignKey("device_types.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("last_value", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Однократное заполнение счетчиков по существующим номерам вида WWP-02/0022
+    op.execute(
+        """
+        INSERT INTO inventory_number_sequences (company_id, device_type_id, last_value)
+        SELECT c.id, t.id, MAX(CAST(split_part(d.inventory_number, '/', 2) AS INTEGER))
+        FROM companies c
+        CROSS JOIN device_types t
+        JOIN devices d ON split_part(d.inventory_number, '/', 1) = c.code || '-' || t.code
+        WHERE d.inventory_number ~ '^[^/]+/[0-9]{1,9}$'
+        GROUP BY c.id, t.id
+        ON CONFLICT (company_id, device_type_id)
+        DO UPDATE SET last_value = GREATEST(inventory_number_sequences.last_value, EXCLUDED.last_value)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("inventory_number_sequences")
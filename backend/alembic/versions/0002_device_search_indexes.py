@@ -0,0 +1,49 @@
+"""device search indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+# (имя индекса, таблица, выражение) - триграммные GIN для ILIKE '%q%' и оператора %
+TRIGRAM_INDEXES = [
+    ("ix_devices_serial_number_trgm", "devices", "serial_number gin_trgm_ops"),
+    ("ix_devices_inventory_number_trgm", "devices", "inventory_number gin_trgm_ops"),
+    ("ix_models_name_trgm", "models", "name gin_trgm_ops"),
+    ("ix_brands_name_trgm", "brands", "name gin_trgm_ops"),
+    ("ix_employees_full_name_trgm", "employees", "full_name gin_trgm_ops"),
+    ("ix_warehouses_name_trgm", "warehouses", "name gin_trgm_ops"),
+]
+
+# Префиксный поиск по номерам для коротких запросов: lower(col) LIKE 'q%'
+PREFIX_INDEXES = [
+    ("ix_devices_serial_number_lower_prefix", "devices", "lower(serial_number) text_pattern_ops"),
+    ("ix_devices_inventory_number_lower_prefix", "devices", "lower(inventory_number) text_pattern_ops"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, expression in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin ({expression})")
+        for name, table, expression in PREFIX_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({expression})")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in TRIGRAM_INDEXES + PREFIX_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,30 @@
+"""table versions for etags
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблица могла быть уже создана через Base.metadata.create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("table_versions"):
+        op.create_table(
+            "table_versions",
+            sa.Column("table_name", sa.String(), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("table_versions")
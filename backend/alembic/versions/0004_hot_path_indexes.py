@@ -0,0 +1,48 @@
+"""composite indexes for hot filter paths
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    # Устройства у сотрудника/на складе: employees, warehouses, movements, reports
+    ("ix_devices_location", "devices", "current_location_type, current_location_id"),
+    # Устройства пары (компания, тип): инвентарные номера, отчеты
+    ("ix_devices_company_device_type", "devices", "company_id, device_type_id"),
+    # История конкретного устройства, новые сверху
+    ("ix_movement_history_device_moved_at", "movement_history", "device_id, moved_at"),
+    # Keyset-пагинация общей истории по (moved_at, id)
+    ("ix_movement_history_moved_at_id", "movement_history", "moved_at, id"),
+    # Статистика сессии и фильтр checked в списке устройств сессии
+    ("ix_inventory_records_session_checked", "inventory_records", "inventory_session_id, checked"),
+    # Поиск записи устройства в сессии при отметке; им же обслуживается
+    # выборка непроверенных (фильтр checked по строкам сессии)
+    ("ix_inventory_records_session_device", "inventory_records", "inventory_session_id, device_id"),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+        for table in sorted({table for _, table, _ in INDEXES}):
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
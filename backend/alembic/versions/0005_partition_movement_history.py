@@ -0,0 +1,172 @@
+"""partition movement_history by month, add archive table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = (
+    "id, device_id, from_location_type, from_location_id, "
+    "to_location_type, to_location_id, moved_at, moved_by"
+)
+
+INDEXES = [
+    ("ix_movement_history_id", "id"),
+    ("ix_movement_history_device_moved_at", "device_id, moved_at"),
+    ("ix_movement_history_moved_at_id", "moved_at, id"),
+]
+
+# Сколько месяцев вперед создать секции сразу
+MONTHS_AHEAD = 3
+
+
+# Код приложения не импортируется: примененная миграция не должна меняться вместе с ним
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _create_partition(start: datetime) -> None:
+    end = _add_months(start, 1)
+    op.execute(
+        f"CREATE TABLE movement_history_p{start:%Y_%m} PARTITION OF movement_history "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def _relkind(table: str):
+    return op.get_bind().execute(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+
+
+def _create_archive_table() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS movement_history_archive (
+            id INTEGER PRIMARY KEY,
+            device_id INTEGER NOT NULL,
+            from_location_type locationtype,
+            from_location_id INTEGER,
+            to_location_type locationtype NOT NULL,
+            to_location_id INTEGER NOT NULL,
+            moved_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            moved_by INTEGER NOT NULL
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_movement_history_archive_device_moved_at "
+        "ON movement_history_archive (device_id, moved_at)"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # На новой БД create_all уже создал секционированную таблицу
+    if _relkind("movement_history") == "p":
+        _create_archive_table()
+        return
+
+    # Старая таблица переименовывается, ее индексы и последовательность освобождают имена
+    op.execute("ALTER TABLE movement_history RENAME TO movement_history_unpartitioned")
+    op.execute("ALTER TABLE movement_history_unpartitioned RENAME CONSTRAINT movement_history_pkey "
+               "TO movement_history_unpartitioned_pkey")
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER SEQUENCE movement_history_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE movement_history_unpartitioned ALTER COLUMN id DROP DEFAULT")
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute(
+        """
+        CREATE TABLE movement_history (
+            id INTEGER NOT NULL DEFAULT nextval('movement_history_id_seq'),
+            device_id INTEGER NOT NULL REFERENCES devices (id),
+            from_location_type locationtype,
+            from_location_id INTEGER,
+            to_location_type locationtype NOT NULL,
+            to_location_id INTEGER NOT NULL,
+            moved_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            moved_by INTEGER NOT NULL REFERENCES users (id),
+            PRIMARY KEY (id, moved_at)
+        ) PARTITION BY RANGE (moved_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE movement_history_id_seq OWNED BY movement_history.id")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON movement_history ({columns})")
+    op.execute("CREATE TABLE movement_history_default PARTITION OF movement_history DEFAULT")
+
+    # Секции на каждый месяц с данными и на несколько месяцев вперед
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT MIN(moved_at) FROM movement_history_unpartitioned")).scalar()
+    start = _month_start(oldest or now)
+    last = _add_months(_month_start(now), MONTHS_AHEAD)
+    while start <= last:
+        _create_partition(start)
+        start = _add_months(start, 1)
+
+    op.execute(
+        f"INSERT INTO movement_history ({COLUMNS}) "
+        f"SELECT id, device_id, from_location_type, from_location_id, "
+        f"to_location_type, to_location_id, COALESCE(moved_at, now()), moved_by "
+        f"FROM movement_history_unpartitioned"
+    )
+    op.execute("DROP TABLE movement_history_unpartitioned")
+    op.execute("ANALYZE movement_history")
+
+    _create_archive_table()
+
+
+def downgrade() -> None:
+    # Архив не возвращается в основную таблицу: строки архива сохраняются вместе с таблицей
+    op.execute("ALTER TABLE movement_history RENAME TO movement_history_partitioned")
+    op.execute("ALTER TABLE movement_history_partitioned RENAME CONSTRAINT movement_history_pkey "
+               "TO movement_history_partitioned_pkey")
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("ALTER SEQUENCE movement_history_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE movement_history_partitioned ALTER COLUMN id DROP DEFAULT")
+
+    op.execute(
+        """
+        CREATE TABLE movement_history (
+            id INTEGER PRIMARY KEY DEFAULT nextval('movement_history_id_seq'),
+            device_id INTEGER NOT NULL REFERENCES devices (id),
+            from_location_type locationtype,
+            from_location_id INTEGER,
+            to_location_type locationtype NOT NULL,
+            to_location_id INTEGER NOT NULL,
+            moved_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            moved_by INTEGER NOT NULL REFERENCES users (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE movement_history_id_seq OWNED BY movement_history.id")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON movement_history ({columns})")
+    op.execute(
+        f"INSERT INTO movement_history ({COLUMNS}) SELECT {COLUMNS} FROM movement_history_partitioned"
+    )
+    # Секции удаляются вместе с родительской таблицей
+    op.execute("DROP TABLE movement_history_partitioned CASCADE")
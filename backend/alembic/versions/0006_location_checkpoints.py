@@ -0,0 +1,35 @@
+"""location checkpoints for as-of location report
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблица могла быть уже создана через Base.metadata.create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("location_checkpoints"):
+        location_type = postgresql.ENUM("WAREHOUSE", "EMPLOYEE", name="locationtype", create_type=False)
+        op.create_table(
+            "location_checkpoints",
+            sa.Column("taken_at", sa.DateTime(timezone=True), primary_key=True),
+            sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("location_type", location_type, nullable=False),
+            sa.Column("location_id", sa.Integer(), nullable=False),
+            sa.Column("moved_at", sa.DateTime(timezone=True), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("location_checkpoints")
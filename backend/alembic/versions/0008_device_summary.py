@@ -0,0 +1,48 @@
+"""device summary counters
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблица могла быть уже создана через Base.metadata.create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("device_summary"):
+        location_type = postgresql.ENUM("WAREHOUSE", "EMPLOYEE", name="locationtype", create_type=False)
+        op.create_table(
+            "device_summary",
+            sa.Column("company_id", sa.Integer(), primary_key=True),
+            sa.Column("device_type_id", sa.Integer(), primary_key=True),
+            sa.Column("brand_id", sa.Integer(), primary_key=True),
+            sa.Column("location_type", location_type, primary_key=True),
+            sa.Column("location_id", sa.Integer(), primary_key=True),
+            sa.Column("device_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Начальное заполнение; блокировка не дает потерять параллельные изменения устройств
+    op.execute("LOCK TABLE devices IN SHARE MODE")
+    op.execute("DELETE FROM device_summary")
+    op.execute(
+        """
+        INSERT INTO device_summary (company_id, device_type_id, brand_id, location_type, location_id, device_count)
+        SELECT company_id, device_type_id, brand_id, current_location_type, current_location_id, COUNT(*)
+        FROM devices
+        GROUP BY company_id, device_type_id, brand_id, current_location_type, current_location_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("device_summary")
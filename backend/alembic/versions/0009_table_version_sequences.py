@@ -0,0 +1,53 @@
+"""table version sequences instead of the table_versions row per table
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+# Те же таблицы, что VERSIONED_TABLES в app/models/table_version.py
+TABLES = (
+    "users",
+    "companies",
+    "device_types",
+    "brands",
+    "models",
+    "employees",
+    "warehouses",
+    "devices",
+    "movement_history",
+    "movement_history_archive",
+    "inventory_sessions",
+    "inventory_records",
+    "inventory_number_sequences",
+    "location_checkpoints",
+    "device_summary",
+)
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.execute(f"CREATE SEQUENCE IF NOT EXISTS {table}_version_seq")
+    # Строка на таблицу блокировалась каждой пишущей транзакцией до COMMIT
+    op.execute("DROP TABLE IF EXISTS table_versions")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    for table in TABLES:
+        op.execute(f"DROP SEQUENCE IF EXISTS {table}_version_seq")
@@ -6,12 +6,14 @@ from ..database import get_db
 from ..models.brand import Brand
 from ..schemas.brand import BrandCreate, BrandUpdate, BrandResponse
 from ..services.auth import get_current_user
+from ..services.etag import table_etag
+from ..services.reference_cache import reference_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/brands", tags=["brands"])
 
 
-@router.get("/", response_model=List[BrandResponse])
+@router.get("/", response_model=List[BrandResponse], dependencies=[Depends(table_etag("brands"))])
 def read_brands(
     skip: int = 0,
     limit: int = 100,
@@ -42,7 +44,7 @@ def create_brand(
     return db_brand
 
 
-@router.get("/{brand_id}", response_model=BrandResponse)
+@router.get("/{brand_id}", response_model=BrandResponse, dependencies=[Depends(table_etag("brands"))])
 def read_brand(
     brand_id: int,
     db: Session = Depends(get_db),
@@ -77,6 +79,7 @@ def update_brand(
     
     db.commit()
     db.refresh(db_brand)
+    reference_cache.invalidate(Brand, brand_id)
     return db_brand
 
 
@@ -95,6 +98,7 @@ def delete_brand(
     
     db.delete(db_brand)
     db.commit()
+    reference_cache.invalidate(Brand, brand_id)
     return None
 
 
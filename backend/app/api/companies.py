@@ -6,6 +6,7 @@ from ..database import get_db
 from ..models.company import Company
 from ..schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse
 from ..services.auth import get_current_user
+from ..services.reference_cache import reference_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/companies", tags=["companies"])
@@ -99,6 +100,7 @@ def update_company(
     
     db.commit()
     db.refresh(db_company)
+    reference_cache.invalidate(Company, company_id)
     return db_company
 
 
@@ -117,5 +119,6 @@ def delete_company(
     
     db.delete(db_company)
     db.commit()
+    reference_cache.invalidate(Company, company_id)
     return None
 
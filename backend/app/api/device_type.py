@@ -6,6 +6,7 @@ from ..database import get_db
 from ..models.device_type import DeviceType
 from ..schemas.device_type import DeviceTypeCreate, DeviceTypeUpdate, DeviceTypeResponse
 from ..services.auth import get_current_user
+from ..services.reference_cache import reference_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/device-types", tags=["device-types"])
@@ -96,6 +97,7 @@ def update_device_type(
     
     db.commit()
     db.refresh(db_device_type)
+    reference_cache.invalidate(DeviceType, device_type_id)
     return db_device_type
 
 
@@ -114,5 +116,6 @@ def delete_device_type(
     
     db.delete(db_device_type)
     db.commit()
+    reference_cache.invalidate(DeviceType, device_type_id)
     return None
 
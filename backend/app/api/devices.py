@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional, Union
+import csv
+import io
 
 from ..database import get_db
 from ..models.device import Device, LocationType
@@ -10,64 +12,70 @@ from ..models.brand import Brand
 from ..models.model import Model
 from ..models.employee import Employee
 from ..models.warehouse import Warehouse
-from ..schemas.device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceLocationUpdate
+from ..schemas.device import (
+    DeviceCreate,
+    DeviceUpdate,
+    DeviceResponse,
+    DeviceLocationUpdate,
+    DeviceBulkResult,
+    DevicePage,
+    DeviceSearchResult,
+    DeviceExpandedResponse,
+    DeviceInventoryLookup,
+    DeviceInventoryLookupResult,
+)
 from ..services.auth import get_current_user
+from ..services.etag import table_etag, DEVICE_TABLES
+from ..services.inventory_numbers import (
+    generate_inventory_number,
+    inventory_number_taken,
+    sync_inventory_sequence,
+)
+from ..services.device_import import import_devices, validate_device_row
+from ..services.pagination import encode_cursor, decode_cursor
+from ..services.device_search import search_devices
+from ..services.device_expand import parse_expand, expand_options, expand_devices
+from ..services.reference_cache import reference_cache
+from ..services.events import publish_event
+from ..services.qr_cache import qr_cache
 from ..models.user import User
-import re
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
+# Ограничение на размер JSON-пачки; CSV обрабатывается пачками по BULK_CSV_BATCH_SIZE строк
+BULK_MAX_DEVICES = 10000
+BULK_CSV_BATCH_SIZE = 1000
 
-def generate_inventory_number(company_id: int, device_type_id: int, db: Session) -> str:
-    """
-    Генерирует инвентарный номер в формате {COMPANY_CODE}-{DEVICE_TYPE_CODE}/{SEQUENTIAL_NUMBER}
-    Например: WWP-02/0022
-    """
-    # Получаем коды компании и типа устройства
-    company = db.query(Company).filter(Company.id == company_id).first()
-    device_type = db.query(DeviceType).filter(DeviceType.id == device_type_id).first()
-    
-    if not company or not device_type:
-        raise ValueError("Company or DeviceType not found")
-    
-    company_code = company.code
-    device_type_code = device_type.code
-    
-    # Ищем все устройства с такой же компанией и типом устройства
-    devices = db.query(Device).filter(
-        Device.company_id == company_id,
-        Device.device_type_id == device_type_id
-    ).all()
-    
-    # Извлекаем порядковые номера из существующих инвентарных номеров
-    max_sequence = 0
-    pattern = re.compile(rf"^{re.escape(company_code)}-{re.escape(device_type_code)}/(\d+)$")
-    
-    for device in devices:
-        match = pattern.match(device.inventory_number)
-        if match:
-            sequence = int(match.group(1))
-            max_sequence = max(max_sequence, sequence)
-    
-    # Увеличиваем на 1
-    next_sequence = max_sequence + 1
-    
-    # Формируем номер (4 цифры с ведущими нулями)
-    return f"{company_code}-{device_type_code}/{next_sequence:04d}"
+# Ограничение на количество номеров в одном запросе пакетного поиска
+LOOKUP_MAX_NUMBERS = 10000
 
 
-@router.get("/", response_model=List[DeviceResponse])
+@router.get(
+    "/",
+    response_model=Union[List[DeviceExpandedResponse], DevicePage],
+    dependencies=[Depends(table_etag(*DEVICE_TABLES))],
+)
 def read_devices(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     device_type_id: Optional[int] = None,
     brand_id: Optional[int] = None,
     location_type: Optional[LocationType] = None,
     location_id: Optional[int] = None,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Device)
+    """
+    Список устройств.
+    
+    С параметром cursor (пустым для первой страницы) возвращает {items, next_cursor}
+    с keyset-пагинацией по id. Без cursor - прежний режим skip/limit со списком.
+    expand=brand,model,device_type,company,location разворачивает справочники.
+    """
+    expand_set = parse_expand(expand)
+    query = db.query(Device).options(*expand_options(expand_set))
     
     if device_type_id:
         query = query.filter(Device.device_type_id == device_type_id)
@@ -78,8 +86,18 @@ def read_devices(
     if location_id:
         query = query.filter(Device.current_location_id == location_id)
     
-    devices = query.offset(skip).limit(limit).all()
-    return devices
+    if cursor is None:
+        devices = query.offset(skip).limit(limit).all()
+        return expand_devices(db, devices, expand_set)
+    
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(Device.id > last_id)
+    
+    devices = query.order_by(Device.id).limit(limit + 1).all()
+    page = devices[:limit]
+    next_cursor = encode_cursor(page[-1].id) if page and len(devices) > limit else None
+    return DevicePage(items=expand_devices(db, page, expand_set), next_cursor=next_cursor)
 
 
 @router.post("/", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
@@ -89,7 +107,7 @@ def create_device(
     current_user: User = Depends(get_current_user)
 ):
     # Validate company
-    company = db.query(Company).filter(Company.id == device.company_id).first()
+    company = reference_cache.get(db, Company, device.company_id)
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -97,21 +115,21 @@ def create_device(
         )
     
     # Validate device type
-    device_type = db.query(DeviceType).filter(DeviceType.id == device.device_type_id).first()
+    device_type = reference_cache.get(db, DeviceType, device.device_type_id)
     if not device_type:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device type not found"
         )
     
-    brand = db.query(Brand).filter(Brand.id == device.brand_id).first()
+    brand = reference_cache.get(db, Brand, device.brand_id)
     if not brand:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Brand not found"
         )
     
-    model = db.query(Model).filter(Model.id == device.model_id).first()
+    model = reference_cache.get(db, Model, device.model_id)
     if not model:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -128,14 +146,15 @@ def create_device(
     # Generate inventory number if not provided
     inventory_number = device.inventory_number
     if not inventory_number:
-        inventory_number = generate_inventory_number(device.company_id, device.device_type_id, db)
-    
-    # Check if generated inventory number already exists
-    if db.query(Device).filter(Device.inventory_number == inventory_number).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Device with this inventory number already exists"
-        )
+        # Сгенерированный номер всегда свободен: при коллизии счетчик сдвигается
+        inventory_number = generate_inventory_number(db, company, device_type)
+    else:
+        if inventory_number_taken(db, inventory_number):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Device with this inventory number already exists"
+            )
+        sync_inventory_sequence(db, company, device_type, inventory_number)
     
     # Validate location
     if device.current_location_type == LocationType.EMPLOYEE:
@@ -146,7 +165,7 @@ def create_device(
                 detail="Employee not found"
             )
     elif device.current_location_type == LocationType.WAREHOUSE:
-        warehouse = db.query(Warehouse).filter(Warehouse.id == device.current_location_id).first()
+        warehouse = reference_cache.get(db, Warehouse, device.current_location_id)
         if not warehouse:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -157,40 +176,187 @@ def create_device(
     device_data["inventory_number"] = inventory_number
     db_device = Device(**device_data)
     db.add(db_device)
+    db.flush()
+    publish_event(db, "device.created", id=db_device.id, inventory_number=db_device.inventory_number)
     db.commit()
     db.refresh(db_device)
     return db_device
 
 
-@router.get("/by-inventory/{inventory_number}", response_model=DeviceResponse)
+@router.post("/bulk", response_model=DeviceBulkResult)
+def create_devices_bulk(
+    devices: List[Any],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массовое создание устройств из JSON-массива объектов с полями DeviceCreate.
+    Ошибки, в том числе валидации, возвращаются построчно (row - с 1).
+    """
+    if len(devices) > BULK_MAX_DEVICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many devices in one request (max {BULK_MAX_DEVICES}). Use CSV upload for larger imports."
+        )
+    
+    rows = []
+    errors = []
+    for row_number, values in enumerate(devices, start=1):
+        device, error = validate_device_row(row_number, values)
+        if error:
+            errors.append(error)
+        else:
+            rows.append((row_number, device))
+    
+    created = []
+    if rows:
+        created, import_errors = import_devices(db, rows)
+        errors.extend(import_errors)
+    if created:
+        publish_event(db, "device.bulk_created", count=len(created))
+    db.commit()
+    errors.sort(key=lambda item: item.row)
+    return DeviceBulkResult(created=created, errors=errors)
+
+
+@router.post("/bulk/csv", response_model=DeviceBulkResult)
+def create_devices_bulk_csv(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массовое создание устройств из CSV-файла.
+    
+    Колонки заголовка совпадают с полями DeviceCreate: company_id, device_type_id, brand_id,
+    model_id, serial_number, inventory_number (можно пустым), current_location_type,
+    current_location_id. Файл читается потоково, каждая пачка коммитится отдельно.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    
+    created = []
+    errors = []
+    batch = []
+    
+    def flush_batch():
+        batch_created, batch_errors = import_devices(db, batch)
+        if batch_created:
+            publish_event(db, "device.bulk_created", count=len(batch_created))
+        db.commit()
+        created.extend(batch_created)
+        errors.extend(batch_errors)
+        batch.clear()
+    
+    for row_number, row in enumerate(reader, start=1):
+        values = {key.strip(): (value.strip() or None) for key, value in row.items() if key and value is not None}
+        device, error = validate_device_row(row_number, values)
+        if error:
+            errors.append(error)
+        else:
+            batch.append((row_number, device))
+        if len(batch) >= BULK_CSV_BATCH_SIZE:
+            flush_batch()
+    
+    if batch:
+        flush_batch()
+    
+    errors.sort(key=lambda item: item.row)
+    return DeviceBulkResult(created=created, errors=errors)
+
+
+@router.get("/search", response_model=List[DeviceSearchResult])
+def search_devices_endpoint(
+    q: str = Query(..., min_length=1, max_length=100),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Поиск устройств по серийному/инвентарному номеру, модели, бренду и держателю"""
+    return [
+        DeviceSearchResult(
+            **DeviceResponse.model_validate(device).model_dump(),
+            model_name=model_name,
+            brand_name=brand_name,
+            location_name=location_name,
+            rank=rank,
+        )
+        for device, model_name, brand_name, location_name, rank in search_devices(db, q, skip=skip, limit=limit)
+    ]
+
+
+@router.post("/by-inventory/batch", response_model=DeviceInventoryLookupResult)
+def get_devices_by_inventory_numbers(
+    lookup: DeviceInventoryLookup,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Найти устройства по списку инвентарных номеров одним запросом (для пачки сканирований)"""
+    expand_set = parse_expand(expand)
+    inventory_numbers = list(dict.fromkeys(lookup.inventory_numbers))
+    if len(inventory_numbers) > LOOKUP_MAX_NUMBERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many inventory numbers in one request (max {LOOKUP_MAX_NUMBERS})"
+        )
+    
+    devices = []
+    if inventory_numbers:
+        devices = db.query(Device).options(*expand_options(expand_set)).filter(
+            Device.inventory_number.in_(inventory_numbers)
+        ).all()
+    
+    found = {device.inventory_number: device for device in expand_devices(db, devices, expand_set)}
+    return DeviceInventoryLookupResult(
+        found=found,
+        not_found=[number for number in inventory_numbers if number not in found],
+    )
+
+
+@router.get(
+    "/by-inventory/{inventory_number}",
+    response_model=DeviceExpandedResponse,
+    dependencies=[Depends(table_etag(*DEVICE_TABLES))],
+)
 def get_device_by_inventory_number(
     inventory_number: str,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Найти устройство по инвентарному номеру (для сканирования QR-кода)"""
-    db_device = db.query(Device).filter(Device.inventory_number == inventory_number).first()
+    expand_set = parse_expand(expand)
+    db_device = db.query(Device).options(*expand_options(expand_set)).filter(
+        Device.inventory_number == inventory_number
+    ).first()
     if db_device is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device with inventory number {inventory_number} not found"
         )
-    return db_device
+    return expand_devices(db, [db_device], expand_set)[0]
 
 
-@router.get("/{device_id}", response_model=DeviceResponse)
+@router.get(
+    "/{device_id}",
+    response_model=DeviceExpandedResponse,
+    dependencies=[Depends(table_etag(*DEVICE_TABLES))],
+)
 def read_device(
     device_id: int,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_device = db.query(Device).filter(Device.id == device_id).first()
+    expand_set = parse_expand(expand)
+    db_device = db.query(Device).options(*expand_options(expand_set)).filter(Device.id == device_id).first()
     if db_device is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found"
         )
-    return db_device
+    return expand_devices(db, [db_device], expand_set)[0]
 
 
 @router.put("/{device_id}", response_model=DeviceResponse)
@@ -224,7 +390,7 @@ def update_device(
     
     # Validate references if updating
     if device.device_type_id:
-        device_type = db.query(DeviceType).filter(DeviceType.id == device.device_type_id).first()
+        device_type = reference_cache.get(db, DeviceType, device.device_type_id)
         if not device_type:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -232,7 +398,7 @@ def update_device(
             )
     
     if device.brand_id:
-        brand = db.query(Brand).filter(Brand.id == device.brand_id).first()
+        brand = reference_cache.get(db, Brand, device.brand_id)
         if not brand:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -240,7 +406,7 @@ def update_device(
             )
     
     if device.model_id:
-        model = db.query(Model).filter(Model.id == device.model_id).first()
+        model = reference_cache.get(db, Model, device.model_id)
         if not model:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -248,10 +414,25 @@ def update_device(
             )
     
     update_data = device.model_dump(exclude_unset=True)
+    previous_inventory_number = db_device.inventory_number
+    previous_device_type_id = db_device.device_type_id
     for field, value in update_data.items():
         setattr(db_device, field, value)
     
+    # Номер в формате пары, заданный вручную, поднимает ее счетчик
+    if (db_device.inventory_number != previous_inventory_number
+            or db_device.device_type_id != previous_device_type_id):
+        sync_inventory_sequence(
+            db,
+            reference_cache.get(db, Company, db_device.company_id),
+            reference_cache.get(db, DeviceType, db_device.device_type_id),
+            db_device.inventory_number,
+        )
+    
+    publish_event(db, "device.updated", id=db_device.id)
     db.commit()
+    if db_device.inventory_number != previous_inventory_number:
+        qr_cache.invalidate(previous_inventory_number)
     db.refresh(db_device)
     return db_device
 
@@ -269,7 +450,10 @@ def delete_device(
             detail="Device not found"
         )
     
+    inventory_number = db_device.inventory_number
     db.delete(db_device)
+    publish_event(db, "device.deleted", id=device_id)
     db.commit()
+    qr_cache.invalidate(inventory_number)
     return None
 
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
 from ..models.employee import Employee, EmployeeStatus
 from ..models.device import Device, LocationType
 from ..schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
-from ..schemas.device import DeviceResponse
+from ..schemas.device import DeviceExpandedResponse
 from ..services.auth import get_current_user
+from ..services.etag import table_etag, DEVICE_TABLES
+from ..services.device_expand import parse_expand, expand_options, expand_devices
 from ..models.user import User
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
 
-@router.get("/", response_model=List[EmployeeResponse])
+@router.get("/", response_model=List[EmployeeResponse], dependencies=[Depends(table_etag("employees"))])
 def read_employees(
     skip: int = 0,
     limit: int = 100,
@@ -48,7 +50,7 @@ def create_employee(
     return db_employee
 
 
-@router.get("/{employee_id}", response_model=EmployeeResponse)
+@router.get("/{employee_id}", response_model=EmployeeResponse, dependencies=[Depends(table_etag("employees"))])
 def read_employee(
     employee_id: int,
     db: Session = Depends(get_db),
@@ -63,13 +65,19 @@ def read_employee(
     return db_employee
 
 
-@router.get("/{employee_id}/devices", response_model=List[DeviceResponse])
+@router.get(
+    "/{employee_id}/devices",
+    response_model=List[DeviceExpandedResponse],
+    dependencies=[Depends(table_etag(*DEVICE_TABLES))],
+)
 def get_employee_devices(
     employee_id: int,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получить список устройств, которые находятся у сотрудника"""
+    expand_set = parse_expand(expand)
     employee = db.query(Employee).filter(Employee.id == employee_id).first()
     if not employee:
         raise HTTPException(
@@ -77,12 +85,12 @@ def get_employee_devices(
             detail="Employee not found"
         )
     
-    devices = db.query(Device).filter(
+    devices = db.query(Device).options(*expand_options(expand_set)).filter(
         Device.current_location_type == LocationType.EMPLOYEE,
         Device.current_location_id == employee_id
     ).all()
     
-    return devices
+    return expand_devices(db, devices, expand_set)
 
 
 @router.put("/{employee_id}", response_model=EmployeeResponse)
@@ -0,0 +1,107 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..database import SessionLocal
+from ..services.auth import get_user_by_token
+from ..services.events import event_broker, format_sse
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Группы событий для параметра types
+EVENT_GROUPS = ("movement", "device", "inventory")
+
+
+def _authenticate(token: Optional[str]) -> None:
+    # Сессия закрывается сразу: поток живет долго и не должен держать соединение из пула
+    db = SessionLocal()
+    try:
+        get_user_by_token(db, token)
+    finally:
+        db.close()
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Last-Event-ID"
+        )
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    types: Optional[str] = None,
+    session_id: Optional[int] = None,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Поток событий (Server-Sent Events): перемещения, изменения устройств,
+    отметки инвентаризации. Вместо опроса /movements и статистики сессии.
+
+    Токен - только в заголовке Authorization (клиент читает поток через fetch):
+    в URL он попал бы в журналы доступа и прокси. types - группы через запятую
+    (movement,device,inventory), session_id - только события этой сессии
+    инвентаризации. При переподключении пропущенные события досылаются по
+    Last-Event-ID.
+    """
+    token = None
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    await run_in_threadpool(_authenticate, token)
+
+    groups = set(EVENT_GROUPS)
+    if types:
+        groups = {group.strip() for group in types.split(",") if group.strip()}
+        unknown = groups - set(EVENT_GROUPS)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown event types: {', '.join(sorted(unknown))}"
+            )
+    resume_from = _parse_last_event_id(last_event_id_header or last_event_id)
+
+    def wanted(item: dict) -> bool:
+        group = item["type"].split(".", 1)[0]
+        if group not in groups:
+            return False
+        if session_id is not None and group == "inventory":
+            return item["data"].get("session_id") == session_id
+        return True
+
+    async def event_stream():
+        queue, backlog = event_broker.subscribe(resume_from)
+        try:
+            yield f"retry: {settings.EVENT_HEARTBEAT_SECONDS * 1000}\n\n"
+            for item in backlog:
+                if wanted(item):
+                    yield format_sse(item)
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=settings.EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                if wanted(item):
+                    yield format_sse(item)
+        finally:
+            event_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
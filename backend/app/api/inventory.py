@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import false, insert, literal, select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
+import time
 
 from ..database import get_db
 from ..models.inventory_session import InventorySession, InventorySessionStatus
@@ -20,19 +22,42 @@ from ..schemas.inventory import (
     DeviceTypeBasic,
 )
 from ..services.auth import get_current_user
+from ..services.etag import mark_tables_changed, table_etag
+from ..services.events import publish_event
 from ..models.user import User
 from ..models.inventory_session import inventory_session_device_types
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+# Таблицы, от которых зависят ответы по сессиям инвентаризации (для ETag)
+SESSION_TABLES = ("inventory_sessions", "inventory_records", "device_types")
+
+
+def publish_record_event(db: Session, record: InventoryRecord) -> None:
+    """Событие отметки/снятия отметки для потока /events/stream"""
+    publish_event(
+        db,
+        "inventory.record_checked" if record.checked else "inventory.record_unchecked",
+        session_id=record.inventory_session_id,
+        record_id=record.id,
+        device_id=record.device_id,
+    )
+
 
 @router.post("/sessions", response_model=InventorySessionResponse, status_code=status.HTTP_201_CREATED)
 def create_inventory_session(
     session_data: InventorySessionCreate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Создать новую сессию инвентаризации"""
+    """
+    Создать новую сессию инвентаризации. Записи по всем устройствам выбранных
+    типов создаются одним INSERT ... SELECT в базе, без загрузки устройств
+    в Python. Длительность этапов - в заголовке Server-Timing, число записей -
+    в X-Records-Created.
+    """
+    started = time.perf_counter()
     # Проверяем, что типы устройств существуют
     device_types = db.query(DeviceType).filter(DeviceType.id.in_(session_data.device_type_ids)).all()
     if len(device_types) != len(session_data.device_type_ids):
@@ -41,46 +66,53 @@ def create_inventory_session(
             detail="One or more device types not found"
         )
     
-    # Создаем сессию
+    # Создаем сессию вместе с типами устройств
     db_session = InventorySession(
         name=session_data.name,
         description=session_data.description,
         status=InventorySessionStatus.ACTIVE,
         created_by_user_id=current_user.id,
+        device_types=device_types,
     )
     db.add(db_session)
     db.flush()
-    
-    # Добавляем типы устройств
-    for device_type in device_types:
-        db_session.device_types.append(device_type)
-    
-    # Получаем все устройства выбранных типов
-    devices = db.query(Device).filter(Device.device_type_id.in_(session_data.device_type_ids)).all()
-    
-    # Создаем записи для каждого устройства
-    for device in devices:
-        record = InventoryRecord(
-            inventory_session_id=db_session.id,
-            device_id=device.id,
-            checked=False,
-        )
-        db.add(record)
+    session_created = time.perf_counter()
+    
+    # Записи для каждого устройства выбранных типов - одним запросом в базе
+    result = db.execute(insert(InventoryRecord).from_select(
+        ["inventory_session_id", "device_id", "checked"],
+        select(
+            literal(db_session.id, InventoryRecord.inventory_session_id.type),
+            Device.id,
+            false(),
+        ).where(Device.device_type_id.in_(session_data.device_type_ids)).order_by(Device.id),
+    ))
+    mark_tables_changed(db, InventoryRecord.__tablename__)
+    records_created = time.perf_counter()
     
     db.commit()
-    db.refresh(db_session)
-    
-    # Загружаем device_types для ответа
-    db.refresh(db_session)
-    # Принудительная загрузка через запрос
-    db_session = db.query(InventorySession).options(
+    committed = time.perf_counter()
+    
+    response.headers["X-Records-Created"] = str(result.rowcount)
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={(end - start) * 1000:.1f}"
+        for name, start, end in (
+            ("session", started, session_created),
+            ("records", session_created, records_created),
+            ("commit", records_created, committed),
+        )
+    )
+    # Сессия с типами устройств для ответа - одним запросом
+    return db.query(InventorySession).options(
         joinedload(InventorySession.device_types)
     ).filter(InventorySession.id == db_session.id).first()
-    
-    return db_session
 
 
-@router.get("/sessions", response_model=List[InventorySessionResponse])
+@router.get(
+    "/sessions",
+    response_model=List[InventorySessionResponse],
+    dependencies=[Depends(table_etag(*SESSION_TABLES))],
+)
 def get_inventory_sessions(
     status: Optional[InventorySessionStatus] = None,
     db: Session = Depends(get_db),
@@ -94,7 +126,11 @@ def get_inventory_sessions(
     return sessions
 
 
-@router.get("/sessions/{session_id}", response_model=InventorySessionResponse)
+@router.get(
+    "/sessions/{session_id}",
+    response_model=InventorySessionResponse,
+    dependencies=[Depends(table_etag(*SESSION_TABLES))],
+)
 def get_inventory_session(
     session_id: int,
     db: Session = Depends(get_db),
@@ -139,7 +175,11 @@ def update_inventory_session(
     return session
 
 
-@router.get("/sessions/{session_id}/devices", response_model=List[InventoryRecordResponse])
+@router.get(
+    "/sessions/{session_id}/devices",
+    response_model=List[InventoryRecordResponse],
+    dependencies=[Depends(table_etag(*SESSION_TABLES, "devices"))],
+)
 def get_session_devices(
     session_id: int,
     checked: Optional[bool] = None,
@@ -164,7 +204,11 @@ def get_session_devices(
     return records
 
 
-@router.get("/sessions/{session_id}/statistics", response_model=InventoryStatistics)
+@router.get(
+    "/sessions/{session_id}/statistics",
+    response_model=InventoryStatistics,
+    dependencies=[Depends(table_etag(*SESSION_TABLES))],
+)
 def get_session_statistics(
     session_id: int,
     db: Session = Depends(get_db),
@@ -258,6 +302,8 @@ def create_inventory_record(
         )
         db.add(record)
     
+    db.flush()
+    publish_record_event(db, record)
     db.commit()
     db.refresh(record)
     return record
@@ -304,6 +350,8 @@ def update_inventory_record(
     if 'notes' in update_data:
         record.notes = update_data['notes']
     
+    db.flush()
+    publish_record_event(db, record)
     db.commit()
     db.refresh(record)
     return record
@@ -346,6 +394,8 @@ def check_inventory_record(
     if notes:
         record.notes = notes
     
+    db.flush()
+    publish_record_event(db, record)
     db.commit()
     db.refresh(record)
     
@@ -386,6 +436,8 @@ def uncheck_inventory_record(
     record.checked_at = None
     record.checked_by_user_id = None
     
+    db.flush()
+    publish_record_event(db, record)
     db.commit()
     db.refresh(record)
     
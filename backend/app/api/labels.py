@@ -1,44 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse
+from datetime import timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, status
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Optional
-import qrcode
-from io import BytesIO
+from typing import Iterator, List, Optional
 import base64
+import os
 from jose import jwt, JWTError
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..models.device import Device
 from ..models.brand import Brand
 from ..models.model import Model
-from ..services.auth import get_current_user
+from ..services.auth import get_current_user, get_user_by_token
+from ..services.reference_cache import reference_cache
+from ..services.qr_cache import QR_MEDIA_TYPES, qr_cache
+from ..services.label_pdf import stream_label_pdf
+from ..services.labels import LABEL_FORMATS, iter_labels_html, label_pages, qr_image_html, qr_print_size
+from ..services.label_jobs import label_job_device_ids, label_jobs, submit_label_job
+from ..services.thermal_labels import (
+    THERMAL_MEDIA_TYPES, SpoolError, iter_thermal_labels, spool_to_printer, thermal_printers,
+)
+from ..services.jobs import DONE
+from ..schemas.label import (
+    LabelJobCreate, LabelJobResponse, LabelSelection, ThermalPrintRequest, ThermalPrintResult,
+)
 from ..models.user import User
 from ..config import settings
 
 router = APIRouter(prefix="/labels", tags=["labels"])
 
+# Допустимый размер QR-кода в пикселях: каждый размер - отдельная запись кэша
+QR_MIN_SIZE = 32
+QR_MAX_SIZE = 2000
 
-def generate_qr_code(data: str, size: int = 200) -> str:
-    """Генерирует QR-код и возвращает base64 строку"""
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=2,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img = img.resize((size, size))
-    
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    return img_str
+# Формат изображения QR-кода: png (однобитный, целое число пикселей на модуль) или svg
+QR_IMAGE_FORMAT_PATTERN = "^(png|svg)$"
+
+
+def generate_qr_code(data: str, size: int = 200, image_format: str = "png") -> str:
+    """Возвращает QR-код base64 строкой; изображения берутся из qr_cache"""
+    return base64.b64encode(qr_cache.get_image(data, size, image_format)).decode()
+
+
+def qr_code_data_url(data: str, size: int = 200, image_format: str = "png") -> str:
+    return f"data:{QR_MEDIA_TYPES[image_format]};base64,{generate_qr_code(data, size, image_format)}"
 
 
-async def get_user_from_token_optional(
+def get_user_from_token_optional(
     token: Optional[str] = None,
     db: Session = Depends(get_db),
 ) -> Optional[User]:
@@ -64,10 +73,56 @@ async def get_user_from_token_optional(
     return user
 
 
-@router.get("/print", response_class=HTMLResponse)
-async def print_labels(
+def _stream_pdf(device_ids: List[int], label_format: dict) -> Iterator[bytes]:
+    # Своя сессия: генератор выполняется уже после выхода из эндпоинта
+    db = SessionLocal()
+    try:
+        pages = label_pages(db, device_ids, label_format["per_page"], "svg", 0)
+        yield from stream_label_pdf(
+            ([dict(label, qr_svg=label["image"]) for label in page] for page in pages),
+            label_format,
+        )
+    finally:
+        db.close()
+
+
+# Наклеек, загружаемых из базы за один раз при выводе команд термопринтера
+THERMAL_PAGE_LABELS = 500
+
+# Ответы в OpenAPI для режимов, которые отдают файл вместо JSON/HTML
+_BINARY_SCHEMA = {"schema": {"type": "string", "format": "binary"}}
+THERMAL_RESPONSE_CONTENT = {"text/plain": _BINARY_SCHEMA}
+
+
+def _stream_thermal(device_ids: List[int], language: str, label_format: dict, dpi: int) -> Iterator[bytes]:
+    # Своя сессия, как у _stream_pdf; изображения QR не нужны - код строит принтер
+    db = SessionLocal()
+    try:
+        for page in label_pages(db, device_ids, THERMAL_PAGE_LABELS, None, 0):
+            yield b"".join(iter_thermal_labels([page], language, label_format, dpi))
+    finally:
+        db.close()
+
+
+def _thermal_response(device_ids: List[int], language: str, label_format: dict, dpi: int) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_thermal(device_ids, language, label_format, dpi),
+        media_type=THERMAL_MEDIA_TYPES[language],
+        headers={"Content-Disposition": f"attachment; filename=labels.{language}"},
+    )
+
+
+@router.get(
+    "/print",
+    response_class=HTMLResponse,
+    responses={200: {"content": {"application/pdf": _BINARY_SCHEMA, **THERMAL_RESPONSE_CONTENT}}},
+)
+def print_labels(
     device_ids: str,  # comma-separated device IDs
     format: str = "38x21",  # 38x21, 50x25, 70x36, 100x50
+    image_format: str = Query("svg", pattern=QR_IMAGE_FORMAT_PATTERN),
+    output: str = Query("html", pattern="^(html|pdf|zpl|epl)$"),
+    dpi: int = 203,  # разрешение термопринтера для zpl/epl: 203 или 300
     token: Optional[str] = None,  # Token для авторизации через URL (альтернатива заголовку)
     db: Session = Depends(get_db),
     url_token_user: Optional[User] = Depends(get_user_from_token_optional),
@@ -81,7 +136,19 @@ async def print_labels(
     - 70x36 мм (Avery L7160) - 12 наклеек на A4
     - 100x50 мм - 8 наклеек на A4
     
+    image_format: svg (по умолчанию, встраивается в страницу) или png
+    (однобитный, под печать с разрешением 300 dpi)
+    
+    output=pdf - готовый PDF вместо HTML: листы A4 формируются и отдаются
+    по одному, наклейки в порядке device_ids (для тысяч устройств)
+    
+    output=zpl или epl - команды термопринтера (Zebra ZPL II или EPL2),
+    по одному блоку на устройство; QR-код строит сам принтер
+    
     Авторизация: токен из URL параметра (для использования в браузере через Linking)
+    
+    Обработчик синхронный - FastAPI выполняет его в пуле потоков, а промахи
+    кэша QR рисуются пулом процессов, так что event loop не блокируется.
     """
     # Требуем токен в URL параметре для использования в браузере
     if not url_token_user:
@@ -99,176 +166,55 @@ async def print_labels(
             detail="No device IDs provided"
         )
     
-    devices = db.query(Device).filter(Device.id.in_(device_id_list)).all()
-    
-    if len(devices) != len(device_id_list):
+    found = db.query(func.count(Device.id)).filter(Device.id.in_(device_id_list)).scalar()
+    if found != len(set(device_id_list)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Some devices not found"
         )
     
-    # Форматы наклеек (ширина x высота в мм, количество на листе)
-    formats = {
-        "38x21": {"width": 38, "height": 21, "per_page": 24, "cols": 4, "rows": 6},
-        "50x25": {"width": 50, "height": 25, "per_page": 21, "cols": 3, "rows": 7},
-        "70x36": {"width": 70, "height": 36, "per_page": 12, "cols": 3, "rows": 4},
-        "100x50": {"width": 100, "height": 50, "per_page": 8, "cols": 2, "rows": 4},
-    }
-    
-    if format not in formats:
+    if format not in LABEL_FORMATS:
         format = "38x21"
     
-    label_format = formats[format]
+    label_format = LABEL_FORMATS[format]
     
-    # Генерируем QR-коды для всех устройств
-    qr_codes = []
-    for device in devices:
-        qr_data = device.inventory_number  # QR код содержит инвентарный номер
-        qr_code_base64 = generate_qr_code(qr_data, size=label_format["width"] - 10)
-        
-        # Получаем модель устройства
-        model = db.query(Model).filter(Model.id == device.model_id).first()
-        model_name = model.name if model else "Не указана"
-        
-        qr_codes.append({
-            "device": device,
-            "qr_code": qr_code_base64,
-            "model_name": model_name,
-        })
-    
-    # Генерируем HTML
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Печать наклеек</title>
-        <style>
-            @page {{
-                size: A4;
-                margin: 0;
-            }}
-            body {{
-                margin: 0;
-                padding: 10mm;
-                font-family: Arial, sans-serif;
-            }}
-            .labels-container {{
-                display: grid;
-                grid-template-columns: repeat({label_format["cols"]}, 1fr);
-                gap: 2mm;
-                width: 100%;
-            }}
-            .label {{
-                width: {label_format["width"]}mm;
-                height: {label_format["height"]}mm;
-                border: 1px solid #ccc;
-                padding: 2mm;
-                box-sizing: border-box;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                page-break-inside: avoid;
-            }}
-            .qr-code {{
-                width: {label_format["width"] - 10}mm;
-                height: {label_format["width"] - 10}mm;
-                margin-bottom: 1mm;
-            }}
-            .qr-code img {{
-                width: 100%;
-                height: 100%;
-                object-fit: contain;
-            }}
-            .label-text {{
-                font-size: {max(6, label_format["width"] / 6)}pt;
-                text-align: center;
-                margin-top: 0.5mm;
-                line-height: 1.2;
-            }}
-            .label-text-bold {{
-                font-weight: bold;
-            }}
-            .inventory-number {{
-                font-size: {max(7, label_format["width"] / 5)}pt;
-                font-weight: bold;
-                text-align: center;
-                margin-top: 1mm;
-            }}
-            @media print {{
-                body {{
-                    margin: 0;
-                    padding: 0;
-                }}
-                .no-print {{
-                    display: none;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="no-print" style="margin-bottom: 20px; padding: 20px; background: #f5f5f5; border-radius: 8px;">
-            <h2>Печать наклеек - Формат {format} мм</h2>
-            <p><strong>Количество устройств:</strong> {len(devices)}</p>
-            <div style="margin: 15px 0;">
-                <p style="margin-bottom: 10px;"><strong>Инструкция:</strong></p>
-                <ol style="margin-left: 20px; margin-bottom: 15px;">
-                    <li>Нажмите кнопку "Печать" ниже</li>
-                    <li>В диалоге печати выберите нужный принтер</li>
-                    <li>Убедитесь, что выбрана правильная бумага (A4, наклейки)</li>
-                    <li>Настройте параметры печати (масштаб 100%, без полей)</li>
-                    <li>Нажмите "Печать"</li>
-                </ol>
-            </div>
-            <div style="display: flex; gap: 10px;">
-                <button onclick="window.print()" style="padding: 10px 20px; font-size: 16px; background: #1890ff; color: white; border: none; border-radius: 4px; cursor: pointer;">
-                    🖨️ Печать (выбрать принтер)
-                </button>
-                <button onclick="window.close()" style="padding: 10px 20px; font-size: 16px; background: #ccc; color: #333; border: none; border-radius: 4px; cursor: pointer;">
-                    Закрыть
-                </button>
-            </div>
-            <div style="margin-top: 15px; padding: 10px; background: #fff3cd; border-radius: 4px; border: 1px solid #ffc107;">
-                <p style="margin: 0; font-size: 12px;">
-                    <strong>💡 Совет:</strong> В диалоге печати вы можете выбрать принтер из списка доступных устройств. 
-                    Убедитесь, что в принтере установлена бумага для наклеек формата {format} мм.
-                </p>
-            </div>
-        </div>
-        <div class="labels-container">
-    """
+    if output in ("zpl", "epl"):
+        if dpi not in (203, 300):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="dpi must be 203 or 300"
+            )
+        return _thermal_response(device_id_list, output, label_format, dpi)
     
-    for qr_data in qr_codes:
-        device = qr_data['device']
-        html += f"""
-            <div class="label">
-                <div class="qr-code">
-                    <img src="data:image/png;base64,{qr_data['qr_code']}" alt="QR Code">
-                </div>
-                <div class="label-text label-text-bold">{qr_data['model_name']}</div>
-                <div class="label-text">Сер: {device.serial_number}</div>
-                <div class="inventory-number">Инв: {device.inventory_number}</div>
-            </div>
-        """
-    
-    html += """
-        </div>
-    </body>
-    </html>
-    """
+    if output == "pdf":
+        return StreamingResponse(
+            _stream_pdf(device_id_list, label_format),
+            media_type="application/pdf",
+            headers={"Content-Disposition": "inline; filename=labels.pdf"},
+        )
     
+    # QR код содержит инвентарный номер; изображения и модели загружаются пакетом
+    labels = [
+        dict(label, qr_code=qr_image_html(label["image"], image_format))
+        for page in label_pages(db, device_id_list, len(device_id_list), image_format, qr_print_size(label_format))
+        for label in page
+    ]
+    html = "".join(iter_labels_html(format, label_format, len(labels), labels))
     return HTMLResponse(content=html)
 
 
 @router.get("/qr/{device_id}")
 def get_qr_code(
     device_id: int,
-    size: int = 200,
+    size: int = Query(200, ge=QR_MIN_SIZE, le=QR_MAX_SIZE),
+    image_format: str = Query("png", pattern=QR_IMAGE_FORMAT_PATTERN),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Получить QR-код для устройства"""
+    """
+    Получить QR-код для устройства (data URL). image_format=png - однобитный PNG
+    не больше size пикселей, svg - векторный, size не учитывается.
+    """
     device = db.query(Device).filter(Device.id == device_id).first()
     if not device:
         raise HTTPException(
@@ -276,17 +222,17 @@ def get_qr_code(
             detail="Device not found"
         )
     
-    qr_code_base64 = generate_qr_code(device.inventory_number, size=size)
     return {
         "device_id": device_id,
         "inventory_number": device.inventory_number,
-        "qr_code": f"data:image/png;base64,{qr_code_base64}"
+        "qr_code": qr_code_data_url(device.inventory_number, size, image_format)
     }
 
 
 @router.get("/label-data/{device_id}")
 def get_label_data(
     device_id: int,
+    image_format: str = Query("png", pattern=QR_IMAGE_FORMAT_PATTERN),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -299,17 +245,201 @@ def get_label_data(
         )
     
     # Получаем модель устройства
-    model = db.query(Model).filter(Model.id == device.model_id).first()
+    model = reference_cache.get(db, Model, device.model_id)
     model_name = model.name if model else "Не указана"
     
-    # Генерируем QR код
-    qr_code_base64 = generate_qr_code(device.inventory_number, size=200)
-    
     return {
         "device_id": device_id,
         "inventory_number": device.inventory_number,
         "serial_number": device.serial_number,
         "model_name": model_name,
-        "qr_code": f"data:image/png;base64,{qr_code_base64}",
+        "qr_code": qr_code_data_url(device.inventory_number, 200, image_format),
     }
 
+
+# Имена файлов хранилища QR-кодов: <хэш>/vector.svg или <хэш>/<размер>.png
+QR_IMAGE_DIGEST_PATTERN = "^[0-9a-f]{64}$"
+QR_IMAGE_NAME_PATTERN = r"^(vector\.svg|[0-9]{1,4}\.png)$"
+
+# Типы содержимого листов наклеек
+LABEL_JOB_MEDIA_TYPES = {"html": "text/html; charset=utf-8", "pdf": "application/pdf"}
+
+
+@router.get("/qr-image/{digest}/{name}")
+def get_qr_image(
+    digest: str = Path(..., pattern=QR_IMAGE_DIGEST_PATTERN),
+    name: str = Path(..., pattern=QR_IMAGE_NAME_PATTERN),
+):
+    """
+    Изображение QR-кода из хранилища по адресу содержимого - для ссылок
+    с листов наклеек. Без авторизации (тег img не передает токен): адрес -
+    HMAC с секретом сервера, его нельзя получить, не имея листа наклеек.
+    Неизменяем и кэшируется только браузером.
+    """
+    path = qr_cache.digest_path(digest, name)
+    if not path or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="QR image not found"
+        )
+    return FileResponse(
+        path,
+        media_type=QR_MEDIA_TYPES["svg" if name.endswith(".svg") else "png"],
+        headers={"Cache-Control": "private, max-age=31536000, immutable"},
+    )
+
+
+def _label_job_response(job: dict) -> LabelJobResponse:
+    return LabelJobResponse(
+        **{key: job[key] for key in LabelJobResponse.model_fields if key in job},
+        result_url=f"/api/labels/jobs/{job['id']}/result" if job["status"] == DONE else None,
+    )
+
+
+def _get_label_job(job_id: str) -> dict:
+    job = label_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Label job not found"
+        )
+    return job
+
+
+def _selection_params(db: Session, selection: LabelSelection) -> dict:
+    """Параметры выбора устройств: проверка device_ids и фильтров, дата - в ISO с часовым поясом"""
+    params = selection.model_dump(exclude_none=True)
+    filters = {"warehouse_id", "employee_id", "device_type_id", "company_id", "created_after"}
+    if not selection.device_ids and not filters & params.keys():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify device_ids or at least one filter"
+        )
+    if selection.device_ids:
+        found = db.query(func.count(Device.id)).filter(Device.id.in_(selection.device_ids)).scalar()
+        if found != len(set(selection.device_ids)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Some devices not found"
+            )
+    if selection.created_after:
+        created_after = selection.created_after
+        if created_after.tzinfo is None:
+            created_after = created_after.replace(tzinfo=timezone.utc)
+        params["created_after"] = created_after.isoformat()
+    return params
+
+
+@router.post("/jobs", response_model=LabelJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_label_job(
+    job_in: LabelJobCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Сформировать лист наклеек в фоне: по списку device_ids (порядок сохраняется)
+    и/или по фильтру (склад, сотрудник, тип, компания, созданные после даты).
+    Готовый лист (HTML или PDF) - по result_url из GET /labels/jobs/{id}.
+    В HTML QR-коды подключаются ссылками на /labels/qr-image/..., которые
+    браузер кэширует. Такое же задание при неизменных данных переиспользуется.
+    """
+    params = _selection_params(db, job_in)
+    job = submit_label_job(db, params, str(request.base_url), current_user.id)
+    return _label_job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=LabelJobResponse)
+def get_label_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Статус и прогресс задания печати наклеек"""
+    return _label_job_response(_get_label_job(job_id))
+
+
+@router.get("/jobs/{job_id}/result")
+def get_label_job_result(
+    job_id: str,
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Готовый лист наклеек. Открывается в браузере, поэтому токен можно
+    передать параметром token вместо заголовка Authorization.
+    """
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    get_user_by_token(db, token)
+
+    job = _get_label_job(job_id)
+    if job["status"] != DONE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Label job is {job['status']}"
+        )
+    path = label_jobs.result_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Label sheet has expired"
+        )
+    return FileResponse(
+        path,
+        media_type=LABEL_JOB_MEDIA_TYPES[job["format"]],
+        headers={"Content-Disposition": f"inline; filename=labels.{job['format']}"},
+    )
+
+
+@router.post(
+    "/thermal",
+    response_model=ThermalPrintResult,
+    responses={
+        200: {
+            "description": "JSON с итогом печати при printer, иначе команды принтера потоком",
+            "content": THERMAL_RESPONSE_CONTENT,
+        },
+        502: {"description": "Принтер недоступен; в detail - сколько наклеек уже отправлено"},
+    },
+)
+def print_thermal_labels(
+    print_in: ThermalPrintRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Пакетная печать на термопринтер (ZPL или EPL) по списку device_ids и/или
+    фильтру, как в POST /labels/jobs. С printer (имя из THERMAL_PRINTERS)
+    команды отправляются на принтер по TCP пачками по THERMAL_SPOOL_BATCH_LABELS
+    наклеек; без printer - возвращаются потоком (text/plain) для отправки
+    с клиента.
+    
+    Команды формируются до соединения с принтером, и сессия с базой
+    закрывается, чтобы медленный принтер не удерживал соединение из пула.
+    """
+    params = _selection_params(db, print_in)
+    label_format = LABEL_FORMATS[print_in.format]
+    device_ids = label_job_device_ids(db, params)
+
+    if not print_in.printer:
+        return _thermal_response(device_ids, print_in.language, label_format, print_in.dpi)
+
+    printers = thermal_printers()
+    if print_in.printer not in printers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown printer: {print_in.printer}"
+        )
+    host, port = printers[print_in.printer]
+    pages = label_pages(db, device_ids, THERMAL_PAGE_LABELS, None, 0)
+    blocks = list(iter_thermal_labels(pages, print_in.language, label_format, print_in.dpi))
+    db.close()
+    try:
+        labels, sent = spool_to_printer(host, port, blocks, settings.THERMAL_SPOOL_BATCH_LABELS)
+    except SpoolError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Printer is not reachable: {e}; sent {e.labels} of {len(blocks)} labels ({e.bytes} bytes)"
+        )
+    return ThermalPrintResult(printer=print_in.printer, labels=labels, bytes=sent)
@@ -7,12 +7,14 @@ from ..models.model import Model
 from ..models.brand import Brand
 from ..schemas.model import ModelCreate, ModelUpdate, ModelResponse
 from ..services.auth import get_current_user
+from ..services.etag import table_etag
+from ..services.reference_cache import reference_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/models", tags=["models"])
 
 
-@router.get("/", response_model=List[ModelResponse])
+@router.get("/", response_model=List[ModelResponse], dependencies=[Depends(table_etag("models"))])
 def read_models(
     skip: int = 0,
     limit: int = 100,
@@ -34,7 +36,7 @@ def create_model(
     current_user: User = Depends(get_current_user)
 ):
     # Check if brand exists
-    brand = db.query(Brand).filter(Brand.id == model.brand_id).first()
+    brand = reference_cache.get(db, Brand, model.brand_id)
     if not brand:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,7 +50,7 @@ def create_model(
     return db_model
 
 
-@router.get("/{model_id}", response_model=ModelResponse)
+@router.get("/{model_id}", response_model=ModelResponse, dependencies=[Depends(table_etag("models"))])
 def read_model(
     model_id: int,
     db: Session = Depends(get_db),
@@ -78,7 +80,7 @@ def update_model(
         )
     
     if model.brand_id:
-        brand = db.query(Brand).filter(Brand.id == model.brand_id).first()
+        brand = reference_cache.get(db, Brand, model.brand_id)
         if not brand:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -91,6 +93,7 @@ def update_model(
     
     db.commit()
     db.refresh(db_model)
+    reference_cache.invalidate(Model, model_id)
     return db_model
 
 
@@ -109,6 +112,7 @@ def delete_model(
     
     db.delete(db_model)
     db.commit()
+    reference_cache.invalidate(Model, model_id)
     return None
 
 
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from ..database import get_db
-from ..models.device import Device, LocationType
+from ..models.device import Device
 from ..models.movement_history import MovementHistory
-from ..models.employee import Employee, EmployeeStatus
-from ..models.warehouse import Warehouse
-from ..schemas.movement_history import MovementHistoryCreate, MovementHistoryResponse
+from ..schemas.movement_history import (
+    MovementHistoryCreate, MovementHistoryResponse, MovementHistoryPage, MovementBulkCreate, MovementBulkResult
+)
 from ..services.auth import get_current_user
+from ..services.pagination import encode_cursor, decode_cursor
+from ..services.device_movements import move_devices, validate_destination, BULK_MOVE_MAX_DEVICES
+from ..services.events import publish_event
 from ..models.user import User
 
 router = APIRouter(prefix="/movements", tags=["movements"])
@@ -40,62 +45,7 @@ def create_movement(
             detail="Устройство уже находится в выбранной локации. Перемещение в ту же локацию невозможно."
         )
     
-    # Validate destination location
-    location_name = ""  # Для сообщений об ошибках
-    if movement.to_location_type == LocationType.EMPLOYEE:
-        employee = db.query(Employee).filter(Employee.id == movement.to_location_id).first()
-        if not employee:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Employee not found"
-            )
-        
-        location_name = employee.full_name
-        
-        # Проверка: сотрудник должен быть активным
-        if employee.status != EmployeeStatus.ACTIVE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot move device to fired employee"
-            )
-        
-        # Проверка: у сотрудника не должно быть устройства с таким же инвентарным номером
-        existing_device = db.query(Device).filter(
-            Device.current_location_type == LocationType.EMPLOYEE,
-            Device.current_location_id == movement.to_location_id,
-            Device.inventory_number == device.inventory_number,
-            Device.id != device.id
-        ).first()
-        
-        if existing_device:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Employee already has a device with inventory number {device.inventory_number}"
-            )
-            
-    elif movement.to_location_type == LocationType.WAREHOUSE:
-        warehouse = db.query(Warehouse).filter(Warehouse.id == movement.to_location_id).first()
-        if not warehouse:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Warehouse not found"
-            )
-        
-        location_name = warehouse.name
-        
-        # Проверка: на складе не должно быть устройства с таким же инвентарным номером
-        existing_device = db.query(Device).filter(
-            Device.current_location_type == LocationType.WAREHOUSE,
-            Device.current_location_id == movement.to_location_id,
-            Device.inventory_number == device.inventory_number,
-            Device.id != device.id
-        ).first()
-        
-        if existing_device:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Warehouse already has a device with inventory number {device.inventory_number}"
-            )
+    validate_destination(db, movement.to_location_type, movement.to_location_id)
     
     # Create movement history record
     db_movement = MovementHistory(
@@ -112,26 +62,106 @@ def create_movement(
     device.current_location_id = movement.to_location_id
     
     db.add(db_movement)
+    db.flush()
+    publish_event(
+        db,
+        "movement.created",
+        id=db_movement.id,
+        device_id=db_movement.device_id,
+        from_location_type=from_location_type,
+        from_location_id=from_location_id,
+        to_location_type=db_movement.to_location_type,
+        to_location_id=db_movement.to_location_id,
+    )
     db.commit()
     db.refresh(db_movement)
     return db_movement
 
 
-@router.get("/", response_model=List[MovementHistoryResponse])
+@router.post("/bulk", response_model=MovementBulkResult)
+def create_movements_bulk(
+    movement: MovementBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массовое перемещение устройств в одну локацию одной транзакцией.
+    Результат возвращается по каждому устройству.
+    """
+    if not movement.device_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No devices to move"
+        )
+    if len(movement.device_ids) > BULK_MOVE_MAX_DEVICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many devices, maximum is {BULK_MOVE_MAX_DEVICES}"
+        )
+
+    moved, results = move_devices(
+        db,
+        movement.device_ids,
+        movement.to_location_type,
+        movement.to_location_id,
+        current_user.id,
+    )
+    if moved:
+        publish_event(
+            db,
+            "movement.bulk_created",
+            count=moved,
+            to_location_type=movement.to_location_type,
+            to_location_id=movement.to_location_id,
+        )
+    db.commit()
+    return MovementBulkResult(moved=moved, failed=len(results) - moved, results=results)
+
+
+@router.get("/", response_model=Union[List[MovementHistoryResponse], MovementHistoryPage])
 def read_movements(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     device_id: Optional[int] = None,
+    moved_from: Optional[datetime] = Query(None, alias="from"),
+    moved_to: Optional[datetime] = Query(None, alias="to"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    История перемещений, новые сверху.
+    
+    С параметром cursor (пустым для первой страницы) возвращает {items, next_cursor}
+    с keyset-пагинацией по (moved_at, id). Без cursor - прежний режим skip/limit.
+    Период from (включительно) - to (не включительно) ограничивает сканирование
+    нужными месячными секциями таблицы.
+    """
     query = db.query(MovementHistory)
     
     if device_id:
         query = query.filter(MovementHistory.device_id == device_id)
+    if moved_from:
+        query = query.filter(MovementHistory.moved_at >= moved_from)
+    if moved_to:
+        query = query.filter(MovementHistory.moved_at < moved_to)
+    
+    if cursor is None:
+        movements = query.order_by(MovementHistory.moved_at.desc()).offset(skip).limit(limit).all()
+        return movements
+    
+    if cursor:
+        last_moved_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(
+            tuple_(MovementHistory.moved_at, MovementHistory.id) < tuple_(last_moved_at, last_id)
+        )
     
-    movements = query.order_by(MovementHistory.moved_at.desc()).offset(skip).limit(limit).all()
-    return movements
+    movements = query.order_by(MovementHistory.moved_at.desc(), MovementHistory.id.desc()).limit(limit + 1).all()
+    page = movements[:limit]
+    next_cursor = None
+    if page and len(movements) > limit:
+        next_cursor = encode_cursor(page[-1].moved_at, page[-1].id)
+    return MovementHistoryPage(items=page, next_cursor=next_cursor)
 
 
 @router.get("/{movement_id}", response_model=MovementHistoryResponse)
@@ -1,22 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from fastapi.responses import StreamingResponse
-import csv
-import io
+from fastapi.responses import FileResponse, StreamingResponse
 
 from ..database import get_db
 from ..models.device import Device, LocationType
-from ..models.device_type import DeviceType
-from ..models.brand import Brand
-from ..models.employee import Employee
-from ..models.warehouse import Warehouse
 from ..schemas.device import DeviceResponse
+from ..schemas.report import (
+    AggregateReport, DeviceLocationAsOfPage, DeviceSummaryReport, ReportJobCreate, ReportJobResponse,
+)
 from ..services.auth import get_current_user
+from ..services.location_history import locations_as_of
+from ..services.reports import device_filters, stream_devices_csv, locations_report
+from ..services.device_summary import summary_report
+from ..services.analytics import AGGREGATE_MAX_ROWS, AGGREGATE_TABLES, aggregate_report
+from ..services.etag import table_etag
+from ..services.pagination import encode_cursor, decode_cursor
+from ..services.jobs import DONE
+from ..services.report_jobs import report_jobs, submit_report_job
 from ..models.user import User
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+# Наибольший размер страницы отчета о местоположении на момент времени
+AS_OF_MAX_LIMIT = 5000
+
 
 @router.get("/devices", response_model=List[DeviceResponse])
 def get_devices_report(
@@ -28,18 +38,8 @@ def get_devices_report(
     current_user: User = Depends(get_current_user)
 ):
     """Получить список устройств с фильтрацией"""
-    query = db.query(Device)
-    
-    if device_type_id:
-        query = query.filter(Device.device_type_id == device_type_id)
-    if brand_id:
-        query = query.filter(Device.brand_id == brand_id)
-    if location_type:
-        query = query.filter(Device.current_location_type == location_type)
-    if location_id:
-        query = query.filter(Device.current_location_id == location_id)
-    
-    devices = query.all()
+    conditions = device_filters(device_type_id, brand_id, location_type, location_id)
+    devices = db.query(Device).filter(*conditions).all()
     return devices
 
 
@@ -52,59 +52,10 @@ def export_devices_report(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Экспорт списка устройств в CSV"""
-    query = db.query(Device)
-    
-    if device_type_id:
-        query = query.filter(Device.device_type_id == device_type_id)
-    if brand_id:
-        query = query.filter(Device.brand_id == brand_id)
-    if location_type:
-        query = query.filter(Device.current_location_type == location_type)
-    if location_id:
-        query = query.filter(Device.current_location_id == location_id)
-    
-    devices = query.all()
-    
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        "ID", "Тип устройства", "Бренд", "Модель", 
-        "Серийный номер", "Инвентарный номер", 
-        "Тип локации", "Локация", "Дата создания"
-    ])
-    
-    # Write data
-    for device in devices:
-        device_type = db.query(DeviceType).filter(DeviceType.id == device.device_type_id).first()
-        brand = db.query(Brand).filter(Brand.id == device.brand_id).first()
-        
-        location_name = ""
-        if device.current_location_type == LocationType.EMPLOYEE:
-            employee = db.query(Employee).filter(Employee.id == device.current_location_id).first()
-            location_name = employee.full_name if employee else ""
-        elif device.current_location_type == LocationType.WAREHOUSE:
-            warehouse = db.query(Warehouse).filter(Warehouse.id == device.current_location_id).first()
-            location_name = warehouse.name if warehouse else ""
-        
-        writer.writerow([
-            device.id,
-            device_type.name if device_type else "",
-            brand.name if brand else "",
-            "",  # Model name would need join
-            device.serial_number,
-            device.inventory_number,
-            device.current_location_type.value,
-            location_name,
-            device.created_at.strftime("%Y-%m-%d %H:%M:%S") if device.created_at else ""
-        ])
-    
-    output.seek(0)
+    """Экспорт списка устройств в CSV (потоковая выгрузка)"""
+    conditions = device_filters(device_type_id, brand_id, location_type, location_id)
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_devices_csv(conditions),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=devices_report.csv"}
     )
@@ -113,58 +64,185 @@ def export_devices_report(
 @router.get("/locations")
 def get_locations_report(
     location_type: Optional[LocationType] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    counts_only: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Отчет по локациям - что где находится"""
-    result = []
+    """
+    Отчет по локациям - что где находится.
     
-    if not location_type or location_type == LocationType.WAREHOUSE:
-        warehouses = db.query(Warehouse).all()
-        for warehouse in warehouses:
-            devices = db.query(Device).filter(
-                Device.current_location_type == LocationType.WAREHOUSE,
-                Device.current_location_id == warehouse.id
-            ).all()
-            result.append({
-                "location_type": "warehouse",
-                "location_id": warehouse.id,
-                "location_name": warehouse.name,
-                "device_count": len(devices),
-                "devices": [
-                    {
-                        "id": d.id,
-                        "inventory_number": d.inventory_number,
-                        "serial_number": d.serial_number
-                    }
-                    for d in devices
-                ]
-            })
-    
-    if not location_type or location_type == LocationType.EMPLOYEE:
-        employees = db.query(Employee).all()
-        for employee in employees:
-            devices = db.query(Device).filter(
-                Device.current_location_type == LocationType.EMPLOYEE,
-                Device.current_location_id == employee.id
-            ).all()
-            result.append({
-                "location_type": "employee",
-                "location_id": employee.id,
-                "location_name": employee.full_name,
-                "phone_extension": employee.phone_extension,
-                "device_count": len(devices),
-                "devices": [
-                    {
-                        "id": d.id,
-                        "inventory_number": d.inventory_number,
-                        "serial_number": d.serial_number
-                    }
-                    for d in devices
-                ]
-            })
+    skip/limit - постраничный вывод по локациям (без limit - все),
+    counts_only - только количество устройств, без списков.
+    """
+    return locations_report(db, location_type, skip, limit, counts_only)
+
+
+@router.get("/locations/as-of", response_model=DeviceLocationAsOfPage)
+def get_locations_as_of(
+    at: datetime,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=AS_OF_MAX_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Где находилось каждое устройство на момент at (восстанавливается по истории перемещений).
+    Время без часового пояса считается UTC.
     
-    return result
+    Постранично по id устройства: {items, next_cursor}, следующая страница -
+    с cursor=next_cursor. Моменты раньше последнего перемещения в архиве отклоняются.
+    """
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    after_device_id = decode_cursor(cursor, int)[0] if cursor else None
+    items = locations_as_of(db, at, location_type, location_id, after_device_id, limit + 1)
+    page = items[:limit]
+    next_cursor = encode_cursor(page[-1].device_id) if len(items) > limit else None
+    return DeviceLocationAsOfPage(items=page, next_cursor=next_cursor)
+
+
+@router.get(
+    "/summary",
+    response_model=DeviceSummaryReport,
+    dependencies=[Depends(table_etag("device_summary", "companies", "device_types", "brands"))],
+)
+def get_summary_report(
+    company_id: Optional[int] = None,
+    device_type_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Сводные количества устройств по компаниям, типам, брендам и типам локаций"""
+    return summary_report(db, company_id, device_type_id, brand_id, location_type, location_id)
+
+
+@router.get(
+    "/aggregate",
+    response_model=AggregateReport,
+    dependencies=[Depends(table_etag(*AGGREGATE_TABLES))],
+)
+def get_aggregate_report(
+    source: str = "devices",
+    group_by: Optional[str] = None,
+    metrics: Optional[str] = None,
+    company_id: Optional[int] = None,
+    device_type_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    model_id: Optional[int] = None,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+    moved_by: Optional[int] = None,
+    moved_from: Optional[datetime] = Query(None, alias="from"),
+    moved_to: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(1000, ge=1, le=AGGREGATE_MAX_ROWS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Сводная таблица: количества, сгруппированные по измерениям (один GROUP BY в БД).
+
+    source: devices (текущее состояние) или movements (перемещения).
+    group_by: через запятую - company, device_type, brand, model, location_type,
+    warehouse, employee, day, week, month; для movements также to_location_type,
+    to_warehouse, to_employee, from_warehouse, from_employee, moved_by.
+    metrics: через запятую - count, distinct_devices, moves (по умолчанию count).
+    from/to: период перемещений (для devices ограничивает только метрику moves).
+    day/week/month - для devices по дате создания устройства, для movements по дате перемещения.
+    Для movements фильтры location_type/location_id относятся к месту назначения.
+
+    Пример: ?source=movements&group_by=week,to_warehouse&metrics=count,distinct_devices
+    """
+    return aggregate_report(
+        db, source, group_by, metrics,
+        company_id, device_type_id, brand_id, model_id,
+        location_type, location_id, moved_by, moved_from, moved_to, limit,
+    )
+
+
+# Типы содержимого файлов фоновых отчетов
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _job_response(job: dict) -> ReportJobResponse:
+    return ReportJobResponse(
+        **{key: job[key] for key in ReportJobResponse.model_fields if key in job},
+        result_url=f"/api/reports/jobs/{job['id']}/download" if job["status"] == DONE else None,
+    )
+
+
+def _get_job(job_id: str) -> dict:
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+    return job
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(
+    job_in: ReportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Поставить отчет (devices или locations) в фоновую очередь. Файл CSV/JSONL/XLSX
+    формируется на диске; статус и прогресс - GET /reports/jobs/{id}.
+    Если такой же отчет уже считается или был готов недавно и данные с тех пор
+    не менялись, возвращается существующая задача (reused=true).
+    """
+    if job_in.kind == "devices":
+        params = job_in.model_dump(include={"device_type_id", "brand_id", "location_type", "location_id"})
+    else:
+        params = job_in.model_dump(include={"location_type", "counts_only"})
+    params = {key: value for key, value in params.items() if value}
+    if params.get("location_type"):
+        params["location_type"] = params["location_type"].value
+    job = submit_report_job(db, job_in.kind, job_in.format, params, current_user.id)
+    return _job_response(job)
+
 
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+def get_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Статус и прогресс фонового отчета"""
+    return _job_response(_get_job(job_id))
 
 
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Скачать готовый файл фонового отчета"""
+    job = _get_job(job_id)
+    if job["status"] != DONE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report job is {job['status']}"
+        )
+    path = report_jobs.result_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report file has expired"
+        )
+    return FileResponse(
+        path,
+        media_type=REPORT_MEDIA_TYPES[job["format"]],
+        filename=f"{job['kind']}_report.{job['format']}",
+    )
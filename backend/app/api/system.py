@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+
+from ..services.auth import get_current_user
+from ..services.reference_cache import reference_cache
+from ..services.qr_cache import qr_cache
+from ..models.user import User
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Статистика кэшей процесса (попадания/промахи)"""
+    return {
+        "reference_cache": reference_cache.stats(),
+        "qr_cache": qr_cache.stats(),
+    }
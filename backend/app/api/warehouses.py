@@ -6,6 +6,7 @@ from ..database import get_db
 from ..models.warehouse import Warehouse
 from ..schemas.warehouse import WarehouseCreate, WarehouseUpdate, WarehouseResponse
 from ..services.auth import get_current_user
+from ..services.reference_cache import reference_cache
 from ..models.user import User
 
 router = APIRouter(prefix="/warehouses", tags=["warehouses"])
@@ -70,6 +71,7 @@ def update_warehouse(
     
     db.commit()
     db.refresh(db_warehouse)
+    reference_cache.invalidate(Warehouse, warehouse_id)
     return db_warehouse
 
 
@@ -88,6 +90,7 @@ def delete_warehouse(
     
     db.delete(db_warehouse)
     db.commit()
+    reference_cache.invalidate(Warehouse, warehouse_id)
     return None
 
 
@@ -14,6 +14,40 @@ class Settings(BaseSettings):
     # CORS (comma-separated string)
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173,http://localhost:3001"
     
+    # Кэш справочников (компании, типы, бренды, модели, склады)
+    REFERENCE_CACHE_TTL_SECONDS: int = 300
+    REFERENCE_CACHE_MAX_ENTRIES: int = 5000  # на каждую таблицу
+    
+    # Секции movement_history: сколько месяцев создавать заранее и через сколько лет переносить в архив
+    MOVEMENT_PARTITION_MONTHS_AHEAD: int = 3
+    MOVEMENT_ARCHIVE_AFTER_YEARS: int = 3
+    
+    # Поток событий (SSE): сколько последних событий хранить для Last-Event-ID и интервал keepalive
+    EVENT_BUFFER_SIZE: int = 1000
+    EVENT_QUEUE_SIZE: int = 1000  # очередь одного клиента; при переполнении соединение закрывается
+    EVENT_HEARTBEAT_SECONDS: int = 15
+    
+    # Фоновые задачи отчетов: каталог результатов, число потоков, окно переиспользования результата
+    REPORT_JOBS_DIR: str = "data/report_jobs"
+    REPORT_JOB_WORKERS: int = 2
+    REPORT_JOB_FRESHNESS_SECONDS: int = 300
+    REPORT_JOB_STALE_SECONDS: int = 600  # задача без прогресса дольше этого считается прерванной
+    REPORT_JOB_RETENTION_SECONDS: int = 86400
+    # Задания печати наклеек используют те же настройки очереди, но свой каталог
+    LABEL_JOBS_DIR: str = "data/label_jobs"
+    
+    # Кэш изображений QR-кодов: записей в памяти процесса и каталог на диске (пусто - без диска)
+    QR_CACHE_MAX_ENTRIES: int = 2000
+    QR_CACHE_DIR: str = "data/qr_cache"
+    # Отрисовка промахов пакета печати в пуле процессов (0 - по числу ядер), если промахов не меньше порога
+    QR_RENDER_WORKERS: int = 0
+    QR_PARALLEL_MIN_BATCH: int = 32
+    
+    # Термопринтеры (ZPL/EPL): имя=хост:порт через запятую, только на них разрешена отправка
+    THERMAL_PRINTERS: str = ""
+    THERMAL_SPOOL_BATCH_LABELS: int = 100  # наклеек в одной отправке по TCP
+    THERMAL_PRINTER_TIMEOUT_SECONDS: int = 10
+    
     class Config:
         env_file = ".env"
 
@@ -3,7 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
 from .database import engine, Base
-from .api import auth, companies, device_type, brand, model, employees, warehouses, devices, movements, reports, labels, inventory
+from .services.movement_partitions import ensure_movement_partitions
+from .api import auth, companies, device_type, brand, model, employees, warehouses, devices, movements, reports, labels, inventory, system, events
 
 # Create tables (only if they don't exist)
 # В production лучше использовать миграции Alembic
@@ -12,6 +13,13 @@ try:
 except Exception as e:
     print(f"Warning: Could not create tables: {e}")
 
+# Секции истории перемещений на ближайшие месяцы
+try:
+    with engine.begin() as connection:
+        ensure_movement_partitions(connection)
+except Exception as e:
+    print(f"Warning: Could not create movement_history partitions: {e}")
+
 app = FastAPI(
     title="WWP Inventory API",
     description="Система учета компьютерной техники",
@@ -41,6 +49,8 @@ app.include_router(movements.router, prefix="/api")
 app.include_router(reports.router, prefix="/api")
 app.include_router(labels.router, prefix="/api")
 app.include_router(inventory.router, prefix="/api")
+app.include_router(system.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
 
 
 @app.get("/")
@@ -6,9 +6,14 @@ from .model import Model
 from .employee import Employee
 from .warehouse import Warehouse
 from .device import Device
-from .movement_history import MovementHistory
+from .movement_history import MovementHistory, MovementHistoryArchive
 from .inventory_session import InventorySession
 from .inventory_record import InventoryRecord
+from .inventory_number_sequence import InventoryNumberSequence
+from .table_version import table_version_sequences
+from .location_checkpoint import LocationCheckpoint
+from .event import event_id_seq
+from .device_summary import DeviceSummary
 
 __all__ = [
     "User",
@@ -20,7 +25,13 @@ __all__ = [
     "Warehouse",
     "Device",
     "MovementHistory",
+    "MovementHistoryArchive",
     "InventorySession",
     "InventoryRecord",
+    "InventoryNumberSequence",
+    "table_version_sequences",
+    "LocationCheckpoint",
+    "event_id_seq",
+    "DeviceSummary",
 ]
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -12,6 +12,10 @@ class LocationType(str, enum.Enum):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        Index("ix_devices_location", "current_location_type", "current_location_id"),
+        Index("ix_devices_company_device_type", "company_id", "device_type_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -29,6 +33,9 @@ class Device(Base):
     device_type = relationship("DeviceType", back_populates="devices")
     brand = relationship("Brand", back_populates="devices")
     model = relationship("Model", back_populates="devices")
-    movement_history = relationship("MovementHistory", back_populates="device", order_by="MovementHistory.moved_at.desc()")
+    # dynamic: история может быть длинной, обращение возвращает запрос, а не весь список
+    movement_history = relationship(
+        "MovementHistory", back_populates="device", lazy="dynamic", order_by="MovementHistory.moved_at.desc()"
+    )
     inventory_records = relationship("InventoryRecord", back_populates="device")
 
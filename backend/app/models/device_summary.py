@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Enum
+from ..database import Base
+from .device import LocationType
+
+
+class DeviceSummary(Base):
+    """
+    Количество устройств по (компания, тип, бренд, локация). Поддерживается
+    в той же транзакции, что и изменения устройств (services.device_summary).
+    """
+    __tablename__ = "device_summary"
+
+    company_id = Column(Integer, primary_key=True)
+    device_type_id = Column(Integer, primary_key=True)
+    brand_id = Column(Integer, primary_key=True)
+    location_type = Column(Enum(LocationType), primary_key=True)
+    location_id = Column(Integer, primary_key=True)
+    device_count = Column(Integer, nullable=False, default=0)
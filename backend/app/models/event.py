@@ -0,0 +1,5 @@
+from sqlalchemy import Sequence
+from ..database import Base
+
+# Сквозная нумерация событий потока /api/events/stream (общая для всех воркеров)
+event_id_seq = Sequence("event_id_seq", metadata=Base.metadata)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from ..database import Base
+
+
+class InventoryNumberSequence(Base):
+    """Счетчик порядковых номеров инвентарных номеров для пары (компания, тип устройства)"""
+    __tablename__ = "inventory_number_sequences"
+
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    device_type_id = Column(Integer, ForeignKey("device_types.id", ondelete="CASCADE"), primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
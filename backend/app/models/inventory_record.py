@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Boolean, String
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Boolean, String, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -6,6 +6,10 @@ from ..database import Base
 
 class InventoryRecord(Base):
     __tablename__ = "inventory_records"
+    __table_args__ = (
+        Index("ix_inventory_records_session_checked", "inventory_session_id", "checked"),
+        Index("ix_inventory_records_session_device", "inventory_session_id", "device_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     inventory_session_id = Column(Integer, ForeignKey("inventory_sessions.id"), nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum
+from ..database import Base
+from .device import LocationType
+
+
+class LocationCheckpoint(Base):
+    """
+    Снимок местоположения всех устройств на момент taken_at. Запрос «где было
+    устройство на дату T» начинает с ближайшего снимка и читает историю
+    перемещений только после него.
+    """
+    __tablename__ = "location_checkpoints"
+
+    taken_at = Column(DateTime(timezone=True), primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    location_type = Column(Enum(LocationType), nullable=False)
+    location_id = Column(Integer, nullable=False)
+    moved_at = Column(DateTime(timezone=True), nullable=True)  # последнее перемещение до taken_at
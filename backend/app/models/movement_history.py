@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Index, PrimaryKeyConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -6,19 +6,59 @@ from .device import LocationType
 
 
 class MovementHistory(Base):
+    """
+    История перемещений. В PostgreSQL таблица секционирована по месяцам
+    (RANGE по moved_at), поэтому moved_at входит в первичный ключ.
+    Секции создает services.movement_partitions, старые переносятся в архив.
+    """
     __tablename__ = "movement_history"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "moved_at"),
+        Index("ix_movement_history_device_moved_at", "device_id", "moved_at"),
+        Index("ix_movement_history_moved_at_id", "moved_at", "id"),
+        {"postgresql_partition_by": "RANGE (moved_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, autoincrement=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     from_location_type = Column(Enum(LocationType), nullable=True)
     from_location_id = Column(Integer, nullable=True)
     to_location_type = Column(Enum(LocationType), nullable=False)
     to_location_id = Column(Integer, nullable=False)
-    moved_at = Column(DateTime(timezone=True), server_default=func.now())
+    moved_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     moved_by = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # id уникален сам по себе (последовательность), moved_at в ключе нужен только секционированию
+    __mapper_args__ = {"primary_key": [id]}
+
     device = relationship("Device", back_populates="movement_history")
     moved_by_user = relationship("User", back_populates="movements")
 
 
+# Секция по умолчанию принимает строки, для месяца которых еще нет своей секции
+event.listen(
+    MovementHistory.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS movement_history_default PARTITION OF movement_history DEFAULT")
+    .execute_if(dialect="postgresql"),
+)
+
 
+class MovementHistoryArchive(Base):
+    """
+    Архив перемещений старше срока хранения. Компактная таблица без внешних
+    ключей и с одним индексом: строки только добавляются и читаются по устройству.
+    """
+    __tablename__ = "movement_history_archive"
+    __table_args__ = (
+        Index("ix_movement_history_archive_device_moved_at", "device_id", "moved_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    device_id = Column(Integer, nullable=False)
+    from_location_type = Column(Enum(LocationType), nullable=True)
+    from_location_id = Column(Integer, nullable=True)
+    to_location_type = Column(Enum(LocationType), nullable=False)
+    to_location_id = Column(Integer, nullable=False)
+    moved_at = Column(DateTime(timezone=True), nullable=False)
+    moved_by = Column(Integer, nullable=False)
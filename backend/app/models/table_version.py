@@ -0,0 +1,32 @@
+from sqlalchemy import Sequence
+from ..database import Base
+
+# Таблицы, изменения которых отслеживаются для слабых ETag GET-эндпоинтов
+VERSIONED_TABLES = (
+    "users",
+    "companies",
+    "device_types",
+    "brands",
+    "models",
+    "employees",
+    "warehouses",
+    "devices",
+    "movement_history",
+    "movement_history_archive",
+    "inventory_sessions",
+    "inventory_records",
+    "inventory_number_sequences",
+    "location_checkpoints",
+    "device_summary",
+)
+
+
+def table_version_sequence(table: str) -> str:
+    return f"{table}_version_seq"
+
+
+# Счетчик изменений таблицы - последовательность, а не строка: nextval не
+# берет блокировку строки, и транзакции с записью в одну таблицу не ждут друг друга
+table_version_sequences = {
+    table: Sequence(table_version_sequence(table), metadata=Base.metadata) for table in VERSIONED_TABLES
+}
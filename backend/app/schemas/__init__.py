@@ -5,8 +5,34 @@ from .brand import BrandCreate, BrandUpdate, BrandResponse
 from .model import ModelCreate, ModelUpdate, ModelResponse
 from .employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
 from .warehouse import WarehouseCreate, WarehouseUpdate, WarehouseResponse
-from .device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceLocationUpdate
-from .movement_history import MovementHistoryCreate, MovementHistoryResponse
+from .device import (
+    DeviceCreate,
+    DeviceUpdate,
+    DeviceResponse,
+    DeviceLocationUpdate,
+    DeviceBulkCreated,
+    DeviceBulkError,
+    DeviceBulkResult,
+    DevicePage,
+    DeviceSearchResult,
+    DeviceExpandedResponse,
+    LocationBrief,
+    DeviceInventoryLookup,
+    DeviceInventoryLookupResult,
+)
+from .movement_history import (
+    MovementHistoryCreate,
+    MovementHistoryResponse,
+    MovementHistoryPage,
+    MovementBulkCreate,
+    MovementBulkItem,
+    MovementBulkResult,
+)
+from .label import LabelSelection, LabelJobCreate, LabelJobResponse, ThermalPrintRequest, ThermalPrintResult
+from .report import (
+    DeviceLocationAsOf, DeviceLocationAsOfPage, SummaryGroup, LocationTypeCount, DeviceSummaryReport,
+    ReportJobCreate, ReportJobResponse, AggregateReport,
+)
 
 __all__ = [
     "Token",
@@ -36,7 +62,33 @@ __all__ = [
     "DeviceUpdate",
     "DeviceResponse",
     "DeviceLocationUpdate",
+    "DeviceBulkCreated",
+    "DeviceBulkError",
+    "DeviceBulkResult",
+    "DevicePage",
+    "DeviceSearchResult",
+    "DeviceExpandedResponse",
+    "LocationBrief",
+    "DeviceInventoryLookup",
+    "DeviceInventoryLookupResult",
     "MovementHistoryCreate",
     "MovementHistoryResponse",
+    "MovementHistoryPage",
+    "MovementBulkCreate",
+    "MovementBulkItem",
+    "MovementBulkResult",
+    "DeviceLocationAsOf",
+    "DeviceLocationAsOfPage",
+    "SummaryGroup",
+    "LocationTypeCount",
+    "DeviceSummaryReport",
+    "ReportJobCreate",
+    "ReportJobResponse",
+    "AggregateReport",
+    "LabelSelection",
+    "LabelJobCreate",
+    "LabelJobResponse",
+    "ThermalPrintRequest",
+    "ThermalPrintResult",
 ]
 
@@ -1,7 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict
 from datetime import datetime
 from ..models.device import LocationType
+from .brand import BrandResponse
+from .model import ModelResponse
+from .device_type import DeviceTypeResponse
+from .company import CompanyResponse
 
 
 class DeviceCreate(BaseModel):
@@ -44,3 +48,59 @@ class DeviceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class DeviceBulkCreated(BaseModel):
+    row: int
+    id: int
+    serial_number: str
+    inventory_number: str
+
+
+class DeviceBulkError(BaseModel):
+    row: int
+    serial_number: Optional[str] = None
+    detail: str
+    # Номер, выданный строке из счетчика, но не сохраненный: в последовательности будет пропуск
+    unused_inventory_number: Optional[str] = None
+
+
+class DeviceBulkResult(BaseModel):
+    created: List[DeviceBulkCreated]
+    errors: List[DeviceBulkError]
+
+
+class LocationBrief(BaseModel):
+    type: LocationType
+    id: int
+    name: Optional[str] = None
+
+
+class DeviceExpandedResponse(DeviceResponse):
+    """Устройство с развернутыми справочниками (заполняются только запрошенные в expand)"""
+    brand: Optional[BrandResponse] = None
+    model: Optional[ModelResponse] = None
+    device_type: Optional[DeviceTypeResponse] = None
+    company: Optional[CompanyResponse] = None
+    location: Optional[LocationBrief] = None
+
+
+class DevicePage(BaseModel):
+    items: List[DeviceExpandedResponse]
+    next_cursor: Optional[str] = None
+
+
+class DeviceSearchResult(DeviceResponse):
+    model_name: str
+    brand_name: str
+    location_name: Optional[str] = None
+    rank: float
+
+
+class DeviceInventoryLookup(BaseModel):
+    inventory_numbers: List[str]
+
+
+class DeviceInventoryLookupResult(BaseModel):
+    found: Dict[str, DeviceExpandedResponse]
+    not_found: List[str]
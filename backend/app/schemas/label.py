@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+# Ограничение размера задания печати по списку id
+LABEL_JOB_MAX_DEVICE_IDS = 20000
+
+
+class LabelSelection(BaseModel):
+    # Явный список устройств (порядок сохраняется) или фильтр
+    device_ids: Optional[List[int]] = Field(None, max_length=LABEL_JOB_MAX_DEVICE_IDS)
+    warehouse_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    device_type_id: Optional[int] = None
+    company_id: Optional[int] = None
+    created_after: Optional[datetime] = None
+    format: Literal["38x21", "50x25", "70x36", "100x50"] = "38x21"
+
+
+class LabelJobCreate(LabelSelection):
+    image_format: Literal["svg", "png"] = "svg"
+    output: Literal["html", "pdf"] = "html"
+
+
+class LabelJobResponse(BaseModel):
+    id: str
+    status: str  # pending, running, done, failed
+    progress: int
+    total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    reused: bool = False  # возвращен ранее сформированный лист с теми же параметрами
+    result_url: Optional[str] = None
+
+
+class ThermalPrintRequest(LabelSelection):
+    language: Literal["zpl", "epl"] = "zpl"
+    dpi: Literal[203, 300] = 203
+    printer: Optional[str] = None  # имя из THERMAL_PRINTERS; без него команды возвращаются в ответе
+
+
+class ThermalPrintResult(BaseModel):
+    printer: str
+    labels: int
+    bytes: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from ..models.device import LocationType
 
@@ -24,4 +24,25 @@ class MovementHistoryResponse(BaseModel):
         from_attributes = True
 
 
+class MovementHistoryPage(BaseModel):
+    items: List[MovementHistoryResponse]
+    next_cursor: Optional[str] = None
 
+
+class MovementBulkCreate(BaseModel):
+    device_ids: List[int]
+    to_location_type: LocationType
+    to_location_id: int
+
+
+class MovementBulkItem(BaseModel):
+    device_id: int
+    moved: bool
+    movement_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class MovementBulkResult(BaseModel):
+    moved: int
+    failed: int
+    results: List[MovementBulkItem]
@@ -0,0 +1,74 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from ..models.device import LocationType
+
+
+class DeviceLocationAsOf(BaseModel):
+    device_id: int
+    inventory_number: str
+    serial_number: str
+    location_type: LocationType
+    location_id: int
+    location_name: Optional[str] = None
+    moved_at: Optional[datetime] = None  # последнее перемещение не позже заданного момента
+
+
+class DeviceLocationAsOfPage(BaseModel):
+    items: List[DeviceLocationAsOf]
+    next_cursor: Optional[str] = None
+
+
+class SummaryGroup(BaseModel):
+    id: int
+    name: Optional[str] = None
+    device_count: int
+
+
+class LocationTypeCount(BaseModel):
+    location_type: LocationType
+    device_count: int
+
+
+class DeviceSummaryReport(BaseModel):
+    total: int
+    by_company: List[SummaryGroup]
+    by_device_type: List[SummaryGroup]
+    by_brand: List[SummaryGroup]
+    by_location_type: List[LocationTypeCount]
+
+
+class ReportJobCreate(BaseModel):
+    kind: Literal["devices", "locations"]
+    format: Literal["csv", "jsonl", "xlsx"] = "csv"
+    # Фильтры отчета devices
+    device_type_id: Optional[int] = None
+    brand_id: Optional[int] = None
+    location_id: Optional[int] = None
+    # Общий фильтр
+    location_type: Optional[LocationType] = None
+    # Отчет locations: только количества, без списков устройств
+    counts_only: bool = False
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    kind: str
+    format: str
+    status: str  # pending, running, done, failed
+    progress: int
+    total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    reused: bool = False  # возвращен ранее посчитанный результат с теми же параметрами
+    result_url: Optional[str] = None
+
+
+class AggregateReport(BaseModel):
+    source: str
+    group_by: List[str]
+    metrics: List[str]
+    # Строка: значения измерений (для справочников - <измерение>_id и название) и метрики
+    rows: List[Dict[str, Any]]
+    truncated: bool = False  # строк больше limit
@@ -0,0 +1,256 @@
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, LocationType
+from ..models.movement_history import MovementHistory
+from ..models.company import Company
+from ..models.device_type import DeviceType
+from ..models.brand import Brand
+from ..models.model import Model
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+from ..models.user import User
+from ..schemas.report import AggregateReport
+from .reference_cache import reference_cache
+
+AGGREGATE_SOURCES = ("devices", "movements")
+AGGREGATE_METRICS = ("count", "distinct_devices", "moves")
+AGGREGATE_MAX_DIMENSIONS = 4
+AGGREGATE_MAX_ROWS = 10000
+
+# Периоды для группировки по времени (date_trunc)
+_PERIODS = ("day", "week", "month")
+
+# Таблицы, от которых зависит результат (для ETag)
+AGGREGATE_TABLES = (
+    "devices", "movement_history", "companies", "device_types", "brands",
+    "models", "warehouses", "employees", "users",
+)
+
+
+class Dimension(NamedTuple):
+    expression: object
+    condition: Optional[object] = None  # условие, без которого измерение не имеет смысла
+    names: Optional[Callable] = None  # (db, ids) -> {id: название}
+    movements_only: bool = False
+
+
+def _cached_names(model) -> Callable:
+    def load(db: Session, ids: Iterable[int]) -> Dict[int, str]:
+        return {obj_id: obj.name for obj_id, obj in reference_cache.get_many(db, model, ids).items()}
+    return load
+
+
+def _query_names(column, name) -> Callable:
+    def load(db: Session, ids: Iterable[int]) -> Dict[int, str]:
+        return dict(db.execute(select(column, name).where(column.in_(list(ids)))).all())
+    return load
+
+
+_employee_names = _query_names(Employee.id, Employee.full_name)
+_warehouse_names = _cached_names(Warehouse)
+
+
+def _dimensions(source: str) -> Dict[str, Dimension]:
+    """Разрешенные измерения group_by для источника"""
+    time_column = MovementHistory.moved_at if source == "movements" else Device.created_at
+    dimensions = {
+        "company": Dimension(Device.company_id, names=_cached_names(Company)),
+        "device_type": Dimension(Device.device_type_id, names=_cached_names(DeviceType)),
+        "brand": Dimension(Device.brand_id, names=_cached_names(Brand)),
+        "model": Dimension(Device.model_id, names=_cached_names(Model)),
+        "location_type": Dimension(Device.current_location_type),
+        "warehouse": Dimension(
+            Device.current_location_id,
+            Device.current_location_type == LocationType.WAREHOUSE,
+            _warehouse_names,
+        ),
+        "employee": Dimension(
+            Device.current_location_id,
+            Device.current_location_type == LocationType.EMPLOYEE,
+            _employee_names,
+        ),
+        "to_location_type": Dimension(MovementHistory.to_location_type, movements_only=True),
+        "to_warehouse": Dimension(
+            MovementHistory.to_location_id,
+            MovementHistory.to_location_type == LocationType.WAREHOUSE,
+            _warehouse_names,
+            True,
+        ),
+        "to_employee": Dimension(
+            MovementHistory.to_location_id,
+            MovementHistory.to_location_type == LocationType.EMPLOYEE,
+            _employee_names,
+            True,
+        ),
+        "from_warehouse": Dimension(
+            MovementHistory.from_location_id,
+            MovementHistory.from_location_type == LocationType.WAREHOUSE,
+            _warehouse_names,
+            True,
+        ),
+        "from_employee": Dimension(
+            MovementHistory.from_location_id,
+            MovementHistory.from_location_type == LocationType.EMPLOYEE,
+            _employee_names,
+            True,
+        ),
+        "moved_by": Dimension(
+            MovementHistory.moved_by, names=_query_names(User.id, User.username), movements_only=True
+        ),
+    }
+    for period in _PERIODS:
+        dimensions[period] = Dimension(func.date_trunc(period, time_column))
+    return dimensions
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def aggregate_report(
+    db: Session,
+    source: str = "devices",
+    group_by: Optional[str] = None,
+    metrics: Optional[str] = None,
+    company_id: Optional[int] = None,
+    device_type_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    model_id: Optional[int] = None,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+    moved_by: Optional[int] = None,
+    moved_from: Optional[datetime] = None,
+    moved_to: Optional[datetime] = None,
+    limit: int = 1000,
+) -> AggregateReport:
+    """
+    Сводные показатели одним запросом GROUP BY. group_by и metrics - списки
+    через запятую из разрешенных значений, поэтому в SQL попадают только
+    заранее описанные выражения. Источник devices - текущее состояние
+    устройств, movements - перемещения (с атрибутами перемещенных устройств).
+    """
+    if source not in AGGREGATE_SOURCES:
+        raise _bad_request(f"Unknown source: {source}")
+    dimensions = _dimensions(source)
+    group_names = _split(group_by)
+    metric_names = _split(metrics) or ["count"]
+
+    unknown = [name for name in group_names if name not in dimensions]
+    if unknown:
+        raise _bad_request(f"Unknown group_by dimensions: {', '.join(unknown)}")
+    if len(set(group_names)) != len(group_names) or len(group_names) > AGGREGATE_MAX_DIMENSIONS:
+        raise _bad_request(f"group_by accepts up to {AGGREGATE_MAX_DIMENSIONS} distinct dimensions")
+    if source == "devices":
+        movement_only = [name for name in group_names if dimensions[name].movements_only]
+        if movement_only:
+            raise _bad_request(f"Dimensions require source=movements: {', '.join(movement_only)}")
+    unknown = [name for name in metric_names if name not in AGGREGATE_METRICS]
+    if unknown:
+        raise _bad_request(f"Unknown metrics: {', '.join(unknown)}")
+    if source == "devices" and moved_by:
+        raise _bad_request("moved_by filter requires source=movements")
+
+    # Источник и условия
+    conditions = []
+    if company_id:
+        conditions.append(Device.company_id == company_id)
+    if device_type_id:
+        conditions.append(Device.device_type_id == device_type_id)
+    if brand_id:
+        conditions.append(Device.brand_id == brand_id)
+    if model_id:
+        conditions.append(Device.model_id == model_id)
+
+    if source == "movements":
+        query = select().select_from(MovementHistory).join(Device, Device.id == MovementHistory.device_id)
+        # Для перемещений фильтр локации - место назначения
+        if location_type:
+            conditions.append(MovementHistory.to_location_type == location_type)
+        if location_id:
+            conditions.append(MovementHistory.to_location_id == location_id)
+        if moved_by:
+            conditions.append(MovementHistory.moved_by == moved_by)
+        if moved_from:
+            conditions.append(MovementHistory.moved_at >= moved_from)
+        if moved_to:
+            conditions.append(MovementHistory.moved_at < moved_to)
+        count = func.count()
+        moves = func.count()
+        distinct_devices = func.count(distinct(MovementHistory.device_id))
+    else:
+        query = select().select_from(Device)
+        if location_type:
+            conditions.append(Device.current_location_type == location_type)
+        if location_id:
+            conditions.append(Device.current_location_id == location_id)
+        joined = "moves" in metric_names
+        if joined:
+            # Перемещения за период присоединяются только ради метрики moves
+            move_conditions = [MovementHistory.device_id == Device.id]
+            if moved_from:
+                move_conditions.append(MovementHistory.moved_at >= moved_from)
+            if moved_to:
+                move_conditions.append(MovementHistory.moved_at < moved_to)
+            query = query.outerjoin(MovementHistory, and_(*move_conditions))
+        count = func.count(distinct(Device.id)) if joined else func.count()
+        moves = func.count(MovementHistory.id)
+        distinct_devices = count
+
+    metric_expressions = {"count": count, "distinct_devices": distinct_devices, "moves": moves}
+
+    group_columns = []
+    for name in group_names:
+        dimension = dimensions[name]
+        group_columns.append(dimension.expression.label(name))
+        if dimension.condition is not None:
+            conditions.append(dimension.condition)
+
+    rows = db.execute(
+        query
+        .add_columns(*group_columns, *[metric_expressions[name].label(name) for name in metric_names])
+        .where(*conditions)
+        .group_by(*[column.element for column in group_columns])
+        .order_by(*[column.element for column in group_columns])
+        .limit(limit + 1)
+    ).all()
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+
+    # Названия подставляются одним запросом (или из кэша) на измерение
+    names = {}
+    for name in group_names:
+        loader = dimensions[name].names
+        if loader:
+            ids = {getattr(row, name) for row in rows} - {None}
+            names[name] = loader(db, ids) if ids else {}
+
+    result = []
+    for row in rows:
+        item = {}
+        for name in group_names:
+            value = getattr(row, name)
+            if name in names:
+                item[f"{name}_id"] = value
+                item[name] = names[name].get(value)
+            else:
+                item[name] = value.value if isinstance(value, LocationType) else value
+        for name in metric_names:
+            item[name] = getattr(row, name)
+        result.append(item)
+
+    return AggregateReport(
+        source=source,
+        group_by=group_names,
+        metrics=metric_names,
+        rows=result,
+        truncated=truncated,
+    )
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, selectinload
+
+from ..models.device import Device, LocationType
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+from ..schemas.brand import BrandResponse
+from ..schemas.model import ModelResponse
+from ..schemas.device_type import DeviceTypeResponse
+from ..schemas.company import CompanyResponse
+from ..schemas.device import DeviceResponse, DeviceExpandedResponse, LocationBrief
+
+# Связи устройства, которые можно развернуть через ?expand=
+EXPANDABLE_RELATIONS = {
+    "brand": (Device.brand, BrandResponse),
+    "model": (Device.model, ModelResponse),
+    "device_type": (Device.device_type, DeviceTypeResponse),
+    "company": (Device.company, CompanyResponse),
+}
+EXPANDABLE = set(EXPANDABLE_RELATIONS) | {"location"}
+
+
+def parse_expand(expand: Optional[str]) -> Set[str]:
+    """Разбирает ?expand=brand,model,...; неизвестные имена - 400"""
+    if not expand:
+        return set()
+    requested = {item.strip() for item in expand.split(",") if item.strip()}
+    unknown = requested - EXPANDABLE
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown expand value(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(sorted(EXPANDABLE))}"
+        )
+    return requested
+
+
+def expand_options(expand: Set[str]) -> list:
+    """Опции загрузки для запроса устройств: по одному IN-запросу на связь"""
+    return [selectinload(relation) for name, (relation, _) in EXPANDABLE_RELATIONS.items() if name in expand]
+
+
+def _location_names(db: Session, devices: Iterable[Device]) -> Dict[tuple, str]:
+    """Имена полиморфных локаций: не более одного запроса на тип локации"""
+    ids_by_type: Dict[LocationType, Set[int]] = {LocationType.EMPLOYEE: set(), LocationType.WAREHOUSE: set()}
+    for device in devices:
+        ids_by_type[device.current_location_type].add(device.current_location_id)
+
+    names = {}
+    if ids_by_type[LocationType.EMPLOYEE]:
+        for employee_id, full_name in db.query(Employee.id, Employee.full_name).filter(
+            Employee.id.in_(ids_by_type[LocationType.EMPLOYEE])
+        ):
+            names[(LocationType.EMPLOYEE, employee_id)] = full_name
+    if ids_by_type[LocationType.WAREHOUSE]:
+        for warehouse_id, name in db.query(Warehouse.id, Warehouse.name).filter(
+            Warehouse.id.in_(ids_by_type[LocationType.WAREHOUSE])
+        ):
+            names[(LocationType.WAREHOUSE, warehouse_id)] = name
+    return names
+
+
+def expand_devices(db: Session, devices: List[Device], expand: Set[str]) -> List[DeviceExpandedResponse]:
+    """
+    Собирает ответы с развернутыми справочниками. Связи должны быть загружены
+    через expand_options, иначе каждое обращение к ним станет отдельным запросом.
+    """
+    location_names = _location_names(db, devices) if "location" in expand and devices else {}
+
+    result = []
+    for device in devices:
+        data = DeviceResponse.model_validate(device).model_dump()
+        for name, (relation, schema) in EXPANDABLE_RELATIONS.items():
+            if name in expand:
+                related = getattr(device, relation.key)
+                data[name] = schema.model_validate(related) if related is not None else None
+        if "location" in expand:
+            data["location"] = LocationBrief(
+                type=device.current_location_type,
+                id=device.current_location_id,
+                name=location_names.get((device.current_location_type, device.current_location_id)),
+            )
+        result.append(DeviceExpandedResponse(**data))
+    return result
@@ -0,0 +1,247 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, LocationType
+from ..models.company import Company
+from ..models.device_type import DeviceType
+from ..models.brand import Brand
+from ..models.model import Model
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+from ..schemas.device import DeviceCreate, DeviceBulkCreated, DeviceBulkError
+from .reference_cache import reference_cache
+from .inventory_numbers import (
+    advance_inventory_sequence,
+    allocate_inventory_sequence,
+    format_inventory_number,
+    sync_inventory_sequence,
+)
+
+# Сколько устройств вставляется за один flush
+BULK_CHUNK_SIZE = 500
+
+# Сообщения для нарушений ограничений БД - те же, что у предварительных проверок;
+# ищутся по колонке в имени ограничения
+_CONSTRAINT_ERRORS = (
+    ("serial_number", "Device with this serial number already exists"),
+    ("inventory_number", "Device with this inventory number already exists"),
+    ("company_id", "Company not found"),
+    ("device_type_id", "Device type not found"),
+    ("brand_id", "Brand not found"),
+    ("model_id", "Model not found"),
+)
+
+
+def _load_by_id(db: Session, model, ids: Set[int]) -> Dict[int, object]:
+    if not ids:
+        return {}
+    return {obj.id: obj for obj in db.query(model).filter(model.id.in_(ids)).all()}
+
+
+def _taken_numbers(db: Session, serial_numbers: Set[str], inventory_numbers: Set[str]) -> Tuple[Set[str], Set[str]]:
+    """Одним запросом находит уже занятые серийные и инвентарные номера"""
+    conditions = []
+    if serial_numbers:
+        conditions.append(Device.serial_number.in_(serial_numbers))
+    if inventory_numbers:
+        conditions.append(Device.inventory_number.in_(inventory_numbers))
+    if not conditions:
+        return set(), set()
+
+    rows = db.execute(
+        select(Device.serial_number, Device.inventory_number).where(or_(*conditions))
+    ).all()
+    return {row.serial_number for row in rows}, {row.inventory_number for row in rows}
+
+
+def _integrity_error_detail(row: int, exc: IntegrityError) -> str:
+    """Понятное сообщение для строки; текст ошибки БД пишется только в лог сервера"""
+    diag = getattr(exc.orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or ""
+    for column, detail in _CONSTRAINT_ERRORS:
+        if column in constraint:
+            return detail
+    print(f"Warning: bulk import row {row} failed: {exc.orig}")
+    return "Device could not be saved"
+
+
+def validate_device_row(row: int, values: Any) -> Tuple[Optional[DeviceCreate], Optional[DeviceBulkError]]:
+    """Проверяет одну строку импорта: (данные устройства, None) или (None, ошибка строки)"""
+    try:
+        return DeviceCreate.model_validate(values), None
+    except ValidationError as exc:
+        return None, DeviceBulkError(
+            row=row,
+            serial_number=values.get("serial_number") if isinstance(values, dict) else None,
+            detail="; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+            ),
+        )
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def import_devices(
+    db: Session,
+    rows: List[Tuple[int, DeviceCreate]],
+) -> Tuple[List[DeviceBulkCreated], List[DeviceBulkError]]:
+    """
+    Создает пачку устройств. rows - пары (номер строки, данные устройства).
+
+    Справочники загружаются один раз на пачку, уникальность проверяется
+    запросами по множествам, инвентарные номера резервируются блоком на пару
+    (компания, тип), вставка идет порциями по BULK_CHUNK_SIZE. Ошибочные строки
+    попадают в errors и не мешают остальным. commit выполняет вызывающий код.
+    """
+    created: List[DeviceBulkCreated] = []
+    errors: List[DeviceBulkError] = []
+
+    def fail(row: int, device: DeviceCreate, detail: str, unused_inventory_number: Optional[str] = None) -> None:
+        errors.append(DeviceBulkError(
+            row=row,
+            serial_number=device.serial_number,
+            detail=detail,
+            unused_inventory_number=unused_inventory_number,
+        ))
+
+    companies = reference_cache.get_many(db, Company, {d.company_id for _, d in rows})
+    device_types = reference_cache.get_many(db, DeviceType, {d.device_type_id for _, d in rows})
+    brands = reference_cache.get_many(db, Brand, {d.brand_id for _, d in rows})
+    models = reference_cache.get_many(db, Model, {d.model_id for _, d in rows})
+    employees = _load_by_id(db, Employee, {
+        d.current_location_id for _, d in rows if d.current_location_type == LocationType.EMPLOYEE
+    })
+    warehouses = reference_cache.get_many(db, Warehouse, {
+        d.current_location_id for _, d in rows if d.current_location_type == LocationType.WAREHOUSE
+    })
+
+    taken_serials, taken_inventory = _taken_numbers(
+        db,
+        {d.serial_number for _, d in rows},
+        {d.inventory_number for _, d in rows if d.inventory_number},
+    )
+
+    # Проверка справочников и уникальности
+    valid: List[Tuple[int, DeviceCreate]] = []
+    seen_serials: Set[str] = set()
+    seen_inventory: Set[str] = set()
+    for row, device in rows:
+        if device.company_id not in companies:
+            fail(row, device, "Company not found")
+        elif device.device_type_id not in device_types:
+            fail(row, device, "Device type not found")
+        elif device.brand_id not in brands:
+            fail(row, device, "Brand not found")
+        elif device.model_id not in models:
+            fail(row, device, "Model not found")
+        elif device.current_location_type == LocationType.EMPLOYEE and device.current_location_id not in employees:
+            fail(row, device, "Employee not found")
+        elif device.current_location_type == LocationType.WAREHOUSE and device.current_location_id not in warehouses:
+            fail(row, device, "Warehouse not found")
+        elif device.serial_number in taken_serials or device.serial_number in seen_serials:
+            fail(row, device, "Device with this serial number already exists")
+        elif device.inventory_number and (
+            device.inventory_number in taken_inventory or device.inventory_number in seen_inventory
+        ):
+            fail(row, device, "Device with this inventory number already exists")
+        else:
+            seen_serials.add(device.serial_number)
+            if device.inventory_number:
+                seen_inventory.add(device.inventory_number)
+            valid.append((row, device))
+
+    # Ручные номера поднимают счетчики до резервирования блоков
+    for row, device in valid:
+        if device.inventory_number:
+            sync_inventory_sequence(
+                db, companies[device.company_id], device_types[device.device_type_id], device.inventory_number
+            )
+
+    # Резервируем номера одним блоком на каждую пару (компания, тип устройства)
+    pending: Dict[Tuple[int, int], List[Tuple[int, DeviceCreate]]] = defaultdict(list)
+    for row, device in valid:
+        if not device.inventory_number:
+            pending[(device.company_id, device.device_type_id)].append((row, device))
+
+    inventory_numbers: Dict[int, str] = {
+        row: device.inventory_number for row, device in valid if device.inventory_number
+    }
+    for (company_id, device_type_id), pair_rows in pending.items():
+        company = companies[company_id]
+        device_type = device_types[device_type_id]
+        first = allocate_inventory_sequence(db, company, device_type, count=len(pair_rows))
+        for offset, (row, _) in enumerate(pair_rows):
+            inventory_numbers[row] = format_inventory_number(company.code, device_type.code, first + offset)
+
+    # Сгенерированные номера могли быть заняты вручную введенными номерами вне
+    # счетчика: счетчик пары переводится за максимальный занятый номер, и такие
+    # строки получают номера из нового блока (он свободен)
+    generated = {inventory_numbers[row] for pair_rows in pending.values() for row, _ in pair_rows}
+    _, taken_generated = _taken_numbers(db, set(), generated)
+    for (company_id, device_type_id), pair_rows in pending.items():
+        colliding = [row for row, _ in pair_rows if inventory_numbers[row] in taken_generated]
+        if not colliding:
+            continue
+        company = companies[company_id]
+        device_type = device_types[device_type_id]
+        advance_inventory_sequence(db, company, device_type)
+        first = allocate_inventory_sequence(db, company, device_type, count=len(colliding))
+        for offset, row in enumerate(colliding):
+            inventory_numbers[row] = format_inventory_number(company.code, device_type.code, first + offset)
+
+    for chunk in _chunks(valid, BULK_CHUNK_SIZE):
+        _insert_chunk(db, chunk, inventory_numbers, created, fail)
+
+    created.sort(key=lambda item: item.row)
+    errors.sort(key=lambda item: item.row)
+    return created, errors
+
+
+def _insert_chunk(db, chunk, inventory_numbers, created, fail) -> None:
+    """Вставляет порцию в savepoint; при ошибке БД повторяет построчно, чтобы найти виновную строку"""
+    def build(row: int, device: DeviceCreate) -> Device:
+        device_data = device.model_dump()
+        device_data["inventory_number"] = inventory_numbers[row]
+        return Device(**device_data)
+
+    def collect(pairs) -> None:
+        for row, db_device in pairs:
+            created.append(DeviceBulkCreated(
+                row=row,
+                id=db_device.id,
+                serial_number=db_device.serial_number,
+                inventory_number=db_device.inventory_number,
+            ))
+
+    savepoint = db.begin_nested()
+    pairs = [(row, build(row, device)) for row, device in chunk]
+    db.add_all([db_device for _, db_device in pairs])
+    try:
+        db.flush()
+        savepoint.commit()
+        collect(pairs)
+        return
+    except IntegrityError:
+        savepoint.rollback()
+
+    for row, device in chunk:
+        savepoint = db.begin_nested()
+        db_device = build(row, device)
+        db.add(db_device)
+        try:
+            db.flush()
+            savepoint.commit()
+            collect([(row, db_device)])
+        except IntegrityError as exc:
+            savepoint.rollback()
+            # Сгенерированный номер уже взят из счетчика и больше не выдается
+            unused = None if device.inventory_number else inventory_numbers[row]
+            fail(row, device, _integrity_error_detail(row, exc), unused)
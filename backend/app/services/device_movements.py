@@ -0,0 +1,104 @@
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, LocationType
+from ..models.movement_history import MovementHistory
+from ..models.employee import Employee, EmployeeStatus
+from ..models.warehouse import Warehouse
+from ..schemas.movement_history import MovementBulkItem
+from .reference_cache import reference_cache
+
+# Максимум устройств в одном массовом перемещении
+BULK_MOVE_MAX_DEVICES = 5000
+
+
+def validate_destination(db: Session, location_type: LocationType, location_id: int) -> str:
+    """Проверяет место назначения и возвращает его название"""
+    if location_type == LocationType.EMPLOYEE:
+        employee = db.query(Employee).filter(Employee.id == location_id).first()
+        if not employee:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Employee not found"
+            )
+        if employee.status != EmployeeStatus.ACTIVE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot move device to fired employee"
+            )
+        return employee.full_name
+
+    warehouse = reference_cache.get(db, Warehouse, location_id)
+    if not warehouse:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Warehouse not found"
+        )
+    return warehouse.name
+
+
+def move_devices(
+    db: Session,
+    device_ids: List[int],
+    to_location_type: LocationType,
+    to_location_id: int,
+    moved_by: int,
+) -> Tuple[int, List[MovementBulkItem]]:
+    """
+    Перемещает набор устройств в одну локацию. Место назначения проверяется
+    один раз, устройства загружаются одним запросом. Ошибочные устройства
+    (не найдены, уже в этой локации) попадают в результат и не мешают
+    остальным. commit выполняет вызывающий код.
+    """
+    validate_destination(db, to_location_type, to_location_id)
+
+    # Блокировки строк в порядке id: пересекающиеся перемещения не взаимоблокируются
+    rows = db.execute(
+        select(Device).where(Device.id.in_(set(device_ids))).order_by(Device.id).with_for_update()
+    ).scalars()
+    devices = {device.id: device for device in rows}
+
+    results: List[MovementBulkItem] = []
+    movements: List[Tuple[MovementBulkItem, MovementHistory]] = []
+    seen = set()
+    for device_id in device_ids:
+        if device_id in seen:
+            results.append(MovementBulkItem(device_id=device_id, moved=False, detail="Duplicate device id in request"))
+            continue
+        seen.add(device_id)
+
+        if device_id not in devices:
+            results.append(MovementBulkItem(device_id=device_id, moved=False, detail="Device not found"))
+            continue
+        device = devices[device_id]
+        if device.current_location_type == to_location_type and device.current_location_id == to_location_id:
+            results.append(MovementBulkItem(
+                device_id=device_id,
+                moved=False,
+                detail="Устройство уже находится в выбранной локации. Перемещение в ту же локацию невозможно."
+            ))
+            continue
+
+        db_movement = MovementHistory(
+            device_id=device.id,
+            from_location_type=device.current_location_type,
+            from_location_id=device.current_location_id,
+            to_location_type=to_location_type,
+            to_location_id=to_location_id,
+            moved_by=moved_by
+        )
+        device.current_location_type = to_location_type
+        device.current_location_id = to_location_id
+        item = MovementBulkItem(device_id=device_id, moved=True)
+        results.append(item)
+        movements.append((item, db_movement))
+
+    if movements:
+        db.add_all([db_movement for _, db_movement in movements])
+        db.flush()
+        for item, db_movement in movements:
+            item.movement_id = db_movement.id
+    return len(movements), results
@@ -0,0 +1,121 @@
+from fastapi import HTTPException, status
+from sqlalchemy import and_, case, func, literal, or_, select, union
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, LocationType
+from ..models.brand import Brand
+from ..models.model import Model
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+
+# Короче этого запроса триграммы бесполезны - ищем только по префиксу номеров
+MIN_TRIGRAM_QUERY_LENGTH = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _employee_join():
+    return and_(
+        Device.current_location_type == LocationType.EMPLOYEE,
+        Employee.id == Device.current_location_id,
+    )
+
+
+def _warehouse_join():
+    return and_(
+        Device.current_location_type == LocationType.WAREHOUSE,
+        Warehouse.id == Device.current_location_id,
+    )
+
+
+def _candidate_ids(q: str):
+    """
+    UNION идентификаторов устройств, подходящих под запрос. Каждая ветка
+    опирается на свой индекс (см. миграцию 0002): префиксный btree
+    lower(...) text_pattern_ops для номеров и триграммный GIN для подстрок
+    и нечеткого совпадения (оператор % из pg_trgm).
+    """
+    prefix = f"{_escape_like(q.lower())}%"
+    prefix_match = select(Device.id).where(or_(
+        func.lower(Device.serial_number).like(prefix, escape="\\"),
+        func.lower(Device.inventory_number).like(prefix, escape="\\"),
+    ))
+    if len(q) < MIN_TRIGRAM_QUERY_LENGTH:
+        return prefix_match
+
+    pattern = f"%{_escape_like(q)}%"
+
+    def matches(column):
+        return or_(column.ilike(pattern, escape="\\"), column.op("%")(q))
+
+    return union(
+        prefix_match,
+        select(Device.id).where(or_(matches(Device.serial_number), matches(Device.inventory_number))),
+        select(Device.id).join(Model, Model.id == Device.model_id).where(matches(Model.name)),
+        select(Device.id).join(Brand, Brand.id == Device.brand_id).where(matches(Brand.name)),
+        select(Device.id).join(Employee, _employee_join()).where(matches(Employee.full_name)),
+        select(Device.id).join(Warehouse, _warehouse_join()).where(matches(Warehouse.name)),
+    )
+
+
+def search_devices(db: Session, q: str, skip: int = 0, limit: int = 20):
+    """
+    Ранжированный поиск устройств по серийному и инвентарному номеру, модели,
+    бренду и держателю (ФИО сотрудника или название склада).
+
+    Ранг: точное совпадение номера > префикс номера > подстрока в номере >
+    совпадение в названиях; внутри уровня - по триграммной похожести.
+    Возвращает строки (Device, model_name, brand_name, location_name, rank).
+    Пустой после strip запрос отклоняется (400): шаблон '%' означал бы полный перебор.
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must not be blank"
+        )
+    q_lower = q.lower()
+    prefix = f"{_escape_like(q_lower)}%"
+    pattern = f"%{_escape_like(q_lower)}%"
+    serial = func.lower(Device.serial_number)
+    inventory = func.lower(Device.inventory_number)
+    location_name = func.coalesce(Employee.full_name, Warehouse.name)
+
+    tier = case(
+        (or_(serial == q_lower, inventory == q_lower), 3),
+        (or_(serial.like(prefix, escape="\\"), inventory.like(prefix, escape="\\")), 2),
+        (or_(serial.like(pattern, escape="\\"), inventory.like(pattern, escape="\\")), 1),
+        else_=0,
+    )
+    if len(q) < MIN_TRIGRAM_QUERY_LENGTH:
+        similarity = literal(0.0)
+    else:
+        similarity = func.greatest(
+            func.similarity(Device.serial_number, q),
+            func.similarity(Device.inventory_number, q),
+            func.similarity(Model.name, q),
+            func.similarity(Brand.name, q),
+            func.coalesce(func.similarity(location_name, q), 0),
+        )
+    rank = (tier + similarity).label("rank")
+
+    query = (
+        db.query(
+            Device,
+            Model.name.label("model_name"),
+            Brand.name.label("brand_name"),
+            location_name.label("location_name"),
+            rank,
+        )
+        .join(Model, Model.id == Device.model_id)
+        .join(Brand, Brand.id == Device.brand_id)
+        .outerjoin(Employee, _employee_join())
+        .outerjoin(Warehouse, _warehouse_join())
+        .filter(Device.id.in_(_candidate_ids(q)))
+        .order_by(rank.desc(), Device.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return query.all()
@@ -0,0 +1,232 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, inspect, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.device import Device, LocationType
+from ..models.device_summary import DeviceSummary
+from ..models.company import Company
+from ..models.device_type import DeviceType
+from ..models.brand import Brand
+from ..schemas.report import DeviceSummaryReport, LocationTypeCount, SummaryGroup
+from .etag import mark_tables_changed
+from .reference_cache import reference_cache
+
+# Колонки устройства, образующие ключ сводки
+SUMMARY_KEY = ("company_id", "device_type_id", "brand_id", "current_location_type", "current_location_id")
+
+# Ключ в Session.info: изменения счетчиков, посчитанные перед flush
+_SUMMARY_DELTAS = "device_summary_deltas"
+
+
+def _key(values) -> Tuple:
+    return tuple(values[name] for name in SUMMARY_KEY)
+
+
+def _current_key(device: Device) -> Tuple:
+    return tuple(getattr(device, name) for name in SUMMARY_KEY)
+
+
+def _previous_key(session: Session, device: Device) -> Tuple:
+    """Ключ устройства до изменений в этом flush"""
+    state = inspect(device)
+    values = {}
+    missing = False
+    for name in SUMMARY_KEY:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            # Атрибут был перезаписан без загрузки - старое значение еще в БД
+            missing = True
+    if missing:
+        with session.no_autoflush:
+            row = session.execute(
+                select(*[getattr(Device, name) for name in SUMMARY_KEY]).where(Device.id == device.id)
+            ).one()
+        values.update({name: value for name, value in zip(SUMMARY_KEY, row) if name not in values})
+    return _key(values)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_summary_deltas(session: Session, flush_context, instances) -> None:
+    # Считается до flush: после него прежние значения уже недоступны
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, Device):
+            deltas[_current_key(obj)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Device):
+            deltas[_previous_key(session, obj)] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Device) and session.is_modified(obj):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in SUMMARY_KEY):
+                deltas[_previous_key(session, obj)] -= 1
+                deltas[_current_key(obj)] += 1
+    session.info[_SUMMARY_DELTAS] = {key: delta for key, delta in deltas.items() if delta}
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _apply_summary_deltas(session: Session, flush_context) -> None:
+    # Применяется в той же (под)транзакции, что и flush: откатывается вместе с ним
+    deltas = session.info.pop(_SUMMARY_DELTAS, None)
+    if deltas:
+        apply_summary_deltas(session, deltas)
+
+
+def apply_summary_deltas(db: Session, deltas: Dict[Tuple, int]) -> None:
+    """
+    Изменить счетчики сводки. Ключи сортируются, чтобы параллельные
+    транзакции блокировали строки в одном порядке и не ловили deadlock.
+    Для изменений устройств в обход ORM вызывать вручную.
+    """
+    keys = sorted(deltas)
+    table = DeviceSummary.__table__
+    stmt = insert(table).values([
+        {
+            "company_id": key[0],
+            "device_type_id": key[1],
+            "brand_id": key[2],
+            "location_type": key[3],
+            "location_id": key[4],
+            "device_count": deltas[key],
+        }
+        for key in keys
+    ])
+    connection = db.connection()
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={"device_count": table.c.device_count + stmt.excluded.device_count},
+    ))
+    connection.execute(delete(table).where(
+        tuple_(*table.primary_key.columns).in_(keys),
+        table.c.device_count <= 0,
+    ))
+    mark_tables_changed(db, table.name)
+
+
+def _actual_counts():
+    """Фактические количества по таблице устройств"""
+    return (
+        select(
+            *[getattr(Device, name) for name in SUMMARY_KEY],
+            func.count().label("device_count"),
+        )
+        .group_by(*[getattr(Device, name) for name in SUMMARY_KEY])
+    )
+
+
+def rebuild_device_summary(db: Session) -> int:
+    """
+    Пересчитать сводку с нуля. На время пересчета изменения устройств
+    блокируются (SHARE), чтобы не потерять параллельные обновления.
+    commit выполняет вызывающий код. Возвращает число строк сводки.
+    """
+    db.execute(text(f"LOCK TABLE {Device.__tablename__} IN SHARE MODE"))
+    table = DeviceSummary.__table__
+    db.execute(delete(table))
+    result = db.execute(insert(table).from_select(
+        ["company_id", "device_type_id", "brand_id", "location_type", "location_id", "device_count"],
+        _actual_counts(),
+    ))
+    mark_tables_changed(db, table.name)
+    return result.rowcount
+
+
+def verify_device_summary(db: Session) -> List[dict]:
+    """Расхождения сводки с фактическими данными: ключ, ожидаемое и записанное количество"""
+    actual = _actual_counts().subquery("actual")
+    summary = DeviceSummary.__table__
+    key_columns = list(zip(SUMMARY_KEY, summary.primary_key.columns))
+    join = and_(*[actual.c[name] == column for name, column in key_columns])
+
+    rows = db.execute(
+        select(
+            *[func.coalesce(actual.c[name], column).label(name) for name, column in key_columns],
+            func.coalesce(actual.c.device_count, 0).label("expected"),
+            func.coalesce(summary.c.device_count, 0).label("recorded"),
+        )
+        .select_from(actual.join(summary, join, full=True))
+        .where(func.coalesce(actual.c.device_count, 0) != func.coalesce(summary.c.device_count, 0))
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def summary_report(
+    db: Session,
+    company_id: Optional[int] = None,
+    device_type_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+) -> DeviceSummaryReport:
+    """
+    Итоги по компаниям, типам, брендам и типам локаций из таблицы сводки.
+    Объем работы зависит от числа сочетаний справочников, а не от числа устройств.
+    """
+    conditions = []
+    if company_id:
+        conditions.append(DeviceSummary.company_id == company_id)
+    if device_type_id:
+        conditions.append(DeviceSummary.device_type_id == device_type_id)
+    if brand_id:
+        conditions.append(DeviceSummary.brand_id == brand_id)
+    if location_type:
+        conditions.append(DeviceSummary.location_type == location_type)
+    if location_id:
+        conditions.append(DeviceSummary.location_id == location_id)
+
+    rows = db.execute(
+        select(
+            DeviceSummary.company_id,
+            DeviceSummary.device_type_id,
+            DeviceSummary.brand_id,
+            DeviceSummary.location_type,
+            func.sum(DeviceSummary.device_count).label("device_count"),
+        )
+        .where(*conditions)
+        .group_by(
+            DeviceSummary.company_id,
+            DeviceSummary.device_type_id,
+            DeviceSummary.brand_id,
+            DeviceSummary.location_type,
+        )
+    ).all()
+
+    by_company: Counter = Counter()
+    by_device_type: Counter = Counter()
+    by_brand: Counter = Counter()
+    by_location_type: Counter = Counter()
+    for row in rows:
+        by_company[row.company_id] += row.device_count
+        by_device_type[row.device_type_id] += row.device_count
+        by_brand[row.brand_id] += row.device_count
+        by_location_type[row.location_type] += row.device_count
+
+    def groups(model, counts: Counter) -> List[SummaryGroup]:
+        references = reference_cache.get_many(db, model, counts)
+        return [
+            SummaryGroup(
+                id=obj_id,
+                name=references[obj_id].name if obj_id in references else None,
+                device_count=count,
+            )
+            for obj_id, count in sorted(counts.items())
+        ]
+
+    return DeviceSummaryReport(
+        total=sum(by_company.values()),
+        by_company=groups(Company, by_company),
+        by_device_type=groups(DeviceType, by_device_type),
+        by_brand=groups(Brand, by_brand),
+        by_location_type=[
+            LocationTypeCount(location_type=location, device_count=count)
+            for location, count in sorted(by_location_type.items(), key=lambda item: item[0].value)
+        ],
+    )
@@ -0,0 +1,118 @@
+import hashlib
+from itertools import chain
+from typing import Dict, Iterable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import event, func, inspect, literal, select
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal, engine, get_db
+from ..models.table_version import table_version_sequence
+from ..models.user import User
+from .auth import get_current_user
+
+# Ключи в Session.info: имена таблиц, измененных в текущей транзакции,
+# и таблиц, счетчики которых надо поднять еще раз после COMMIT
+_CHANGED_TABLES = "changed_tables"
+_COMMITTED_TABLES = "committed_tables"
+
+# Справочники, которые попадают в ответы об устройствах (expand и т.п.)
+DEVICE_TABLES = ("devices", "companies", "device_types", "brands", "models", "employees", "warehouses")
+
+
+def mark_tables_changed(db: Session, *tables: str) -> None:
+    """
+    Отметить таблицы как измененные. Изменения через ORM отмечаются сами;
+    вызывать нужно после INSERT/UPDATE/DELETE, выполненных в обход ORM.
+    """
+    db.info.setdefault(_CHANGED_TABLES, set()).update(tables)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changed_tables(session: Session, flush_context) -> None:
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    changed = {
+        inspect(obj).mapper.local_table.name
+        for obj in chain(session.new, session.deleted, dirty)
+    }
+    if changed:
+        mark_tables_changed(session, *changed)
+
+
+def _sequence(table: str):
+    # to_regclass дает NULL для таблицы без счетчика - nextval и чтение тоже дают NULL
+    return func.to_regclass(literal(table_version_sequence(table)))
+
+
+def _bump(connection, tables: Iterable[str]) -> None:
+    connection.execute(select(*[func.nextval(_sequence(table)) for table in sorted(tables)]))
+
+
+def table_versions(db: Session, tables: Iterable[str]) -> Dict[str, int]:
+    """Текущие счетчики изменений таблиц (0 - таблица еще не менялась)"""
+    tables = sorted(tables)
+    row = db.execute(select(*[func.pg_sequence_last_value(_sequence(table)) for table in tables])).one()
+    return {table: version or 0 for table, version in zip(tables, row)}
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_table_versions(session: Session) -> None:
+    # Счетчики - последовательности: nextval не блокирует строку, и пишущие
+    # транзакции не выстраиваются в очередь. nextval не откатывается, поэтому
+    # счетчик поднимается и до COMMIT (на случай сбоя сразу после него), и
+    # после - иначе читатель между nextval и COMMIT получил бы новый ETag
+    # для старых данных. При освобождении SAVEPOINT счетчики не трогаем
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    tables = session.info.pop(_CHANGED_TABLES, None)
+    if not tables:
+        return
+    _bump(session.connection(), tables)
+    session.info[_COMMITTED_TABLES] = tables
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_committed_table_versions(session: Session) -> None:
+    tables = session.info.pop(_COMMITTED_TABLES, None)
+    if not tables:
+        return
+    with engine.connect() as connection:
+        _bump(connection, tables)
+        connection.commit()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Слабое сравнение: префикс W/ не учитывается
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+
+def table_etag(*tables: str):
+    """
+    Зависимость для GET-эндпоинтов: вычисляет слабый ETag из версий таблиц
+    и параметров запроса. Если клиент прислал совпадающий If-None-Match,
+    отвечает 304 до выполнения самого запроса к данным.
+    """
+    def check_etag(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+    ) -> None:
+        version_map = table_versions(db, tables)
+        fingerprint = "|".join(
+            [request.url.path, request.url.query]
+            + [f"{table}={version_map.get(table, 0)}" for table in sorted(tables)]
+        )
+        etag = f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()[:20]}"'
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    return check_etag
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import select
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, func, select as sql_select, text
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal, engine
+from ..models.event import event_id_seq
+
+# Канал LISTEN/NOTIFY, через который события расходятся по всем воркерам
+EVENT_CHANNEL = "wwp_events"
+
+# Ключ в Session.info: события, ожидающие commit
+_PENDING_EVENTS = "pending_events"
+
+# Пауза перед переподключением слушателя после ошибки
+_RECONNECT_DELAY_SECONDS = 2
+
+
+def publish_event(db: Session, event_type: str, **data) -> None:
+    """
+    Поставить событие в очередь текущей транзакции. Оно уйдет клиентам только
+    после успешного commit (NOTIFY транзакционен) и пропадет при rollback.
+    Идентификаторы новых строк должны быть известны - вызывать после flush.
+    """
+    db.info.setdefault(_PENDING_EVENTS, []).append((event_type, data))
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _notify_pending_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_EVENTS, None)
+    if not pending:
+        return
+
+    ids = session.execute(
+        sql_select(event_id_seq.next_value()).select_from(func.generate_series(1, len(pending)))
+    ).scalars().all()
+    at = datetime.now(timezone.utc).isoformat()
+    payloads = [
+        json.dumps({"id": event_id, "type": event_type, "at": at, "data": data}, default=str)
+        for event_id, (event_type, data) in zip(ids, pending)
+    ]
+    session.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": EVENT_CHANNEL, "payloads": payloads},
+    )
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_pending_events(session: Session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_EVENTS, None)
+
+
+class EventBroker:
+    """
+    Раздача событий клиентам SSE внутри процесса. Каждый воркер держит одно
+    соединение LISTEN (фоновый поток, запускается при первой подписке) и
+    рассылает полученные уведомления в очереди подписчиков. Последние
+    события хранятся в кольцевом буфере для переподключения с Last-Event-ID.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers = {}
+        self._thread: Optional[threading.Thread] = None
+        self._connected = threading.Event()
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[asyncio.Queue, List[dict]]:
+        """
+        Новая очередь подписчика и пропущенные события после last_event_id.
+        Вызывается из event loop, в котором очередь будет читаться.
+        """
+        self._ensure_listener()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            backlog = self._backlog(last_event_id) if last_event_id is not None else []
+        return queue, backlog
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def _backlog(self, last_event_id: int) -> List[dict]:
+        # Уведомления приходят в порядке commit, а id выдаются раньше - поэтому
+        # ищется позиция события в буфере, а не просто id больше last_event_id
+        events = list(self._buffer)
+        for index, item in enumerate(events):
+            if item["id"] == last_event_id:
+                return events[index + 1:]
+        return [item for item in events if item["id"] > last_event_id]
+
+    def dispatch(self, item: dict) -> None:
+        with self._lock:
+            self._buffer.append(item)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, item)
+            except RuntimeError:
+                # event loop подписчика уже закрыт
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, item: dict) -> None:
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: очередь сбрасывается, None закрывает
+            # соединение, и клиент переподключится с Last-Event-ID
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def _ensure_listener(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._listen_forever, name="event-listener", daemon=True)
+            self._thread.start()
+
+    def wait_until_listening(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def _listen_forever(self) -> None:
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Warning: event listener disconnected: {e}")
+            self._connected.clear()
+            time.sleep(_RECONNECT_DELAY_SECONDS)
+
+    def _listen(self) -> None:
+        # Отдельное соединение вне пула: оно занято LISTEN все время жизни процесса
+        raw = engine.raw_connection()
+        connection = raw.driver_connection
+        raw.detach()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {EVENT_CHANNEL}")
+            self._connected.set()
+            while True:
+                if select.select([connection], [], [], settings.EVENT_HEARTBEAT_SECONDS) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    self.dispatch(json.loads(notify.payload))
+        finally:
+            connection.close()
+
+
+event_broker = EventBroker(
+    buffer_size=settings.EVENT_BUFFER_SIZE,
+    queue_size=settings.EVENT_QUEUE_SIZE,
+)
+
+
+def format_sse(item: dict) -> str:
+    """Событие в формате text/event-stream"""
+    return f"id: {item['id']}\nevent: {item['type']}\ndata: {json.dumps(item, default=str)}\n\n"
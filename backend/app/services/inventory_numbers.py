@@ -0,0 +1,139 @@
+import re
+from typing import Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models.device import Device
+from ..models.company import Company
+from ..models.device_type import DeviceType
+from ..models.inventory_number_sequence import InventoryNumberSequence
+
+
+def inventory_number_prefix(company_code: str, device_type_code: str) -> str:
+    return f"{company_code}-{device_type_code}/"
+
+
+def format_inventory_number(company_code: str, device_type_code: str, sequence: int) -> str:
+    """Формирует номер вида WWP-02/0022 (4 цифры с ведущими нулями)"""
+    return f"{inventory_number_prefix(company_code, device_type_code)}{sequence:04d}"
+
+
+def parse_inventory_sequence(inventory_number: str, company_code: str, device_type_code: str) -> Optional[int]:
+    """Порядковый номер из инвентарного номера, если он соответствует формату пары"""
+    pattern = rf"^{re.escape(company_code)}-{re.escape(device_type_code)}/(\d+)$"
+    match = re.match(pattern, inventory_number)
+    return int(match.group(1)) if match else None
+
+
+def _max_existing_sequence(db: Session, company: Company, device_type: DeviceType) -> int:
+    """
+    Максимальный занятый порядковый номер среди существующих устройств.
+    Вызывается только один раз для пары - при создании строки счетчика.
+    """
+    prefix = inventory_number_prefix(company.code, device_type.code)
+    numbers = db.execute(
+        select(Device.inventory_number).where(
+            Device.inventory_number.startswith(prefix, autoescape=True)
+        )
+    ).scalars()
+
+    max_sequence = 0
+    for inventory_number in numbers:
+        sequence = parse_inventory_sequence(inventory_number, company.code, device_type.code)
+        if sequence is not None:
+            max_sequence = max(max_sequence, sequence)
+    return max_sequence
+
+
+def allocate_inventory_sequence(db: Session, company: Company, device_type: DeviceType, count: int = 1) -> int:
+    """
+    Атомарно резервирует count порядковых номеров для пары (компания, тип устройства)
+    и возвращает первый из них.
+
+    Счетчик увеличивается UPDATE ... RETURNING в текущей транзакции: строка остается
+    заблокированной до commit, поэтому параллельные создания не получают один номер.
+    """
+    bump = (
+        update(InventoryNumberSequence)
+        .where(
+            InventoryNumberSequence.company_id == company.id,
+            InventoryNumberSequence.device_type_id == device_type.id,
+        )
+        .values(last_value=InventoryNumberSequence.last_value + count)
+        .returning(InventoryNumberSequence.last_value)
+        .execution_options(synchronize_session=False)
+    )
+    last_value = db.execute(bump).scalar()
+
+    if last_value is None:
+        # Первое обращение к паре - заполняем счетчик по уже существующим номерам
+        seed = _max_existing_sequence(db, company, device_type)
+        db.execute(
+            insert(InventoryNumberSequence)
+            .values(company_id=company.id, device_type_id=device_type.id, last_value=seed)
+            .on_conflict_do_nothing(index_elements=["company_id", "device_type_id"])
+        )
+        last_value = db.execute(bump).scalar_one()
+
+    return last_value - count + 1
+
+
+def sync_inventory_sequence(db: Session, company: Company, device_type: DeviceType, inventory_number: str) -> None:
+    """
+    Поднимает счетчик, если вручную указанный номер в формате пары обгоняет его,
+    чтобы следующий сгенерированный номер не совпал с ручным.
+    """
+    sequence = parse_inventory_sequence(inventory_number, company.code, device_type.code)
+    if sequence is None:
+        return
+
+    db.execute(
+        update(InventoryNumberSequence)
+        .where(
+            InventoryNumberSequence.company_id == company.id,
+            InventoryNumberSequence.device_type_id == device_type.id,
+        )
+        .values(last_value=func.greatest(InventoryNumberSequence.last_value, sequence))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def advance_inventory_sequence(db: Session, company: Company, device_type: DeviceType) -> None:
+    """
+    Переводит счетчик пары за максимальный занятый номер. Нужен, когда
+    сгенерированный номер оказался занят номером, введенным в обход счетчика.
+    """
+    seed = _max_existing_sequence(db, company, device_type)
+    db.execute(
+        update(InventoryNumberSequence)
+        .where(
+            InventoryNumberSequence.company_id == company.id,
+            InventoryNumberSequence.device_type_id == device_type.id,
+        )
+        .values(last_value=func.greatest(InventoryNumberSequence.last_value, seed))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def inventory_number_taken(db: Session, inventory_number: str) -> bool:
+    return db.execute(
+        select(Device.id).where(Device.inventory_number == inventory_number).limit(1)
+    ).first() is not None
+
+
+def generate_inventory_number(db: Session, company: Company, device_type: DeviceType) -> str:
+    """
+    Генерирует инвентарный номер в формате {COMPANY_CODE}-{DEVICE_TYPE_CODE}/{SEQUENTIAL_NUMBER},
+    например WWP-02/0022. Если номер уже занят, счетчик переводится за
+    максимальный занятый номер пары и номер выдается повторно - так счетчик
+    не застревает на занятом значении.
+    """
+    sequence = allocate_inventory_sequence(db, company, device_type)
+    inventory_number = format_inventory_number(company.code, device_type.code, sequence)
+    if inventory_number_taken(db, inventory_number):
+        advance_inventory_sequence(db, company, device_type)
+        sequence = allocate_inventory_sequence(db, company, device_type)
+        inventory_number = format_inventory_number(company.code, device_type.code, sequence)
+    return inventory_number
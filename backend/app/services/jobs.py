@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Статусы задачи
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Функция задачи: (путь результата, progress(done, total)) -> None
+JobRunner = Callable[[str, Callable[[int, Optional[int]], None]], None]
+
+# Как часто сохранять прогресс на диск
+_PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def params_fingerprint(*parts) -> str:
+    """Хэш набора параметров задачи (словари сериализуются с сортировкой ключей)"""
+    data = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class JobStore:
+    """
+    Фоновые задачи с результатом в файле. Метаданные хранятся JSON-файлами
+    рядом с результатом, поэтому статус видят все воркеры с общим каталогом.
+    Выполняет задачи локальный пул потоков процесса, принявшего задачу.
+
+    Задача с тем же отпечатком параметров, завершенная не раньше чем
+    freshness_seconds назад (или еще выполняющаяся), переиспользуется.
+    """
+
+    def __init__(self, directory: str, workers: int, freshness_seconds: int,
+                 stale_seconds: int, retention_seconds: int):
+        self.directory = directory
+        self.workers = workers
+        self.freshness_seconds = freshness_seconds
+        self.stale_seconds = stale_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write(self, name: str, data: dict) -> None:
+        # Запись через временный файл: читатель никогда не увидит половину JSON
+        path = self._path(name)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Метаданные задачи; зависшая задача (процесс умер) отдается как failed"""
+        if not job_id.isalnum():
+            return None
+        job = self._read(f"{job_id}.json")
+        if job and job["status"] in (PENDING, RUNNING):
+            updated_at = datetime.fromisoformat(job["updated_at"])
+            if (datetime.now(timezone.utc) - updated_at).total_seconds() > self.stale_seconds:
+                job["status"] = FAILED
+                job["error"] = "Job was interrupted"
+        return job
+
+    def result_path(self, job: dict) -> str:
+        return self._path(job["file"])
+
+    def _reusable(self, fingerprint: str) -> Optional[dict]:
+        pointer = self._read(f"params-{fingerprint}.json")
+        if not pointer:
+            return None
+        job = self.get(pointer["job_id"])
+        if not job or job["status"] == FAILED:
+            return None
+        if job["status"] == DONE:
+            finished_at = datetime.fromisoformat(job["finished_at"])
+            age = (datetime.now(timezone.utc) - finished_at).total_seconds()
+            if age > self.freshness_seconds or not os.path.exists(self.result_path(job)):
+                return None
+        return job
+
+    def submit(self, kind: str, params: dict, extension: str, fingerprint: str,
+               run: JobRunner, created_by: Optional[int] = None) -> dict:
+        """
+        Поставить задачу в очередь. fingerprint - отпечаток параметров (и
+        версии данных), по нему ищется готовый результат для переиспользования.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._cleanup()
+
+        existing = self._reusable(fingerprint)
+        if existing:
+            existing["reused"] = True
+            return existing
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "params": params,
+            "format": extension,
+            "status": PENDING,
+            "progress": 0,
+            "total": None,
+            "error": None,
+            "file": f"{job_id}.{extension}",
+            "created_by": created_by,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "finished_at": None,
+            "reused": False,
+        }
+        self._write(f"{job_id}.json", job)
+        self._write(f"params-{fingerprint}.json", {"job_id": job_id})
+        self._pool().submit(self._execute, job, run)
+        return job
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def _execute(self, job: dict, run: JobRunner) -> None:
+        name = f"{job['id']}.json"
+        last_saved = 0.0
+
+        def progress(done: int, total: Optional[int] = None) -> None:
+            nonlocal last_saved
+            job["progress"] = done
+            if total is not None:
+                job["total"] = total
+            job["updated_at"] = _now()
+            if time.monotonic() - last_saved >= _PROGRESS_INTERVAL_SECONDS:
+                last_saved = time.monotonic()
+                self._write(name, job)
+
+        job["status"] = RUNNING
+        job["updated_at"] = _now()
+        self._write(name, job)
+
+        result = self.result_path(job)
+        tmp = f"{result}.tmp"
+        try:
+            run(tmp, progress)
+            os.replace(tmp, result)
+            job["status"] = DONE
+        except Exception as e:
+            job["status"] = FAILED
+            job["error"] = str(e) or e.__class__.__name__
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        job["updated_at"] = job["finished_at"] = _now()
+        self._write(name, job)
+
+    def _cleanup(self) -> None:
+        """Удалить файлы задач старше retention_seconds"""
+        cutoff = time.time() - self.retention_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.device import Device, LocationType
+from .etag import table_versions
+from .jobs import JobStore, params_fingerprint
+from .label_pdf import stream_label_pdf
+from .labels import LABEL_FORMATS, iter_labels_html, label_pages, qr_image_html, qr_print_size
+from .qr_cache import qr_cache
+
+label_jobs = JobStore(
+    directory=settings.LABEL_JOBS_DIR,
+    workers=settings.REPORT_JOB_WORKERS,
+    freshness_seconds=settings.REPORT_JOB_FRESHNESS_SECONDS,
+    stale_seconds=settings.REPORT_JOB_STALE_SECONDS,
+    retention_seconds=settings.REPORT_JOB_RETENTION_SECONDS,
+)
+
+# Таблицы, от которых зависит содержимое листа наклеек
+_LABEL_TABLES = ("devices", "models")
+
+
+def label_job_filters(params: dict) -> list:
+    """Условия выбора устройств по фильтру задания"""
+    conditions = []
+    if params.get("warehouse_id"):
+        conditions.append(Device.current_location_type == LocationType.WAREHOUSE)
+        conditions.append(Device.current_location_id == params["warehouse_id"])
+    if params.get("employee_id"):
+        conditions.append(Device.current_location_type == LocationType.EMPLOYEE)
+        conditions.append(Device.current_location_id == params["employee_id"])
+    if params.get("device_type_id"):
+        conditions.append(Device.device_type_id == params["device_type_id"])
+    if params.get("company_id"):
+        conditions.append(Device.company_id == params["company_id"])
+    if params.get("created_after"):
+        conditions.append(Device.created_at >= datetime.fromisoformat(params["created_after"]))
+    return conditions
+
+
+def label_job_device_ids(db: Session, params: dict) -> List[int]:
+    """Устройства задания: список id как есть (фильтры сужают его) или все подходящие по id"""
+    conditions = label_job_filters(params)
+    if params.get("device_ids"):
+        if not conditions:
+            return params["device_ids"]
+        matching = set(db.execute(
+            select(Device.id).where(Device.id.in_(params["device_ids"]), *conditions)
+        ).scalars())
+        return [device_id for device_id in params["device_ids"] if device_id in matching]
+    return list(db.execute(select(Device.id).where(*conditions).order_by(Device.id)).scalars())
+
+
+def _html_labels(pages, image_format: str, size: int, base_url: str, progress) -> Iterator[dict]:
+    done = 0
+    for page in pages:
+        for label in page:
+            # QR-коды - ссылки на неизменяемые файлы хранилища: браузер кэширует
+            # их между листами, а сама страница не содержит данных изображений
+            disk_file = qr_cache.disk_file(label["inventory_number"], size, image_format)
+            url = None
+            if disk_file:
+                qr_cache.persist(label["inventory_number"], size, image_format, label["image"])
+                url = f"{base_url}api/labels/qr-image/{disk_file}"
+            yield dict(label, qr_code=qr_image_html(label["image"], image_format, url))
+        done += len(page)
+        progress(done)
+
+
+def _pdf_pages(pages, progress) -> Iterator[List[dict]]:
+    done = 0
+    for page in pages:
+        yield [dict(label, qr_svg=label["image"]) for label in page]
+        done += len(page)
+        progress(done)
+
+
+def _runner(params: dict, base_url: str) -> Callable:
+    def run(path: str, progress) -> None:
+        db = SessionLocal()
+        try:
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            device_ids = label_job_device_ids(db, params)
+            progress(0, len(device_ids))
+            label_format = LABEL_FORMATS[params["format"]]
+            per_page = label_format["per_page"]
+
+            if params["output"] == "pdf":
+                pages = label_pages(db, device_ids, per_page, "svg", 0)
+                with open(path, "wb") as f:
+                    for chunk in stream_label_pdf(_pdf_pages(pages, progress), label_format):
+                        f.write(chunk)
+            else:
+                image_format = params["image_format"]
+                size = qr_print_size(label_format)
+                pages = label_pages(db, device_ids, per_page, image_format, size)
+                labels = _html_labels(pages, image_format, size, base_url, progress)
+                with open(path, "w", encoding="utf-8") as f:
+                    for chunk in iter_labels_html(params["format"], label_format, len(device_ids), labels):
+                        f.write(chunk)
+        finally:
+            db.close()
+    return run
+
+
+def submit_label_job(db: Session, params: dict, base_url: str, created_by: Optional[int] = None) -> dict:
+    """
+    Поставить формирование листа наклеек в очередь. Такое же задание при
+    неизменных устройствах и моделях возвращает уже готовый (или
+    формируемый) лист.
+    """
+    versions = table_versions(db, _LABEL_TABLES)
+    fingerprint = params_fingerprint("labels", params, base_url, versions)
+    return label_jobs.submit("labels", params, params["output"], fingerprint, _runner(params, base_url), created_by)
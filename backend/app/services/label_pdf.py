@@ -0,0 +1,197 @@
+import re
+import zlib
+from typing import Iterable, Iterator, List, Tuple
+
+# Пунктов (1/72 дюйма) в миллиметре
+MM = 72 / 25.4
+PAGE_WIDTH = 210 * MM
+PAGE_HEIGHT = 297 * MM
+LABEL_GAP = 2 * MM
+LABEL_PADDING = 1.5 * MM
+
+# Номера постоянных объектов; страницы нумеруются с FIRST_PAGE_OBJECT
+_CATALOG, _PAGES, _FONT, _FONT_BOLD = 1, 2, 3, 4
+_FIRST_PAGE_OBJECT = 5
+
+# Стандартный шрифт Helvetica не встраивается; кириллица (cp1251)
+# подключается через Differences с именами глифов Adobe (afii...)
+_CYRILLIC_GLYPHS = (
+    [f"afii{code}" for code in [*range(10017, 10023), *range(10024, 10050)]]  # А-Я без Ё
+    + [f"afii{code}" for code in [*range(10065, 10071), *range(10072, 10098)]]  # а-я без ё
+)
+_ENCODING = (
+    "<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences "
+    "[168 /afii10023 184 /afii10071 192 " + " ".join(f"/{name}" for name in _CYRILLIC_GLYPHS) + "] >>"
+)
+
+# Ширины глифов Helvetica (ASCII 32-126) в тысячных долях кегля - для выравнивания текста
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+def _grid(page_size: float, label_size: float, count: int) -> Tuple[float, float]:
+    """Поле и промежуток для сетки по центру листа; промежуток сужается, если не помещается"""
+    gap = LABEL_GAP
+    if count > 1:
+        gap = max(0.0, min(gap, (page_size - count * label_size) / (count - 1)))
+    margin = max(0.0, (page_size - count * label_size - (count - 1) * gap) / 2)
+    return margin, gap
+
+
+def _text_width(text: str, font_size: float, bold: bool = False) -> float:
+    units = 0
+    for char in text:
+        code = ord(char)
+        if 32 <= code <= 126:
+            units += _HELVETICA_WIDTHS[code - 32]
+        else:
+            units += 650 if char.isupper() else 540
+    return units * font_size / 1000 * (1.06 if bold else 1)
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1251", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def parse_qr_svg(svg: bytes) -> Tuple[int, List[Tuple[int, int, int]]]:
+    """Размер в модулях и отрезки темных модулей (x, y, длина) из SVG qr_cache"""
+    text = svg.decode()
+    modules = int(re.search(r'viewBox="0 0 (\d+) ', text).group(1))
+    runs = [(int(x), int(y), int(w)) for x, y, w in re.findall(r"M(\d+) (\d+)h(\d+)", text)]
+    return modules, runs
+
+
+def _draw_qr(svg: bytes, x: float, y_top: float, side: float) -> bytes:
+    modules, runs = parse_qr_svg(svg)
+    scale = side / modules
+    # Система координат в модулях с осью y вниз, как в SVG
+    commands = [f"q {scale:.4f} 0 0 {-scale:.4f} {x:.2f} {y_top:.2f} cm"]
+    commands.extend(f"{run_x} {run_y} {width} 1 re" for run_x, run_y, width in runs)
+    commands.append("f Q")
+    return "\n".join(commands).encode()
+
+
+def _draw_label(label: dict, x: float, y: float, width: float, height: float) -> bytes:
+    """Наклейка с левым нижним углом (x, y): QR слева, три строки текста справа"""
+    parts = [f"0.8 G 0.3 w {x:.2f} {y:.2f} {width:.2f} {height:.2f} re S".encode()]
+
+    side = min(height - 2 * LABEL_PADDING, width / 2)
+    parts.append(_draw_qr(label["qr_svg"], x + LABEL_PADDING, y + (height + side) / 2, side))
+
+    text_x = x + 2 * LABEL_PADDING + side
+    text_width = width - 3 * LABEL_PADDING - side
+    lines = [
+        (label["model_name"], True),
+        (f"Сер: {label['serial_number']}", False),
+        (f"Инв: {label['inventory_number']}", True),
+    ]
+    base_size = min(9.0, (height - 2 * LABEL_PADDING) / (len(lines) * 1.25))
+    sizes = [
+        min(base_size, base_size * text_width / max(_text_width(text, base_size, bold), 0.01))
+        for text, bold in lines
+    ]
+    block = sum(size * 1.25 for size in sizes)
+    baseline = y + (height + block) / 2
+    for (text, bold), size in zip(lines, sizes):
+        baseline -= size * 1.25
+        font = "F2" if bold else "F1"
+        parts.append(
+            f"BT /{font} {size:.2f} Tf 0 g {text_x:.2f} {baseline + size * 0.25:.2f} Td ".encode()
+            + _pdf_string(text) + b" Tj ET"
+        )
+    return b"\n".join(parts)
+
+
+class LabelPdfWriter:
+    """
+    Потоковая запись PDF: каждая страница отдается байтами сразу после
+    отрисовки, в памяти остаются только смещения объектов для таблицы xref.
+    Дерево страниц и каталог пишутся в конце (порядок объектов в PDF не важен).
+    """
+
+    def __init__(self):
+        self._offsets = {}
+        self._position = 0
+        self._page_objects: List[int] = []
+        self._next_object = _FIRST_PAGE_OBJECT
+
+    def _emit(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self._offsets[number] = self._position
+        return self._emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def begin(self) -> bytes:
+        header = self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        fonts = b"".join(
+            self._object(number, (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding {_ENCODING} >>"
+            ).encode())
+            for number, name in ((_FONT, "Helvetica"), (_FONT_BOLD, "Helvetica-Bold"))
+        )
+        return header + fonts
+
+    def page(self, content: bytes) -> bytes:
+        stream_number, page_number = self._next_object, self._next_object + 1
+        self._next_object += 2
+        self._page_objects.append(page_number)
+        data = zlib.compress(content)
+        stream = self._object(
+            stream_number,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream",
+        )
+        page = self._object(page_number, (
+            f"<< /Type /Page /Parent {_PAGES} 0 R /MediaBox [0 0 {PAGE_WIDTH:.2f} {PAGE_HEIGHT:.2f}] "
+            f"/Resources << /Font << /F1 {_FONT} 0 R /F2 {_FONT_BOLD} 0 R >> >> "
+            f"/Contents {stream_number} 0 R >>"
+        ).encode())
+        return stream + page
+
+    def finish(self) -> bytes:
+        kids = " ".join(f"{number} 0 R" for number in self._page_objects)
+        data = self._object(_PAGES, (
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_objects)} >>"
+        ).encode())
+        data += self._object(_CATALOG, f"<< /Type /Catalog /Pages {_PAGES} 0 R >>".encode())
+
+        xref_position = self._position
+        size = self._next_object
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for number in range(1, size):
+            xref.append(b"%010d 00000 n \n" % self._offsets[number])
+        xref.append(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, _CATALOG, xref_position)
+        )
+        return data + self._emit(b"".join(xref))
+
+
+def stream_label_pdf(pages: Iterable[List[dict]], label_format: dict) -> Iterator[bytes]:
+    """
+    PDF с наклейками формата label_format (width/height в мм, cols/rows).
+    pages - наклейки постранично (model_name, serial_number, inventory_number,
+    qr_svg из qr_cache); следующая страница запрашивается только после отдачи текущей.
+    """
+    width = label_format["width"] * MM
+    height = label_format["height"] * MM
+    margin_x, gap_x = _grid(PAGE_WIDTH, width, label_format["cols"])
+    margin_y, gap_y = _grid(PAGE_HEIGHT, height, label_format["rows"])
+    writer = LabelPdfWriter()
+    yield writer.begin()
+    for labels in pages:
+        content = []
+        for index, label in enumerate(labels):
+            row, col = divmod(index, label_format["cols"])
+            x = margin_x + col * (width + gap_x)
+            y = PAGE_HEIGHT - margin_y - (row + 1) * height - row * gap_y
+            content.append(_draw_label(label, x, y, width, height))
+        yield writer.page(b"\n".join(content))
+    yield writer.finish()
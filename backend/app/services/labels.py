@@ -0,0 +1,187 @@
+import base64
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.device import Device
+from ..models.model import Model
+from .qr_cache import QR_MEDIA_TYPES, qr_cache
+from .reference_cache import reference_cache
+
+# Разрешение, под которое рисуется PNG на странице печати
+LABEL_PRINT_DPI = 300
+
+# Форматы наклеек (ширина x высота в мм, количество на листе)
+LABEL_FORMATS = {
+    "38x21": {"width": 38, "height": 21, "per_page": 24, "cols": 4, "rows": 6},
+    "50x25": {"width": 50, "height": 25, "per_page": 21, "cols": 3, "rows": 7},
+    "70x36": {"width": 70, "height": 36, "per_page": 12, "cols": 3, "rows": 4},
+    "100x50": {"width": 100, "height": 50, "per_page": 8, "cols": 2, "rows": 4},
+}
+
+
+def qr_print_size(label_format: dict) -> int:
+    """Размер QR-кода наклейки в пикселях при печати с LABEL_PRINT_DPI"""
+    return round((label_format["width"] - 10) * LABEL_PRINT_DPI / 25.4)
+
+
+def label_pages(db: Session, device_ids: List[int], per_page: int,
+                image_format: Optional[str], size: int) -> Iterator[List[dict]]:
+    """
+    Наклейки постранично в порядке device_ids: устройства, модели и QR-коды
+    (из qr_cache, промахи страницы - одним пакетом) загружаются на одну
+    страницу за раз. Отсутствующие устройства пропускаются.
+    image_format=None - без изображений (принтер рисует QR сам).
+    """
+    for start in range(0, len(device_ids), per_page):
+        page_ids = device_ids[start:start + per_page]
+        devices = {device.id: device for device in db.query(Device).filter(Device.id.in_(page_ids))}
+        page = [devices[device_id] for device_id in page_ids if device_id in devices]
+        images = {}
+        if image_format:
+            images = qr_cache.get_images([device.inventory_number for device in page], size, image_format)
+        models = reference_cache.get_many(db, Model, {device.model_id for device in page})
+        yield [
+            {
+                "model_name": models[device.model_id].name if device.model_id in models else "Не указана",
+                "serial_number": device.serial_number,
+                "inventory_number": device.inventory_number,
+                "image": images.get(device.inventory_number),
+            }
+            for device in page
+        ]
+        db.expunge_all()
+
+
+def qr_image_html(image: bytes, image_format: str, url: Optional[str] = None) -> str:
+    """Разметка QR-кода наклейки: ссылка на изображение, встроенный SVG или data URL"""
+    if url:
+        return f'<img src="{url}" alt="QR Code">'
+    if image_format == "svg":
+        return image.decode()
+    return f'<img src="data:{QR_MEDIA_TYPES[image_format]};base64,{base64.b64encode(image).decode()}" alt="QR Code">'
+
+
+def iter_labels_html(format_name: str, label_format: dict, count: int, labels: Iterable[dict]) -> Iterator[str]:
+    """
+    HTML страница печати наклеек частями: шапка, по блоку на наклейку
+    (model_name, serial_number, inventory_number и разметка qr_code), окончание.
+    """
+    yield f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Печать наклеек</title>
+        <style>
+            @page {{
+                size: A4;
+                margin: 0;
+            }}
+            body {{
+                margin: 0;
+                padding: 10mm;
+                font-family: Arial, sans-serif;
+            }}
+            .labels-container {{
+                display: grid;
+                grid-template-columns: repeat({label_format["cols"]}, 1fr);
+                gap: 2mm;
+                width: 100%;
+            }}
+            .label {{
+                width: {label_format["width"]}mm;
+                height: {label_format["height"]}mm;
+                border: 1px solid #ccc;
+                padding: 2mm;
+                box-sizing: border-box;
+                display: flex;
+                flex-direction: column;
+                align-items: center;
+                justify-content: center;
+                page-break-inside: avoid;
+            }}
+            .qr-code {{
+                width: {label_format["width"] - 10}mm;
+                height: {label_format["width"] - 10}mm;
+                margin-bottom: 1mm;
+            }}
+            .qr-code img, .qr-code svg {{
+                width: 100%;
+                height: 100%;
+                object-fit: contain;
+                image-rendering: pixelated;
+            }}
+            .label-text {{
+                font-size: {max(6, label_format["width"] / 6)}pt;
+                text-align: center;
+                margin-top: 0.5mm;
+                line-height: 1.2;
+            }}
+            .label-text-bold {{
+                font-weight: bold;
+            }}
+            .inventory-number {{
+                font-size: {max(7, label_format["width"] / 5)}pt;
+                font-weight: bold;
+                text-align: center;
+                margin-top: 1mm;
+            }}
+            @media print {{
+                body {{
+                    margin: 0;
+                    padding: 0;
+                }}
+                .no-print {{
+                    display: none;
+                }}
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="no-print" style="margin-bottom: 20px; padding: 20px; background: #f5f5f5; border-radius: 8px;">
+            <h2>Печать наклеек - Формат {format_name} мм</h2>
+            <p><strong>Количество устройств:</strong> {count}</p>
+            <div style="margin: 15px 0;">
+                <p style="margin-bottom: 10px;"><strong>Инструкция:</strong></p>
+                <ol style="margin-left: 20px; margin-bottom: 15px;">
+                    <li>Нажмите кнопку "Печать" ниже</li>
+                    <li>В диалоге печати выберите нужный принтер</li>
+                    <li>Убедитесь, что выбрана правильная бумага (A4, наклейки)</li>
+                    <li>Настройте параметры печати (масштаб 100%, без полей)</li>
+                    <li>Нажмите "Печать"</li>
+                </ol>
+            </div>
+            <div style="display: flex; gap: 10px;">
+                <button onclick="window.print()" style="padding: 10px 20px; font-size: 16px; background: #1890ff; color: white; border: none; border-radius: 4px; cursor: pointer;">
+                    🖨️ Печать (выбрать принтер)
+                </button>
+                <button onclick="window.close()" style="padding: 10px 20px; font-size: 16px; background: #ccc; color: #333; border: none; border-radius: 4px; cursor: pointer;">
+                    Закрыть
+                </button>
+            </div>
+            <div style="margin-top: 15px; padding: 10px; background: #fff3cd; border-radius: 4px; border: 1px solid #ffc107;">
+                <p style="margin: 0; font-size: 12px;">
+                    <strong>💡 Совет:</strong> В диалоге печати вы можете выбрать принтер из списка доступных устройств. 
+                    Убедитесь, что в принтере установлена бумага для наклеек формата {format_name} мм.
+                </p>
+            </div>
+        </div>
+        <div class="labels-container">
+    """
+    
+    for label in labels:
+        yield f"""
+            <div class="label">
+                <div class="qr-code">{label['qr_code']}</div>
+                <div class="label-text label-text-bold">{label['model_name']}</div>
+                <div class="label-text">Сер: {label['serial_number']}</div>
+                <div class="inventory-number">Инв: {label['inventory_number']}</div>
+            </div>
+        """
+    
+    yield """
+        </div>
+    </body>
+    </html>
+    """
@@ -0,0 +1,202 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, case, func, insert, literal, or_, select, true
+from sqlalchemy.orm import Session
+
+from ..models.device import Device, LocationType
+from ..models.employee import Employee
+from ..models.location_checkpoint import LocationCheckpoint
+from ..models.movement_history import MovementHistory, MovementHistoryArchive
+from ..models.warehouse import Warehouse
+from ..schemas.report import DeviceLocationAsOf
+
+
+def latest_checkpoint(db: Session, at: datetime) -> Optional[datetime]:
+    """Момент последнего снимка не позже at"""
+    return db.execute(
+        select(func.max(LocationCheckpoint.taken_at)).where(LocationCheckpoint.taken_at <= at)
+    ).scalar()
+
+
+def _snapshot_query(at: datetime, checkpoint_at: Optional[datetime], after_device_id: Optional[int] = None):
+    """
+    Местоположение каждого устройства, существовавшего на момент at:
+
+    1. последнее перемещение не позже at (после снимка, если он есть);
+    2. иначе - местоположение из снимка;
+    3. иначе - откуда устройство увезли первым перемещением после at;
+    4. иначе устройство с тех пор не перемещалось - текущее местоположение.
+
+    Перемещения ищутся LATERAL-подзапросами с LIMIT 1 по индексу
+    (device_id, moved_at); граница снимка отсекает старые секции истории.
+    after_device_id - только устройства с большим id (keyset-пагинация).
+    """
+    last_conditions = [MovementHistory.device_id == Device.id, MovementHistory.moved_at <= at]
+    if checkpoint_at is not None:
+        last_conditions.append(MovementHistory.moved_at > checkpoint_at)
+    last_move = (
+        select(
+            MovementHistory.id,
+            MovementHistory.to_location_type,
+            MovementHistory.to_location_id,
+            MovementHistory.moved_at,
+        )
+        .where(*last_conditions)
+        .order_by(MovementHistory.moved_at.desc(), MovementHistory.id.desc())
+        .limit(1)
+        .lateral("last_move")
+    )
+
+    if checkpoint_at is not None:
+        checkpoint_join = and_(
+            LocationCheckpoint.taken_at == checkpoint_at,
+            LocationCheckpoint.device_id == Device.id,
+        )
+    else:
+        checkpoint_join = literal(False)
+
+    # Следующее перемещение нужно только устройствам без истории до at и без снимка
+    next_move = (
+        select(MovementHistory.from_location_type, MovementHistory.from_location_id)
+        .where(
+            last_move.c.id.is_(None),
+            LocationCheckpoint.device_id.is_(None),
+            MovementHistory.device_id == Device.id,
+            MovementHistory.moved_at > at,
+        )
+        .order_by(MovementHistory.moved_at, MovementHistory.id)
+        .limit(1)
+        .lateral("next_move")
+    )
+
+    def pick(from_last, from_checkpoint, from_next, current):
+        return case(
+            (last_move.c.id.is_not(None), from_last),
+            (LocationCheckpoint.device_id.is_not(None), from_checkpoint),
+            (next_move.c.from_location_type.is_not(None), from_next),
+            else_=current,
+        )
+
+    conditions = [or_(Device.created_at.is_(None), Device.created_at <= at)]
+    if after_device_id is not None:
+        conditions.append(Device.id > after_device_id)
+
+    return (
+        select(
+            Device.id.label("device_id"),
+            Device.inventory_number,
+            Device.serial_number,
+            pick(
+                last_move.c.to_location_type,
+                LocationCheckpoint.location_type,
+                next_move.c.from_location_type,
+                Device.current_location_type,
+            ).label("location_type"),
+            pick(
+                last_move.c.to_location_id,
+                LocationCheckpoint.location_id,
+                next_move.c.from_location_id,
+                Device.current_location_id,
+            ).label("location_id"),
+            func.coalesce(last_move.c.moved_at, LocationCheckpoint.moved_at).label("moved_at"),
+        )
+        .select_from(Device)
+        .outerjoin(LocationCheckpoint, checkpoint_join)
+        .outerjoin(last_move, true())
+        .outerjoin(next_move, true())
+        .where(*conditions)
+    )
+
+
+def archive_boundary(db: Session) -> Optional[datetime]:
+    """Момент последнего перемещения, перенесенного в movement_history_archive"""
+    return db.execute(select(func.max(MovementHistoryArchive.moved_at))).scalar()
+
+
+def ensure_history_complete(db: Session, at: datetime) -> Optional[datetime]:
+    """
+    Граница берется из самого архива (скрипт архивации может запускаться с
+    любым --years): момент раньше последнего архивного перемещения отклоняется
+    (400) - восстановленное местоположение было бы неполным. Возвращает
+    границу или None, если архив пуст.
+    """
+    boundary = archive_boundary(db)
+    if boundary is not None and at < boundary:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Movement history up to {boundary.isoformat()} is archived; choose a later time"
+        )
+    return boundary
+
+
+def locations_as_of(
+    db: Session,
+    at: datetime,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+    after_device_id: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[DeviceLocationAsOf]:
+    """
+    Где находилось каждое устройство в момент at - одним запросом, по
+    возрастанию id устройства; after_device_id и limit задают страницу.
+    """
+    boundary = ensure_history_complete(db, at)
+    checkpoint_at = latest_checkpoint(db, at)
+    # Снимок до границы архива не учитывает архивные перемещения после него;
+    # без снимка местоположение восстанавливается по перемещениям после at
+    if boundary is not None and checkpoint_at is not None and checkpoint_at < boundary:
+        checkpoint_at = None
+    snapshot = _snapshot_query(at, checkpoint_at, after_device_id).subquery("snapshot")
+
+    query = (
+        select(
+            snapshot,
+            func.coalesce(Employee.full_name, Warehouse.name).label("location_name"),
+        )
+        .outerjoin(Employee, and_(
+            snapshot.c.location_type == LocationType.EMPLOYEE,
+            Employee.id == snapshot.c.location_id,
+        ))
+        .outerjoin(Warehouse, and_(
+            snapshot.c.location_type == LocationType.WAREHOUSE,
+            Warehouse.id == snapshot.c.location_id,
+        ))
+        .order_by(snapshot.c.device_id)
+    )
+    if location_type:
+        query = query.where(snapshot.c.location_type == location_type)
+    if location_id:
+        query = query.where(snapshot.c.location_id == location_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [DeviceLocationAsOf.model_validate(row._mapping) for row in db.execute(query)]
+
+
+def create_location_checkpoint(db: Session, at: datetime) -> int:
+    """
+    Сохраняет снимок местоположений на момент at (строится от предыдущего
+    снимка). Снимать следует только прошедшие моменты. Возвращает число строк,
+    0 - если снимок на этот момент уже есть. commit выполняет вызывающий код.
+    """
+    exists = db.execute(
+        select(LocationCheckpoint.device_id).where(LocationCheckpoint.taken_at == at).limit(1)
+    ).first()
+    if exists:
+        return 0
+
+    snapshot = _snapshot_query(at, latest_checkpoint(db, at)).subquery("snapshot")
+    result = db.execute(insert(LocationCheckpoint).from_select(
+        ["taken_at", "device_id", "location_type", "location_id", "moved_at"],
+        select(
+            literal(at, LocationCheckpoint.taken_at.type),
+            snapshot.c.device_id,
+            snapshot.c.location_type,
+            snapshot.c.location_id,
+            snapshot.c.moved_at,
+        ),
+    ))
+    return result.rowcount
@@ -0,0 +1,169 @@
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..config import settings
+
+PARENT_TABLE = "movement_history"
+DEFAULT_PARTITION = "movement_history_default"
+ARCHIVE_TABLE = "movement_history_archive"
+
+# Ключ advisory-блокировки обслуживания секций: воркеры приложения и скрипт
+# архивации не должны одновременно создавать или отключать секции
+_MAINTENANCE_LOCK = "movement_history_partitions"
+
+# Месячные секции: movement_history_p2026_10
+_PARTITION_NAME = re.compile(r"^movement_history_p(\d{4})_(\d{2})$")
+
+_COLUMNS = (
+    "id, device_id, from_location_type, from_location_id, "
+    "to_location_type, to_location_id, moved_at, moved_by"
+)
+
+
+def month_start(value: datetime) -> datetime:
+    """Начало месяца (UTC), в который попадает value"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT_TABLE}_p{start:%Y_%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """movement_history уже секционирована (до миграции 0005 это обычная таблица)"""
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": PARENT_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def lock_partition_maintenance(conn: Connection) -> None:
+    """Блокировка до конца транзакции; второй процесс ждет и видит уже созданные секции"""
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _MAINTENANCE_LOCK})
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, datetime, datetime]]:
+    """Месячные секции: (имя, начало, конец), по возрастанию"""
+    names = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": PARENT_TABLE}).scalars()
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_partition(conn: Connection, start: datetime) -> bool:
+    """
+    Создает секцию за месяц. Строки этого месяца, уже попавшие в секцию по
+    умолчанию, переносятся в новую секцию до ATTACH - иначе PostgreSQL
+    откажется подключать секцию. Возвращает False, если секция уже есть.
+    """
+    start = month_start(start)
+    name = partition_name(start)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    end = add_months(start, 1)
+    bounds = {"start": start, "end": end}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE moved_at >= :start AND moved_at < :end RETURNING {_COLUMNS}"
+        f") INSERT INTO {name} ({_COLUMNS}) SELECT {_COLUMNS} FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    return True
+
+
+def ensure_movement_partitions(
+    conn: Connection,
+    months_ahead: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Создает секции с текущего месяца на months_ahead вперед, а также для
+    месяцев, строки которых лежат в секции по умолчанию. Возвращает имена
+    созданных секций. Вызывается при старте приложения и из скрипта архивации;
+    параллельные вызовы выполняются по очереди (advisory-блокировка).
+    """
+    if not is_partitioned(conn):
+        return []
+    lock_partition_maintenance(conn)
+    if months_ahead is None:
+        months_ahead = settings.MOVEMENT_PARTITION_MONTHS_AHEAD
+    current = month_start(now or datetime.now(timezone.utc))
+
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    months.update(
+        month_start(value) for value in conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', moved_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' "
+            f"FROM {DEFAULT_PARTITION}"
+        )).scalars()
+    )
+
+    created = []
+    for start in sorted(months):
+        if create_partition(conn, start):
+            created.append(partition_name(start))
+    return created
+
+
+def archive_movement_partitions(conn: Connection, before: datetime) -> List[Tuple[str, int]]:
+    """
+    Переносит в movement_history_archive все месячные секции, целиком лежащие
+    раньше before: секция отключается (DETACH), строки копируются в архив,
+    секция удаляется. Старые строки из секции по умолчанию переносятся так же.
+    Возвращает (имя секции, число строк).
+    """
+    if not is_partitioned(conn):
+        return []
+    lock_partition_maintenance(conn)
+
+    archived = []
+    for name, _, end in list_partitions(conn):
+        if end > before:
+            break
+        conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        result = conn.execute(text(
+            f"INSERT INTO {ARCHIVE_TABLE} ({_COLUMNS}) SELECT {_COLUMNS} FROM {name}"
+        ))
+        conn.execute(text(f"DROP TABLE {name}"))
+        archived.append((name, result.rowcount))
+
+    result = conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE moved_at < :before RETURNING {_COLUMNS}"
+        f") INSERT INTO {ARCHIVE_TABLE} ({_COLUMNS}) SELECT {_COLUMNS} FROM moved"
+    ), {"before": before})
+    if result.rowcount:
+        archived.append((DEFAULT_PARTITION, result.rowcount))
+    return archived
+
+
+def archive_cutoff(years: Optional[int] = None, now: Optional[datetime] = None) -> datetime:
+    """Граница архивации: начало месяца years лет назад"""
+    if years is None:
+        years = settings.MOVEMENT_ARCHIVE_AFTER_YEARS
+    return add_months(month_start(now or datetime.now(timezone.utc)), -12 * years)
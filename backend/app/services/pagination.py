@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """Упаковывает значения ключа последней строки страницы в непрозрачную строку"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """
+    Распаковывает курсор из encode_cursor. types - типы значений ключа по порядку
+    (int, str или datetime); при несовпадении количества или типа - 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise _invalid_cursor()
+    if not isinstance(values, list) or len(values) != len(types):
+        raise _invalid_cursor()
+    return [_cursor_value(value, value_type) for value, value_type in zip(values, types)]
+
+
+def _cursor_value(value: Any, value_type: type) -> Any:
+    if value_type is datetime:
+        return parse_cursor_datetime(value)
+    # bool - подкласс int, но в курсоре не встречается
+    if not isinstance(value, value_type) or isinstance(value, bool):
+        raise _invalid_cursor()
+    return value
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise _invalid_cursor()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise _invalid_cursor()
@@ -0,0 +1,316 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import qrcode
+from PIL import Image
+
+from ..config import settings
+
+# Меняется вместе с параметрами отрисовки, чтобы старые файлы на диске не использовались
+QR_RENDER_VERSION = 2
+
+QR_IMAGE_FORMATS = ("png", "svg")
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def qr_matrix(data: str) -> List[List[bool]]:
+    """Модули QR-кода (вместе с белой рамкой): True - темный модуль"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        border=2,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_qr_png(data: str, size: int) -> bytes:
+    """
+    Однобитный PNG: каждый модуль - квадрат из целого числа пикселей,
+    наибольший, при котором код не превышает size (но не меньше 1 пикселя).
+    Без масштабирования с интерполяцией края модулей остаются четкими.
+    """
+    matrix = qr_matrix(data)
+    modules = len(matrix)
+    scale = max(1, size // modules)
+
+    img = Image.new("1", (modules, modules), 1)
+    img.putdata([0 if dark else 1 for row in matrix for dark in row])
+    if scale > 1:
+        # Целочисленное увеличение NEAREST - копирование пикселей, без сглаживания
+        img = img.resize((modules * scale, modules * scale), Image.NEAREST)
+
+    buffered = BytesIO()
+    img.save(buffered, format="PNG", optimize=True)
+    return buffered.getvalue()
+
+
+def render_qr_svg(data: str) -> bytes:
+    """
+    Векторный QR-код: один path из горизонтальных отрезков темных модулей,
+    координаты в модулях (viewBox), размер задает страница.
+    """
+    matrix = qr_matrix(data)
+    modules = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < modules:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < modules and row[x]:
+                x += 1
+            parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {modules} {modules}" '
+        f'shape-rendering="crispEdges"><rect width="{modules}" height="{modules}" fill="#fff"/>'
+        f'<path d="{"".join(parts)}" fill="#000"/></svg>'
+    ).encode()
+
+
+def render_qr(data: str, size: int, image_format: str) -> bytes:
+    if image_format == "svg":
+        return render_qr_svg(data)
+    return render_qr_png(data, size)
+
+
+def qr_digest(data: str) -> str:
+    """
+    Адрес содержимого QR-кода в дисковом хранилище. HMAC с секретом сервера:
+    по известному формату инвентарного номера адрес не вычислить, поэтому
+    ссылки /labels/qr-image/... не позволяют проверять, какие номера существуют.
+    """
+    return hmac.new(
+        settings.SECRET_KEY.encode(), f"{QR_RENDER_VERSION}:{data}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+class QrCache:
+    """
+    Двухуровневый кэш изображений QR-кодов: LRU в памяти процесса по
+    (данные, размер, формат) и хранилище на диске, адресуемое HMAC данных
+    (<каталог>/<хэш[:2]>/<хэш>/<размер>.png или vector.svg), общее для всех
+    воркеров. SVG не зависит от размера и хранится в одном экземпляре.
+    Данные QR - инвентарный номер, поэтому при его смене старые
+    изображения удаляются через invalidate.
+
+    Пакетные промахи (get_images) от parallel_min_batch штук рисуются пулом
+    процессов: отрисовка упирается в CPU и под GIL потоки не помогают.
+    """
+
+    def __init__(self, directory: Optional[str], max_entries: int,
+                 render_workers: int, parallel_min_batch: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.render_workers = render_workers
+        self.parallel_min_batch = parallel_min_batch
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def _directory_for(self, data: str) -> str:
+        digest = qr_digest(data)
+        return os.path.join(self.directory, digest[:2], digest)
+
+    @staticmethod
+    def _file_name(size: int, image_format: str) -> str:
+        return "vector.svg" if image_format == "svg" else f"{size}.png"
+
+    def _read_disk(self, data: str, size: int, image_format: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self._directory_for(data), self._file_name(size, image_format)), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Warning: QR cache read failed: {e}")
+            return None
+
+    def _write_disk(self, data: str, size: int, image_format: str, image: bytes) -> None:
+        if not self.directory:
+            return
+        try:
+            directory = self._directory_for(data)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, self._file_name(size, image_format))
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(image)
+            os.replace(tmp, path)
+        except OSError as e:
+            # Диск - только второй уровень: без него кэш продолжает работать в памяти
+            print(f"Warning: QR cache write failed: {e}")
+
+    def _remember(self, key: Tuple[str, int, str], image: bytes) -> None:
+        with self._lock:
+            if key not in self._entries:
+                self._bytes += len(image)
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_image(self, data: str, size: int, image_format: str = "png") -> bytes:
+        """Изображение QR-кода: из памяти, с диска или отрисовка с сохранением в оба уровня"""
+        if image_format == "svg":
+            size = 0
+        key = (data, size, image_format)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return image
+
+        image = self._read_disk(data, size, image_format)
+        if image is not None:
+            with self._lock:
+                self._disk_hits += 1
+        else:
+            image = render_qr(data, size, image_format)
+            with self._lock:
+                self._misses += 1
+            self._write_disk(data, size, image_format, image)
+        self._remember(key, image)
+        return image
+
+    def disk_file(self, data: str, size: int, image_format: str = "png") -> Optional[str]:
+        """Путь изображения в дисковом хранилище относительно каталога (None - диск отключен)"""
+        if not self.directory:
+            return None
+        if image_format == "svg":
+            size = 0
+        digest = qr_digest(data)
+        return f"{digest}/{self._file_name(size, image_format)}"
+
+    def persist(self, data: str, size: int, image_format: str, image: bytes) -> None:
+        """Записать изображение на диск, если его там нет (например, попало в память до очистки диска)"""
+        if image_format == "svg":
+            size = 0
+        if self.directory and not os.path.exists(os.path.join(self._directory_for(data), self._file_name(size, image_format))):
+            self._write_disk(data, size, image_format, image)
+
+    def digest_path(self, digest: str, name: str) -> Optional[str]:
+        """Файл хранилища по хэшу данных и имени (<размер>.png или vector.svg)"""
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, digest[:2], digest, name)
+
+    def get_images(self, items: Iterable[str], size: int, image_format: str = "png") -> Dict[str, bytes]:
+        """
+        Изображения QR-кодов для набора данных. Попадания берутся из памяти
+        и с диска, оставшиеся промахи рисуются одним пакетом.
+        """
+        if image_format == "svg":
+            size = 0
+        result = {}
+        missing = []
+        with self._lock:
+            for data in dict.fromkeys(items):
+                key = (data, size, image_format)
+                image = self._entries.get(key)
+                if image is None:
+                    missing.append(data)
+                else:
+                    self._entries.move_to_end(key)
+                    result[data] = image
+            self._hits += len(result)
+
+        to_render = []
+        for data in missing:
+            image = self._read_disk(data, size, image_format)
+            if image is None:
+                to_render.append(data)
+            else:
+                result[data] = image
+                self._remember((data, size, image_format), image)
+        with self._lock:
+            self._disk_hits += len(missing) - len(to_render)
+            self._misses += len(to_render)
+
+        for data, image in zip(to_render, self._render_many(to_render, size, image_format)):
+            self._write_disk(data, size, image_format, image)
+            self._remember((data, size, image_format), image)
+            result[data] = image
+        return result
+
+    def _render_many(self, items: List[str], size: int, image_format: str) -> List[bytes]:
+        if self.render_workers > 1 and len(items) >= self.parallel_min_batch:
+            chunksize = max(1, len(items) // (self.render_workers * 4))
+            try:
+                return list(self._render_pool().map(
+                    render_qr, items, repeat(size), repeat(image_format), chunksize=chunksize
+                ))
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Warning: QR render pool failed, rendering in process: {e}")
+                with self._pool_lock:
+                    self._pool = None
+        return [render_qr(data, size, image_format) for data in items]
+
+    def _render_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: fork процесса с потоками сервера и открытыми соединениями небезопасен
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def invalidate(self, data: str) -> None:
+        """Удалить все размеры и форматы QR-кода с данными data (из памяти и с диска)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == data]:
+                self._bytes -= len(self._entries.pop(key))
+        if self.directory:
+            shutil.rmtree(self._directory_for(data), ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "directory": self.directory,
+                "render_workers": self.render_workers,
+            }
+
+
+qr_cache = QrCache(
+    directory=settings.QR_CACHE_DIR or None,
+    max_entries=settings.QR_CACHE_MAX_ENTRIES,
+    render_workers=settings.QR_RENDER_WORKERS or os.cpu_count() or 1,
+    parallel_min_batch=settings.QR_PARALLEL_MIN_BATCH,
+)
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.company import Company
+from ..models.device_type import DeviceType
+from ..models.brand import Brand
+from ..models.model import Model
+from ..models.warehouse import Warehouse
+
+# Небольшие, редко меняющиеся справочники
+CACHED_MODELS = (Company, DeviceType, Brand, Model, Warehouse)
+
+
+def _snapshot(obj) -> SimpleNamespace:
+    """Копия значений колонок - ORM-объект нельзя держать между сессиями"""
+    return SimpleNamespace(**{
+        column.key: getattr(obj, column.key) for column in inspect(obj).mapper.column_attrs
+    })
+
+
+class ReferenceCache:
+    """
+    Кэш справочников в памяти процесса: LRU по каждой таблице с ограничением
+    размера и TTL. Хранит снимки строк (SimpleNamespace с полями колонок),
+    промахи не кэшируются. Роутеры справочников вызывают invalidate после
+    изменения строк; между воркерами расхождение ограничено TTL.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[type, OrderedDict] = {model: OrderedDict() for model in CACHED_MODELS}
+        self._hits: Dict[type, int] = {model: 0 for model in CACHED_MODELS}
+        self._misses: Dict[type, int] = {model: 0 for model in CACHED_MODELS}
+
+    def _lookup(self, model, obj_id: int) -> Optional[SimpleNamespace]:
+        entries = self._entries[model]
+        entry = entries.get(obj_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            del entries[obj_id]
+            return None
+        entries.move_to_end(obj_id)
+        return snapshot
+
+    def _store(self, model, obj) -> SimpleNamespace:
+        snapshot = _snapshot(obj)
+        entries = self._entries[model]
+        entries[obj.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        entries.move_to_end(obj.id)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return snapshot
+
+    def get(self, db: Session, model, obj_id: int) -> Optional[SimpleNamespace]:
+        """Строка справочника по id или None, если ее нет"""
+        return self.get_many(db, model, [obj_id]).get(obj_id)
+
+    def get_many(self, db: Session, model, ids: Iterable[int]) -> Dict[int, SimpleNamespace]:
+        """Строки справочника по набору id; промахи дозагружаются одним запросом"""
+        result = {}
+        missing = set()
+        with self._lock:
+            for obj_id in set(ids):
+                snapshot = self._lookup(model, obj_id)
+                if snapshot is None:
+                    missing.add(obj_id)
+                else:
+                    result[obj_id] = snapshot
+            self._hits[model] += len(result)
+            self._misses[model] += len(missing)
+
+        if missing:
+            rows = db.query(model).filter(model.id.in_(missing)).all()
+            with self._lock:
+                for obj in rows:
+                    result[obj.id] = self._store(model, obj)
+        return result
+
+    def invalidate(self, model, obj_id: Optional[int] = None) -> None:
+        """Сбросить одну строку или весь справочник"""
+        with self._lock:
+            if obj_id is None:
+                self._entries[model].clear()
+            else:
+                self._entries[model].pop(obj_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            tables = {}
+            for model in CACHED_MODELS:
+                hits, misses = self._hits[model], self._misses[model]
+                tables[model.__tablename__] = {
+                    "entries": len(self._entries[model]),
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+                "tables": tables,
+            }
+
+
+reference_cache = ReferenceCache(
+    ttl_seconds=settings.REFERENCE_CACHE_TTL_SECONDS,
+    max_entries=settings.REFERENCE_CACHE_MAX_ENTRIES,
+)
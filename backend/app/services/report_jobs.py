@@ -0,0 +1,180 @@
+import csv
+import json
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.device import Device, LocationType
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+from .etag import table_versions
+from .jobs import JobStore, params_fingerprint
+from .reports import DEVICE_EXPORT_HEADER, EXPORT_CHUNK_ROWS, device_filters, iter_device_rows, locations_report
+
+REPORT_KINDS = ("devices", "locations")
+REPORT_FORMATS = ("csv", "jsonl", "xlsx")
+
+# Ключи полей JSONL для выгрузки устройств (в порядке DEVICE_EXPORT_HEADER)
+DEVICE_EXPORT_KEYS = [
+    "id", "device_type", "brand", "model",
+    "serial_number", "inventory_number",
+    "location_type", "location_name", "created_at"
+]
+
+LOCATION_EXPORT_KEYS = ["location_type", "location_id", "location_name", "phone_extension", "device_count", "devices"]
+LOCATION_EXPORT_HEADER = ["Тип локации", "ID", "Локация", "Внутренний номер", "Количество устройств", "Устройства"]
+
+# Таблицы, от которых зависит результат отчета каждого вида
+_REPORT_TABLES = {
+    "devices": ("devices", "device_types", "brands", "models", "employees", "warehouses"),
+    "locations": ("devices", "employees", "warehouses"),
+}
+
+report_jobs = JobStore(
+    directory=settings.REPORT_JOBS_DIR,
+    workers=settings.REPORT_JOB_WORKERS,
+    freshness_seconds=settings.REPORT_JOB_FRESHNESS_SECONDS,
+    stale_seconds=settings.REPORT_JOB_STALE_SECONDS,
+    retention_seconds=settings.REPORT_JOB_RETENTION_SECONDS,
+)
+
+# Источник строк: (ключи, заголовки, число строк, порции словарей)
+RowSource = Tuple[List[str], List[str], int, Iterator[List[dict]]]
+
+
+def _device_rows(db: Session, params: dict) -> RowSource:
+    conditions = device_filters(
+        params.get("device_type_id"),
+        params.get("brand_id"),
+        LocationType(params["location_type"]) if params.get("location_type") else None,
+        params.get("location_id"),
+    )
+    total = db.execute(select(func.count()).select_from(Device).where(*conditions)).scalar()
+    chunks = (
+        [dict(zip(DEVICE_EXPORT_KEYS, row)) for row in rows]
+        for rows in iter_device_rows(db, conditions)
+    )
+    return DEVICE_EXPORT_KEYS, DEVICE_EXPORT_HEADER, total, chunks
+
+
+def _location_rows(db: Session, params: dict) -> RowSource:
+    location_type = LocationType(params["location_type"]) if params.get("location_type") else None
+    counts_only = bool(params.get("counts_only"))
+    total = 0
+    if not location_type or location_type == LocationType.WAREHOUSE:
+        total += db.execute(select(func.count()).select_from(Warehouse)).scalar()
+    if not location_type or location_type == LocationType.EMPLOYEE:
+        total += db.execute(select(func.count()).select_from(Employee)).scalar()
+
+    def chunks() -> Iterator[List[dict]]:
+        skip = 0
+        while True:
+            page = locations_report(db, location_type, skip, EXPORT_CHUNK_ROWS, counts_only)
+            if not page:
+                return
+            yield [
+                {
+                    "location_type": item["location_type"],
+                    "location_id": item["location_id"],
+                    "location_name": item["location_name"],
+                    "phone_extension": item.get("phone_extension"),
+                    "device_count": item["device_count"],
+                    "devices": [device["inventory_number"] for device in item.get("devices", [])],
+                }
+                for item in page
+            ]
+            skip += len(page)
+
+    keys, header = LOCATION_EXPORT_KEYS, LOCATION_EXPORT_HEADER
+    if counts_only:
+        keys, header = keys[:-1], header[:-1]
+    return keys, header, total, chunks()
+
+
+_ROW_SOURCES = {
+    "devices": _device_rows,
+    "locations": _location_rows,
+}
+
+
+def _cell(value):
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else value
+
+
+def _write_csv(path: str, keys: List[str], header: List[str], chunks, progress) -> None:
+    done = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for rows in chunks:
+            writer.writerows([_cell(row[key]) for key in keys] for row in rows)
+            done += len(rows)
+            progress(done)
+
+
+def _write_jsonl(path: str, keys: List[str], header: List[str], chunks, progress) -> None:
+    done = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in chunks:
+            f.writelines(
+                json.dumps({key: row[key] for key in keys}, ensure_ascii=False, default=str) + "\n"
+                for row in rows
+            )
+            done += len(rows)
+            progress(done)
+
+
+def _write_xlsx(path: str, keys: List[str], header: List[str], chunks, progress) -> None:
+    # write_only: строки сразу уходят во временный файл, память не растет
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Report")
+    sheet.append(header)
+    done = 0
+    for rows in chunks:
+        for row in rows:
+            sheet.append([_cell(row[key]) for key in keys])
+        done += len(rows)
+        progress(done)
+    workbook.save(path)
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "xlsx": _write_xlsx,
+}
+
+
+def _runner(kind: str, report_format: str, params: dict) -> Callable:
+    def run(path: str, progress) -> None:
+        db = SessionLocal()
+        try:
+            # Один снимок данных на весь отчет, даже если он читается порциями
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            keys, header, total, chunks = _ROW_SOURCES[kind](db, params)
+            progress(0, total)
+            _WRITERS[report_format](path, keys, header, chunks, progress)
+        finally:
+            db.close()
+    return run
+
+
+def submit_report_job(db: Session, kind: str, report_format: str, params: dict,
+                      created_by: Optional[int] = None) -> dict:
+    """
+    Поставить отчет в очередь. В отпечаток параметров входят версии таблиц
+    отчета: после изменения данных готовый файл не переиспользуется.
+    """
+    tables = _REPORT_TABLES[kind]
+    versions = table_versions(db, tables)
+    fingerprint = params_fingerprint(kind, report_format, params, versions)
+    return report_jobs.submit(
+        kind, params, report_format, fingerprint, _runner(kind, report_format, params), created_by
+    )
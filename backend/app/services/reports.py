@@ -0,0 +1,214 @@
+import csv
+import io
+from collections import defaultdict
+from typing import Iterator, List, Optional
+
+from sqlalchemy import and_, func, literal, null, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.device import Device, LocationType
+from ..models.device_type import DeviceType
+from ..models.brand import Brand
+from ..models.model import Model
+from ..models.employee import Employee
+from ..models.warehouse import Warehouse
+
+# Строк на одну порцию выгрузки: столько же читается с серверного курсора за раз
+EXPORT_CHUNK_ROWS = 1000
+
+DEVICE_EXPORT_HEADER = [
+    "ID", "Тип устройства", "Бренд", "Модель",
+    "Серийный номер", "Инвентарный номер",
+    "Тип локации", "Локация", "Дата создания"
+]
+
+
+def device_filters(
+    device_type_id: Optional[int] = None,
+    brand_id: Optional[int] = None,
+    location_type: Optional[LocationType] = None,
+    location_id: Optional[int] = None,
+) -> list:
+    """Условия фильтра отчетов по устройствам"""
+    conditions = []
+    if device_type_id:
+        conditions.append(Device.device_type_id == device_type_id)
+    if brand_id:
+        conditions.append(Device.brand_id == brand_id)
+    if location_type:
+        conditions.append(Device.current_location_type == location_type)
+    if location_id:
+        conditions.append(Device.current_location_id == location_id)
+    return conditions
+
+
+def device_export_query(conditions: list):
+    """Устройства со всеми названиями одним запросом"""
+    return (
+        select(
+            Device.id,
+            DeviceType.name.label("device_type_name"),
+            Brand.name.label("brand_name"),
+            Model.name.label("model_name"),
+            Device.serial_number,
+            Device.inventory_number,
+            Device.current_location_type,
+            func.coalesce(Employee.full_name, Warehouse.name).label("location_name"),
+            Device.created_at,
+        )
+        .outerjoin(DeviceType, DeviceType.id == Device.device_type_id)
+        .outerjoin(Brand, Brand.id == Device.brand_id)
+        .outerjoin(Model, Model.id == Device.model_id)
+        .outerjoin(Employee, and_(
+            Device.current_location_type == LocationType.EMPLOYEE,
+            Employee.id == Device.current_location_id,
+        ))
+        .outerjoin(Warehouse, and_(
+            Device.current_location_type == LocationType.WAREHOUSE,
+            Warehouse.id == Device.current_location_id,
+        ))
+        .where(*conditions)
+        .order_by(Device.id)
+    )
+
+
+def iter_device_rows(db: Session, conditions: list) -> Iterator[List[list]]:
+    """Строки выгрузки устройств порциями по EXPORT_CHUNK_ROWS с серверного курсора"""
+    result = db.execute(
+        device_export_query(conditions).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    for rows in result.partitions():
+        yield [
+            [
+                row.id,
+                row.device_type_name or "",
+                row.brand_name or "",
+                row.model_name or "",
+                row.serial_number,
+                row.inventory_number,
+                row.current_location_type.value,
+                row.location_name or "",
+                row.created_at.strftime("%Y-%m-%d %H:%M:%S") if row.created_at else ""
+            ]
+            for row in rows
+        ]
+
+
+def stream_devices_csv(conditions: list) -> Iterator[str]:
+    """
+    CSV-выгрузка устройств генератором. Заголовок отдается сразу, строки
+    читаются с серверного курсора (yield_per) и отправляются порциями, так что
+    память не зависит от числа устройств. Генератор открывает свою сессию:
+    он выполняется уже после выхода из эндпоинта.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def take() -> str:
+        chunk = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return chunk
+
+    writer.writerow(DEVICE_EXPORT_HEADER)
+    yield take()
+
+    db = SessionLocal()
+    try:
+        for rows in iter_device_rows(db, conditions):
+            writer.writerows(rows)
+            yield take()
+    finally:
+        db.close()
+
+
+def locations_report(
+    db: Session,
+    location_type: Optional[LocationType] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    counts_only: bool = False,
+) -> List[dict]:
+    """
+    Отчет «что где находится»: склады, затем сотрудники, по id. Количество
+    устройств считается одним сгруппированным запросом для страницы локаций,
+    списки устройств страницы загружаются вторым запросом (если не counts_only).
+    """
+    counts = (
+        select(
+            Device.current_location_type.label("location_type"),
+            Device.current_location_id.label("location_id"),
+            func.count().label("device_count"),
+        )
+        .group_by(Device.current_location_type, Device.current_location_id)
+        .subquery("counts")
+    )
+
+    def locations(model, location, name, phone_extension, order):
+        return (
+            select(
+                literal(order).label("type_order"),
+                model.id.label("location_id"),
+                name.label("location_name"),
+                phone_extension.label("phone_extension"),
+                func.coalesce(counts.c.device_count, 0).label("device_count"),
+            )
+            .outerjoin(counts, and_(
+                counts.c.location_type == location,
+                counts.c.location_id == model.id,
+            ))
+        )
+
+    parts = []
+    if not location_type or location_type == LocationType.WAREHOUSE:
+        parts.append(locations(Warehouse, LocationType.WAREHOUSE, Warehouse.name, null(), 0))
+    if not location_type or location_type == LocationType.EMPLOYEE:
+        parts.append(locations(Employee, LocationType.EMPLOYEE, Employee.full_name, Employee.phone_extension, 1))
+
+    page_query = union_all(*parts).subquery("locations")
+    page = db.execute(
+        select(page_query)
+        .order_by(page_query.c.type_order, page_query.c.location_id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+    order_types = {0: LocationType.WAREHOUSE, 1: LocationType.EMPLOYEE}
+    devices_by_location = defaultdict(list)
+    if not counts_only and page:
+        keys = [(order_types[row.type_order], row.location_id) for row in page if row.device_count]
+        if keys:
+            devices = db.execute(
+                select(
+                    Device.id,
+                    Device.inventory_number,
+                    Device.serial_number,
+                    Device.current_location_type,
+                    Device.current_location_id,
+                )
+                .where(tuple_(Device.current_location_type, Device.current_location_id).in_(keys))
+                .order_by(Device.id)
+            )
+            for device in devices:
+                devices_by_location[(device.current_location_type, device.current_location_id)].append({
+                    "id": device.id,
+                    "inventory_number": device.inventory_number,
+                    "serial_number": device.serial_number,
+                })
+
+    result = []
+    for row in page:
+        current_type = order_types[row.type_order]
+        item = {
+            "location_type": current_type.value,
+            "location_id": row.location_id,
+            "location_name": row.location_name,
+        }
+        if current_type == LocationType.EMPLOYEE:
+            item["phone_extension"] = row.phone_extension
+        item["device_count"] = row.device_count
+        if not counts_only:
+            item["devices"] = devices_by_location[(current_type, row.location_id)]
+        result.append(item)
+    return result
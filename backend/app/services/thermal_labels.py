@@ -0,0 +1,186 @@
+import socket
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from ..config import settings
+
+THERMAL_LANGUAGES = ("zpl", "epl")
+THERMAL_MEDIA_TYPES = {"zpl": "text/plain; charset=utf-8", "epl": "text/plain; charset=ascii"}
+
+LABEL_PADDING_MM = 1.5
+
+# Встроенные шрифты EPL: номер и высота символа в точках для каждого разрешения
+_EPL_FONT_HEIGHTS = {
+    203: ((4, 24), (3, 20), (2, 16)),
+    300: ((4, 44), (3, 36), (2, 28)),
+}
+
+# Емкость QR-кода версий 1-10 в байтовом режиме с уровнем коррекции M
+_QR_BYTE_CAPACITY_M = (14, 26, 42, 62, 84, 106, 122, 152, 180, 213)
+
+
+def _dots(mm: float, dpi: int) -> int:
+    return round(mm * dpi / 25.4)
+
+
+def _qr_modules(data: str) -> int:
+    """Число модулей QR-кода без его построения - для выбора увеличения"""
+    length = len(data.encode())
+    for version, capacity in enumerate(_QR_BYTE_CAPACITY_M, start=1):
+        if length <= capacity:
+            return 17 + 4 * version
+    return 17 + 4 * 10
+
+
+def _layout(label: dict, label_format: dict, dpi: int) -> dict:
+    """Размеры наклейки в точках: QR слева, три строки текста справа"""
+    width = _dots(label_format["width"], dpi)
+    height = _dots(label_format["height"], dpi)
+    padding = _dots(LABEL_PADDING_MM, dpi)
+    side = min(height - 2 * padding, width // 2)
+    magnification = max(1, min(10, side // _qr_modules(label["inventory_number"])))
+    text_x = 2 * padding + side
+    line_height = max(10, (height - 2 * padding) // 3)
+    return {
+        "width": width,
+        "height": height,
+        "padding": padding,
+        "magnification": magnification,
+        "text_x": text_x,
+        "text_width": width - text_x - padding,
+        "line_height": line_height,
+        "font_height": line_height * 4 // 5,
+    }
+
+
+def _zpl_field(text: str) -> str:
+    # Со ^FH символы ^ ~ _ передаются шестнадцатеричными кодами
+    return text.replace("_", "_5F").replace("^", "_5E").replace("~", "_7E")
+
+
+def zpl_label(label: dict, label_format: dict, dpi: int) -> bytes:
+    """
+    Наклейка на ZPL II. QR-код строит принтер (^BQ), текст в UTF-8 (^CI28);
+    кириллица печатается шрифтом принтера с поддержкой Unicode.
+    """
+    box = _layout(label, label_format, dpi)
+    lines = [
+        label["model_name"],
+        f"Сер: {label['serial_number']}",
+        f"Инв: {label['inventory_number']}",
+    ]
+    commands = [
+        "^XA^CI28",
+        f"^PW{box['width']}^LL{box['height']}^LH0,0",
+        f"^FO{box['padding']},{box['padding']}^BQN,2,{box['magnification']}"
+        f"^FH^FDMA,{_zpl_field(label['inventory_number'])}^FS",
+    ]
+    for index, text in enumerate(lines):
+        y = box["padding"] + index * box["line_height"]
+        commands.append(
+            f"^FO{box['text_x']},{y}^A0N,{box['font_height']},{box['font_height']}"
+            f"^FB{box['text_width']},1,0,L,0^FH^FD{_zpl_field(text)}^FS"
+        )
+    commands.append("^XZ\n")
+    return "\n".join(commands).encode("utf-8")
+
+
+def _epl_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def epl_label(label: dict, label_format: dict, dpi: int) -> bytes:
+    """
+    Наклейка на EPL2. QR-код строит принтер (команда b), текст - встроенными
+    шрифтами без кодовой страницы, поэтому подписи латиницей, а символы
+    вне ASCII заменяются на "?".
+    """
+    box = _layout(label, label_format, dpi)
+    font = next((number for number, height in _EPL_FONT_HEIGHTS[dpi] if box["font_height"] >= height), 1)
+    lines = [
+        label["model_name"],
+        f"S/N: {label['serial_number']}",
+        f"Inv: {label['inventory_number']}",
+    ]
+    commands = [
+        "",
+        "N",
+        f"q{box['width']}",
+        f"Q{box['height']},24",
+        f'b{box["padding"]},{box["padding"]},Q,m2,s{box["magnification"]},eM,"{_epl_text(label["inventory_number"])}"',
+    ]
+    for index, text in enumerate(lines):
+        y = box["padding"] + index * box["line_height"]
+        commands.append(f'A{box["text_x"]},{y},0,{font},1,1,N,"{_epl_text(text)}"')
+    commands.append("P1\n")
+    return "\n".join(commands).encode("ascii", errors="replace")
+
+
+_RENDERERS = {
+    "zpl": zpl_label,
+    "epl": epl_label,
+}
+
+
+def iter_thermal_labels(pages: Iterable[List[dict]], language: str, label_format: dict, dpi: int) -> Iterator[bytes]:
+    """Команды принтера: один самостоятельный блок (^XA...^XZ или N...P1) на устройство"""
+    render = _RENDERERS[language]
+    for page in pages:
+        for label in page:
+            yield render(label, label_format, dpi)
+
+
+def thermal_printers() -> Dict[str, Tuple[str, int]]:
+    """Разрешенные принтеры из настройки THERMAL_PRINTERS: имя -> (хост, порт)"""
+    printers = {}
+    for item in settings.THERMAL_PRINTERS.split(","):
+        if "=" not in item:
+            continue
+        name, address = item.split("=", 1)
+        host, _, port = address.strip().rpartition(":")
+        if not host:
+            printers[name.strip()] = (address.strip(), 9100)
+            continue
+        try:
+            printers[name.strip()] = (host, int(port))
+        except ValueError:
+            print(f"Warning: THERMAL_PRINTERS entry {item.strip()!r} has an invalid port, skipped")
+    return printers
+
+
+class SpoolError(Exception):
+    """Ошибка соединения с принтером; labels и bytes - сколько уже отправлено"""
+
+    def __init__(self, error: OSError, labels: int, sent: int):
+        super().__init__(str(error))
+        self.labels = labels
+        self.bytes = sent
+
+
+def spool_to_printer(host: str, port: int, blocks: Iterable[bytes], batch_labels: int) -> Tuple[int, int]:
+    """
+    Отправить блоки наклеек на принтер по TCP (raw, порт 9100) одним
+    соединением, пачками по batch_labels. Возвращает (наклеек, байт);
+    при обрыве связи - SpoolError с числом уже отправленных наклеек.
+    """
+    labels = sent = 0
+    batch: List[bytes] = []
+
+    def flush(connection):
+        nonlocal labels, sent, batch
+        data = b"".join(batch)
+        connection.sendall(data)
+        labels += len(batch)
+        sent += len(data)
+        batch = []
+
+    try:
+        with socket.create_connection((host, port), timeout=settings.THERMAL_PRINTER_TIMEOUT_SECONDS) as connection:
+            for block in blocks:
+                batch.append(block)
+                if len(batch) >= batch_labels:
+                    flush(connection)
+            if batch:
+                flush(connection)
+    except OSError as e:
+        raise SpoolError(e, labels, sent) from e
+    return labels, sent
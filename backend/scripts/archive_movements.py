@@ -0,0 +1,69 @@
+"""
+Обслуживание секций movement_history: создание секций на будущие месяцы и
+перенос секций старше заданного срока в movement_history_archive.
+
+Запуск из каталога backend (например, ежемесячно из cron):
+
+    python -m scripts.archive_movements
+    python -m scripts.archive_movements --years 5 --dry-run
+"""
+import argparse
+import sys
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.services.location_history import create_location_checkpoint
+from app.services.movement_partitions import (
+    archive_cutoff,
+    archive_movement_partitions,
+    ensure_movement_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--years", type=int, default=settings.MOVEMENT_ARCHIVE_AFTER_YEARS,
+        help="переносить секции старше этого числа лет",
+    )
+    parser.add_argument(
+        "--months-ahead", type=int, default=settings.MOVEMENT_PARTITION_MONTHS_AHEAD,
+        help="сколько месяцев вперед создавать секции",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет перенесено")
+    args = parser.parse_args(argv)
+
+    cutoff = archive_cutoff(args.years)
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            print("movement_history is not partitioned, run 'alembic upgrade head' first")
+            return 1
+
+        if args.dry_run:
+            for name, _, end in list_partitions(connection):
+                if end <= cutoff:
+                    print(f"would archive {name}")
+            return 0
+
+        for name in ensure_movement_partitions(connection, months_ahead=args.months_ahead):
+            print(f"created {name}")
+
+    # Снимок на границе архивации: отчет на дату после нее не нуждается в архивной истории
+    db = SessionLocal()
+    try:
+        if create_location_checkpoint(db, cutoff):
+            print(f"checkpoint {cutoff.isoformat()} created")
+        db.commit()
+    finally:
+        db.close()
+
+    with engine.begin() as connection:
+        for name, rows in archive_movement_partitions(connection, cutoff):
+            print(f"archived {name}: {rows} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
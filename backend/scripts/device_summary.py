@@ -0,0 +1,40 @@
+"""
+Обслуживание таблицы сводки device_summary.
+
+Запуск из каталога backend:
+
+    python -m scripts.device_summary verify    # показать расхождения, код 1 если есть
+    python -m scripts.device_summary rebuild   # пересчитать с нуля
+"""
+import argparse
+import sys
+
+from app.database import SessionLocal
+from app.services.device_summary import rebuild_device_summary, verify_device_summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rows = rebuild_device_summary(db)
+            db.commit()
+            print(f"device_summary rebuilt: {rows} rows")
+            return 0
+
+        mismatches = verify_device_summary(db)
+        for item in mismatches:
+            key = ", ".join(f"{name}={item[name]}" for name in item if name not in ("expected", "recorded"))
+            print(f"{key}: expected {item['expected']}, recorded {item['recorded']}")
+        print(f"{len(mismatches)} mismatches")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+EXPLAIN ANALYZE для горячих запросов API - сравнение до и после миграции индексов.
+
+Запуск из каталога backend:
+
+    python -m scripts.explain_hot_paths --save before.json
+    alembic upgrade head
+    python -m scripts.explain_hot_paths --compare before.json
+
+Параметры запросов (сотрудник, склад, устройство, сессия) берутся из данных в БД.
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import SessionLocal
+from app.models.device import Device, LocationType
+from app.models.movement_history import MovementHistory
+from app.models.inventory_record import InventoryRecord
+
+
+def _sample(db, column, *conditions):
+    """Самое частое значение колонки - худший случай для фильтра"""
+    query = select(column).where(*conditions).group_by(column).order_by(func.count().desc()).limit(1)
+    return db.execute(query).scalar()
+
+
+def hot_queries(db):
+    """(имя, эндпоинт, запрос) для каждого горячего пути"""
+    employee_id = _sample(db, Device.current_location_id, Device.current_location_type == LocationType.EMPLOYEE)
+    warehouse_id = _sample(db, Device.current_location_id, Device.current_location_type == LocationType.WAREHOUSE)
+    company_id, device_type_id = db.execute(
+        select(Device.company_id, Device.device_type_id)
+        .group_by(Device.company_id, Device.device_type_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).first() or (None, None)
+    device_id = _sample(db, MovementHistory.device_id)
+    session_id = _sample(db, InventoryRecord.inventory_session_id)
+    record_device_id = _sample(db, InventoryRecord.device_id, InventoryRecord.inventory_session_id == session_id)
+
+    return [
+        ("employee_devices", "GET /api/employees/{id}/devices", select(Device).where(
+            Device.current_location_type == LocationType.EMPLOYEE,
+            Device.current_location_id == employee_id,
+        )),
+        ("warehouse_devices", "GET /api/devices?location_type=warehouse&location_id=", select(Device).where(
+            Device.current_location_type == LocationType.WAREHOUSE,
+            Device.current_location_id == warehouse_id,
+        )),
+        ("company_type_devices", "POST /api/devices (inventory numbers), reports", select(func.count()).where(
+            Device.company_id == company_id,
+            Device.device_type_id == device_type_id,
+        )),
+        ("device_history", "GET /api/movements?device_id=", select(MovementHistory).where(
+            MovementHistory.device_id == device_id,
+        ).order_by(MovementHistory.moved_at.desc()).limit(100)),
+        ("movements_page", "GET /api/movements?cursor=", select(MovementHistory).order_by(
+            MovementHistory.moved_at.desc(), MovementHistory.id.desc(),
+        ).limit(100)),
+        ("session_statistics", "GET /api/inventory/sessions/{id}/statistics", select(func.count()).where(
+            InventoryRecord.inventory_session_id == session_id,
+            InventoryRecord.checked == True,  # noqa: E712
+        )),
+        ("session_unchecked", "GET /api/inventory/sessions/{id}/devices?checked=false", select(InventoryRecord).where(
+            InventoryRecord.inventory_session_id == session_id,
+            InventoryRecord.checked == False,  # noqa: E712
+        )),
+        ("session_record_lookup", "POST /api/inventory/sessions/{id}/records", select(InventoryRecord).where(
+            InventoryRecord.inventory_session_id == session_id,
+            InventoryRecord.device_id == record_device_id,
+        )),
+    ]
+
+
+def _index_names(plan: dict) -> list:
+    names = []
+    if "Index Name" in plan:
+        names.append(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names.extend(_index_names(child))
+    return names
+
+
+def explain(db, query) -> dict:
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    (result,) = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    plan = result["Plan"]
+    return {
+        "execution_ms": round(result["Execution Time"], 3),
+        "planning_ms": round(result["Planning Time"], 3),
+        "node": plan["Node Type"],
+        "indexes": _index_names(plan),
+        "shared_hit": plan.get("Shared Hit Blocks", 0),
+        "shared_read": plan.get("Shared Read Blocks", 0),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="сохранить результаты в JSON-файл")
+    parser.add_argument("--compare", help="сравнить с ранее сохраненным JSON-файлом")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        results = {}
+        for name, endpoint, query in hot_queries(db):
+            results[name] = {"endpoint": endpoint, **explain(db, query)}
+    finally:
+        db.rollback()
+        db.close()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    for name, result in results.items():
+        line = f"{name:24} {result['execution_ms']:>10.3f} ms  {result['node']:<22} {','.join(result['indexes']) or '-'}"
+        if name in baseline:
+            before = baseline[name]
+            line += f"  (before {before['execution_ms']:.3f} ms, {before['node']})"
+        print(line)
+        print(f"{'':24} {result['endpoint']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Снимок местоположения всех устройств для отчета /api/reports/locations/as-of.
+Запрос на дату T читает историю перемещений только после ближайшего снимка,
+поэтому снимки стоит делать регулярно (например, на начало каждого месяца).
+
+Запуск из каталога backend:
+
+    python -m scripts.location_checkpoint
+    python -m scripts.location_checkpoint --at 2026-10-01T00:00:00+00:00
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from app.database import SessionLocal
+from app.services.location_history import create_location_checkpoint
+from app.services.movement_partitions import month_start
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--at", type=datetime.fromisoformat,
+        help="момент снимка (по умолчанию - начало текущего месяца, UTC)",
+    )
+    args = parser.parse_args(argv)
+
+    at = args.at or month_start(datetime.now(timezone.utc))
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    if at > datetime.now(timezone.utc):
+        print("checkpoint time must be in the past")
+        return 1
+
+    db = SessionLocal()
+    try:
+        rows = create_location_checkpoint(db, at)
+        db.commit()
+    finally:
+        db.close()
+
+    if rows:
+        print(f"checkpoint {at.isoformat()}: {rows} devices")
+    else:
+        print(f"checkpoint {at.isoformat()} already exists")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Локальная замена термопринтера для проверки печати ZPL/EPL без оборудования:
+принимает raw TCP-соединения (как порт 9100 принтера), дописывает полученные
+команды в файл и печатает число наклеек в каждом соединении.
+
+Запуск из каталога backend:
+
+    python -m scripts.tcp_print_sink --port 9100 --output labels.zpl
+
+и в .env: THERMAL_PRINTERS=sink=127.0.0.1:9100
+"""
+import argparse
+import socketserver
+import sys
+import threading
+
+# Окончание наклейки: ^XZ в ZPL, P1 (строка печати) в EPL
+_LABEL_ENDS = (b"^XZ", b"\nP1\n")
+
+
+def count_labels(data: bytes) -> int:
+    return sum(data.count(end) for end in _LABEL_ENDS)
+
+
+def make_server(host: str, port: int, output: str) -> socketserver.ThreadingTCPServer:
+    lock = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            received = bytearray()
+            while True:
+                chunk = self.request.recv(65536)
+                if not chunk:
+                    break
+                received.extend(chunk)
+            with lock:
+                with open(output, "ab") as f:
+                    f.write(received)
+            print(f"{self.client_address[0]}: {len(received)} bytes, {count_labels(received)} labels")
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    return socketserver.ThreadingTCPServer((host, port), Handler)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9100, help="порт (по умолчанию 9100)")
+    parser.add_argument("--output", default="labels.prn", help="файл для полученных команд")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.output)
+    print(f"listening on {args.host}:{args.port}, writing to {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
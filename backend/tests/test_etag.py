@@ -0,0 +1,19 @@
+from app.services.etag import _etag_matches
+
+ETAG = 'W/"0123456789abcdef0123"'
+
+
+def test_no_header():
+    assert not _etag_matches(None, ETAG)
+    assert not _etag_matches("", ETAG)
+
+
+def test_weak_comparison_ignores_prefix():
+    assert _etag_matches(ETAG, ETAG)
+    assert _etag_matches('"0123456789abcdef0123"', ETAG)
+
+
+def test_list_and_wildcard():
+    assert _etag_matches(f'"other", {ETAG}', ETAG)
+    assert _etag_matches("*", ETAG)
+    assert not _etag_matches('"other", W/"another"', ETAG)
@@ -0,0 +1,35 @@
+from app.services.inventory_numbers import (
+    format_inventory_number,
+    inventory_number_prefix,
+    parse_inventory_sequence,
+)
+
+
+def test_format_pads_to_four_digits():
+    assert format_inventory_number("WWP", "02", 22) == "WWP-02/0022"
+    assert format_inventory_number("WWP", "02", 12345) == "WWP-02/12345"
+
+
+def test_prefix():
+    assert inventory_number_prefix("WWP", "02") == "WWP-02/"
+
+
+def test_parse_round_trip():
+    for sequence in (1, 22, 9999, 10000):
+        number = format_inventory_number("WWP", "02", sequence)
+        assert parse_inventory_sequence(number, "WWP", "02") == sequence
+
+
+def test_parse_other_pair_or_format():
+    assert parse_inventory_sequence("WWP-03/0022", "WWP", "02") is None
+    assert parse_inventory_sequence("ABC-02/0022", "WWP", "02") is None
+    assert parse_inventory_sequence("WWP-02/00A2", "WWP", "02") is None
+    assert parse_inventory_sequence("WWP-02/", "WWP", "02") is None
+    assert parse_inventory_sequence("XWWP-02/0022", "WWP", "02") is None
+    assert parse_inventory_sequence("WWP-02/0022 ", "WWP", "02") is None
+
+
+def test_parse_escapes_codes():
+    # Точка в коде компании - обычный символ, а не любой символ регулярного выражения
+    assert parse_inventory_sequence("A.B-02/0007", "A.B", "02") == 7
+    assert parse_inventory_sequence("AXB-02/0007", "A.B", "02") is None
@@ -0,0 +1,71 @@
+import re
+import zlib
+
+from app.services.label_pdf import PAGE_HEIGHT, PAGE_WIDTH, _grid, _pdf_string, parse_qr_svg, stream_label_pdf
+from app.services.labels import LABEL_FORMATS
+from app.services.qr_cache import qr_matrix, render_qr_svg
+
+
+def _label(number: int) -> dict:
+    inventory_number = f"WWP-02/{number:04d}"
+    return {
+        "model_name": "Latitude (5420)",
+        "serial_number": f"SN\\{number}",
+        "inventory_number": inventory_number,
+        "qr_svg": render_qr_svg(inventory_number),
+    }
+
+
+def _build(pages) -> bytes:
+    return b"".join(stream_label_pdf(pages, LABEL_FORMATS["38x21"]))
+
+
+def test_xref_offsets_point_at_objects():
+    pdf = _build([[_label(i) for i in range(24)], [_label(24)]])
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", pdf).group(1))
+    assert pdf[startxref:].startswith(b"xref\n0 ")
+    size = int(re.search(rb"xref\n0 (\d+)\n", pdf).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n \n", pdf[startxref:])
+    assert len(entries) == size - 1
+    for number, offset in enumerate(entries, start=1):
+        assert pdf[int(offset):].startswith(b"%d 0 obj\n" % number)
+
+
+def test_page_count_and_streams():
+    pdf = _build([[_label(i) for i in range(24)]] * 3)
+    assert b"/Count 3" in pdf
+    streams = re.findall(rb"/Length (\d+) /Filter /FlateDecode >>\nstream\n", pdf)
+    assert len(streams) == 3
+    start = pdf.index(b"stream\n") + len(b"stream\n")
+    content = zlib.decompress(pdf[start:start + int(streams[0])])
+    assert content.count(b" Tj ET") == 24 * 3
+
+
+def test_empty_document_is_valid():
+    pdf = _build([])
+    assert pdf.startswith(b"%PDF-1.4") and b"/Count 0" in pdf
+
+
+def test_pdf_string_escapes_and_encodes_cyrillic():
+    assert _pdf_string("a(b)c\\") == b"(a\\(b\\)c\\\\)"
+    assert _pdf_string("Инв") == b"(" + "Инв".encode("cp1251") + b")"
+
+
+def test_parse_qr_svg_matches_matrix():
+    matrix = qr_matrix("WWP-02/0022")
+    modules, runs = parse_qr_svg(render_qr_svg("WWP-02/0022"))
+    assert modules == len(matrix)
+    dark = {(x + offset, y) for x, y, width in runs for offset in range(width)}
+    expected = {(x, y) for y, row in enumerate(matrix) for x, value in enumerate(row) if value}
+    assert dark == expected
+
+
+def test_grid_fits_page():
+    for label_format in LABEL_FORMATS.values():
+        for page, size, count in (
+            (PAGE_WIDTH, label_format["width"] * 72 / 25.4, label_format["cols"]),
+            (PAGE_HEIGHT, label_format["height"] * 72 / 25.4, label_format["rows"]),
+        ):
+            margin, gap = _grid(page, size, count)
+            assert margin >= 0 and gap >= 0
+            assert abs(2 * margin + count * size + (count - 1) * gap - page) < 0.01 or margin == 0
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.pagination import decode_cursor, encode_cursor, parse_cursor_datetime
+
+
+def test_round_trip_id():
+    assert decode_cursor(encode_cursor(42), int) == [42]
+
+
+def test_round_trip_datetime_and_id():
+    moved_at = datetime(2026, 10, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(moved_at, 7), datetime, int) == [moved_at, 7]
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("a" * 10, 10 ** 12)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor, types", [
+    ("not base64!", (int,)),
+    (encode_cursor(1, 2), (int,)),
+    (encode_cursor(1), (datetime, int)),
+    (encode_cursor("abc"), (int,)),
+    (encode_cursor(True), (int,)),
+    (encode_cursor(1.5), (int,)),
+    (encode_cursor(None), (int,)),
+    (encode_cursor(1, 1), (datetime, int)),
+    (encode_cursor("yesterday", 1), (datetime, int)),
+])
+def test_invalid_cursor_is_400(cursor, types):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, *types)
+    assert error.value.status_code == 400
+
+
+def test_not_a_list_is_400():
+    import base64
+    cursor = base64.urlsafe_b64encode(b'{"id": 1}').decode()
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, int)
+
+
+def test_parse_cursor_datetime_rejects_non_strings():
+    with pytest.raises(HTTPException):
+        parse_cursor_datetime(12345)
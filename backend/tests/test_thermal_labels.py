@@ -0,0 +1,82 @@
+import pytest
+
+from app.config import settings
+from app.services import thermal_labels
+from app.services.labels import LABEL_FORMATS
+from app.services.thermal_labels import (
+    SpoolError, _zpl_field, epl_label, iter_thermal_labels, spool_to_printer, thermal_printers, zpl_label,
+)
+
+LABEL = {"model_name": "Latitude 5420", "serial_number": "SN_1^2~3", "inventory_number": "WWP-02/0001"}
+
+
+def test_zpl_field_escapes_control_characters():
+    assert _zpl_field("a_b^c~d") == "a_5Fb_5Ec_7Ed"
+
+
+def test_zpl_label_is_one_block():
+    data = zpl_label(LABEL, LABEL_FORMATS["38x21"], 203).decode("utf-8")
+    assert data.startswith("^XA^CI28") and data.endswith("^XZ\n")
+    assert data.count("^XA") == data.count("^XZ") == 1
+    assert "^FDMA,WWP-02/0001^FS" in data
+    assert "SN_5F1_5E2_7E3" in data
+
+
+def test_epl_label_replaces_non_ascii():
+    data = epl_label(dict(LABEL, model_name='Ноутбук "X"'), LABEL_FORMATS["38x21"], 203)
+    assert data.startswith(b"\nN\n") and data.endswith(b"P1\n")
+    assert b'"??????? \\"X\\""' in data
+
+
+def _epl_font(label_format: dict, dpi: int) -> str:
+    line = next(line for line in epl_label(LABEL, label_format, dpi).decode().splitlines() if line.startswith("A"))
+    return line.split(",")[3]
+
+
+def test_epl_font_depends_on_dpi():
+    # Наклейка высотой 14 мм: шрифт около 34 точек при 300 dpi и 23 при 203 dpi
+    label_format = dict(LABEL_FORMATS["38x21"], height=14)
+    assert _epl_font(label_format, 300) == "2"
+    assert _epl_font(label_format, 203) == "3"
+    assert _epl_font(LABEL_FORMATS["38x21"], 300) == "4"
+
+
+def test_iter_thermal_labels_one_block_per_device():
+    blocks = list(iter_thermal_labels([[LABEL, LABEL], [LABEL]], "zpl", LABEL_FORMATS["38x21"], 203))
+    assert len(blocks) == 3
+
+
+def test_thermal_printers_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "THERMAL_PRINTERS", "zebra=10.0.0.5:9101, epl = 10.0.0.6,broken,bad=10.0.0.7:abc")
+    assert thermal_printers() == {"zebra": ("10.0.0.5", 9101), "epl": ("10.0.0.6", 9100)}
+
+
+class _Connection:
+    def __init__(self, fail_after: int):
+        self.calls = []
+        self.fail_after = fail_after
+
+    def sendall(self, data):
+        if len(self.calls) >= self.fail_after:
+            raise ConnectionResetError("reset")
+        self.calls.append(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_spool_sends_in_batches(monkeypatch):
+    connection = _Connection(fail_after=10)
+    monkeypatch.setattr(thermal_labels.socket, "create_connection", lambda *args, **kwargs: connection)
+    assert spool_to_printer("printer", 9100, [b"ab"] * 5, 2) == (5, 10)
+    assert connection.calls == [b"abab", b"abab", b"ab"]
+
+
+def test_spool_error_reports_sent_labels(monkeypatch):
+    monkeypatch.setattr(thermal_labels.socket, "create_connection", lambda *args, **kwargs: _Connection(fail_after=2))
+    with pytest.raises(SpoolError) as info:
+        spool_to_printer("printer", 9100, [b"ab"] * 5, 2)
+    assert (info.value.labels, info.value.bytes) == (4, 8)
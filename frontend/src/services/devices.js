@@ -6,6 +6,11 @@ export const deviceService = {
     return response.data
   },
   
+  search: async (q, params = {}) => {
+    const response = await api.get('/api/devices/search', { params: { q, ...params } })
+    return response.data
+  },
+  
   getById: async (id) => {
     const response = await api.get(`/api/devices/${id}`)
     return response.data
@@ -16,6 +21,13 @@ export const deviceService = {
     return response.data
   },
   
+  getByInventoryNumbers: async (inventoryNumbers, params = {}) => {
+    const response = await api.post('/api/devices/by-inventory/batch', {
+      inventory_numbers: inventoryNumbers,
+    }, { params })
+    return response.data
+  },
+  
   create: async (data) => {
     const response = await api.post('/api/devices', data)
     return response.data
@@ -0,0 +1,84 @@
+import api from './api'
+
+// Пауза перед переподключением, пока сервер не прислал свою (retry:)
+const DEFAULT_RETRY_MS = 3000
+
+// Разбор одного события text/event-stream: { id, type, data, retry }
+const parseEvent = (block) => {
+  const event = { id: null, type: 'message', data: [], retry: null }
+  block.split('\n').forEach((line) => {
+    if (!line || line.startsWith(':')) return
+    const index = line.indexOf(':')
+    const field = index < 0 ? line : line.slice(0, index)
+    const value = index < 0 ? '' : line.slice(index + 1).replace(/^ /, '')
+    if (field === 'id') event.id = value
+    else if (field === 'event') event.type = value
+    else if (field === 'data') event.data.push(value)
+    else if (field === 'retry' && /^\d+$/.test(value)) event.retry = Number(value)
+  })
+  return event
+}
+
+export const eventService = {
+  // Подписка на поток событий вместо опроса /api/movements и статистики сессии.
+  // handlers: { 'movement.created': (data, event) => ..., ... }
+  // Поток читается через fetch, чтобы токен шел в заголовке Authorization, а не в URL;
+  // как и EventSource, подписка переподключается и передает Last-Event-ID.
+  subscribe: (handlers, { types, sessionId } = {}) => {
+    const params = new URLSearchParams()
+    if (types) params.set('types', types.join(','))
+    if (sessionId) params.set('session_id', sessionId)
+    const url = `${api.defaults.baseURL}/api/events/stream?${params}`
+
+    const controller = new AbortController()
+    let lastEventId = null
+    let retryMs = DEFAULT_RETRY_MS
+
+    const dispatch = (block) => {
+      const event = parseEvent(block)
+      if (event.retry !== null) retryMs = event.retry
+      if (event.id !== null) lastEventId = event.id
+      const handler = handlers[event.type]
+      if (handler && event.data.length) {
+        const payload = JSON.parse(event.data.join('\n'))
+        handler(payload.data, payload)
+      }
+    }
+
+    const read = async () => {
+      const headers = { Authorization: `Bearer ${localStorage.getItem('token')}` }
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId
+      const response = await fetch(url, { headers, signal: controller.signal })
+      // Без действующего токена переподключаться бессмысленно
+      if (response.status === 401) return false
+      if (!response.ok) return true
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) return true
+        buffer += value.replace(/\r\n?/g, '\n')
+        let end
+        while ((end = buffer.indexOf('\n\n')) >= 0) {
+          dispatch(buffer.slice(0, end))
+          buffer = buffer.slice(end + 2)
+        }
+      }
+    }
+
+    const run = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          if (!(await read())) return
+        } catch (error) {
+          if (controller.signal.aborted) return
+        }
+        await new Promise((resolve) => setTimeout(resolve, retryMs))
+      }
+    }
+    run()
+
+    return () => controller.abort()
+  },
+}
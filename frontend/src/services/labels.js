@@ -76,9 +76,45 @@ export const labelService = {
     }
   },
   
-  getQRCode: async (deviceId, size = 200) => {
+  // PDF с листами наклеек (для больших партий вместо HTML-страницы)
+  openLabelsPdf: async (deviceIds, format = '38x21') => {
+    const ids = Array.isArray(deviceIds) ? deviceIds.join(',') : deviceIds
+    const response = await api.get('/api/labels/print', {
+      params: { device_ids: ids, format, output: 'pdf', token: localStorage.getItem('token') },
+      responseType: 'blob',
+    })
+    const url = URL.createObjectURL(response.data)
+    window.open(url, '_blank')
+  },
+  
+  // Фоновое формирование листа наклеек по списку id или фильтру
+  createLabelJob: async (data) => {
+    const response = await api.post('/api/labels/jobs', data)
+    return response.data
+  },
+  
+  getLabelJob: async (jobId) => {
+    const response = await api.get(`/api/labels/jobs/${jobId}`)
+    return response.data
+  },
+  
+  // Ссылка на готовый лист для открытия в браузере (токен в URL)
+  labelJobResultUrl: (job) => {
+    const baseURL = api.defaults.baseURL || 'http://localhost:8000'
+    return `${baseURL}${job.result_url}?token=${localStorage.getItem('token')}`
+  },
+  
+  // Печать на термопринтер (ZPL/EPL): с printer - отправка сервером, без него - файл команд
+  printThermal: async (data) => {
+    const response = await api.post('/api/labels/thermal', data, {
+      responseType: data.printer ? 'json' : 'blob',
+    })
+    return response.data
+  },
+  
+  getQRCode: async (deviceId, size = 200, imageFormat = 'png') => {
     const response = await api.get(`/api/labels/qr/${deviceId}`, {
-      params: { size }
+      params: { size, image_format: imageFormat }
     })
     return response.data
   },
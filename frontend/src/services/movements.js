@@ -15,6 +15,15 @@ export const movementService = {
     const response = await api.post('/api/movements', data)
     return response.data
   },
+
+  createBulk: async (deviceIds, toLocationType, toLocationId) => {
+    const response = await api.post('/api/movements/bulk', {
+      device_ids: deviceIds,
+      to_location_type: toLocationType,
+      to_location_id: toLocationId,
+    })
+    return response.data
+  },
 }
 
 
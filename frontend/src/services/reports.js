@@ -18,7 +18,26 @@ export const reportService = {
     const response = await api.get('/api/reports/locations', { params })
     return response.data
   },
+  
+  getAggregate: async (params = {}) => {
+    const response = await api.get('/api/reports/aggregate', { params })
+    return response.data
+  },
+  
+  createJob: async (data) => {
+    const response = await api.post('/api/reports/jobs', data)
+    return response.data
+  },
+  
+  getJob: async (jobId) => {
+    const response = await api.get(`/api/reports/jobs/${jobId}`)
+    return response.data
+  },
+  
+  downloadJob: async (jobId) => {
+    const response = await api.get(`/api/reports/jobs/${jobId}/download`, {
+      responseType: 'blob',
+    })
+    return response.data
+  },
 }
-
-
-
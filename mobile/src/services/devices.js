@@ -6,6 +6,11 @@ export const deviceService = {
     return response.data
   },
   
+  search: async (q, params = {}) => {
+    const response = await api.get('/api/devices/search', { params: { q, ...params } })
+    return response.data
+  },
+  
   getById: async (id) => {
     const response = await api.get(`/api/devices/${id}`)
     return response.data
@@ -17,8 +22,15 @@ export const deviceService = {
   },
   
   getByInventoryNumber: async (inventoryNumber) => {
-    const devices = await api.get('/api/devices')
-    return devices.data.find(d => d.inventory_number === inventoryNumber)
+    const result = await deviceService.getByInventoryNumbers([inventoryNumber])
+    return result.found[inventoryNumber]
+  },
+  
+  getByInventoryNumbers: async (inventoryNumbers, params = {}) => {
+    const response = await api.post('/api/devices/by-inventory/batch', {
+      inventory_numbers: inventoryNumbers,
+    }, { params })
+    return response.data
   },
 }
 
@@ -15,6 +15,15 @@ export const movementService = {
     const response = await api.get('/api/movements', { params: { device_id: deviceId } })
     return response.data
   },
+  
+  createBulk: async (deviceIds, toLocationType, toLocationId) => {
+    const response = await api.post('/api/movements/bulk', {
+      device_ids: deviceIds,
+      to_location_type: toLocationType,
+      to_location_id: toLocationId,
+    })
+    return response.data
+  },
 }
 
 